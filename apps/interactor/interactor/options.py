@@ -84,6 +84,8 @@ class Options(dictobj.Spec):
         Options for the device finder daemon. Defaults are::
 
             { "search_interval": 1800 # do a discovery every 30 minutes
+            , "max_search_interval": None # double search_interval up to this while devices don't change
+            , "messages_per_second": None # refresh all devices from one scheduler sending this many messages a second
             , "limit": 30 # Limit of 30 messages inflight at any one time
             , "time_between_queries": <shown below>
             }
@@ -243,7 +243,9 @@ class TestAnimationCommands:
             assert info["animations"][identity]["options"]["combined"]
             assert "unlocked" in info["animations"][identity]["options"]["pauser"]
             assert info["animations"][identity]["options"]["noisy_network"] == 0
+            assert info["animations"][identity]["stats"]["messages"]["frames_skipped"] >= 0
 
             specific = await server.assertCommand("/v1/lifx/command", {"command": "animation/info", "args": {"identity": identity}})
             info["animations"][identity]["current_animation"]["started"] = mock.ANY
+            info["animations"][identity]["stats"] = mock.ANY
             assert info["animations"][identity] == specific
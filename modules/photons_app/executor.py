@@ -82,7 +82,10 @@ class App(App):
     VERSION = VERSION
     cli_categories = ["photons_app"]
     cli_description = "Photons server!"
-    cli_environment_defaults = {"LIFX_CONFIG": ("--config", "./lifx.yml")}
+    cli_environment_defaults = {
+        "LIFX_CONFIG": ("--config", "./lifx.yml"),
+        "PHOTONS_OUTPUT": ("--output", "text"),
+    }
     cli_positional_replacements = [
         ("--task", "list_tasks"),
         ("--reference", sb.NotSpecified),
@@ -180,6 +183,14 @@ class App(App):
             **defaults["--reference"],
         )
 
+        parser.add_argument(
+            "--output",
+            help="Print results from tasks as text or as one json object per line",
+            dest="photons_app_output",
+            choices=["text", "ndjson"],
+            **defaults["--output"],
+        )
+
         parser.add_argument(
             "--config",
             help="Config file to read from",
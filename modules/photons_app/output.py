@@ -0,0 +1,103 @@
+"""
+Tasks can print their results as one json object per line so that other
+programs can read them as they arrive.
+"""
+
+import asyncio
+import binascii
+import enum
+import json
+import sys
+import time
+
+
+def jsonable(o):
+    """Used as the ``default`` for json.dumps for the objects tasks give us"""
+    if hasattr(o, "as_dict"):
+        return o.as_dict()
+    elif isinstance(o, enum.Enum):
+        return o.name
+    elif isinstance(o, bytes):
+        return binascii.hexlify(o).decode()
+    elif isinstance(o, (set, frozenset)):
+        return sorted(o)
+    return repr(o)
+
+
+class NDJsonWriter:
+    """
+    Write objects as json to a stream, one per line.
+
+    Lines are joined and written together when there is ``buffer_size``
+    characters waiting, when the oldest waiting line is ``flush_after`` seconds
+    old, and when the writer is used as a context manager and it exits.
+
+    When there is a running event loop, waiting lines are written
+    ``flush_after`` seconds after the first of them even if nothing else is
+    written. Without one, they are only written by the next ``write`` after
+    that time, by ``flush`` or when the context manager exits.
+
+    .. code-block:: python
+
+        from photons_app.output import NDJsonWriter
+
+
+        with NDJsonWriter() as writer:
+            async for serial, _, info in sender.gatherer.gather(plans, reference):
+                writer.write({"serial": serial, "info": info})
+
+    When ``stream`` isn't given, lines are written to ``sys.stdout``.
+    """
+
+    def __init__(self, stream=None, *, buffer_size=65536, flush_after=0.5):
+        self._stream = stream
+        self.buffer_size = buffer_size
+        self.flush_after = flush_after
+
+        self.lines = []
+        self.size = 0
+        self.started = None
+        self.handle = None
+
+    @property
+    def stream(self):
+        if self._stream is None:
+            return sys.stdout
+        return self._stream
+
+    def write(self, obj):
+        line = json.dumps(obj, sort_keys=True, default=jsonable)
+        if not self.lines:
+            self.started = time.time()
+            self.flush_later()
+
+        self.lines.append(line)
+        self.size += len(line) + 1
+
+        if self.size >= self.buffer_size or time.time() - self.started >= self.flush_after:
+            self.flush()
+
+    def flush_later(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.handle = loop.call_later(self.flush_after, self.flush)
+
+    def flush(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        if not self.lines:
+            return
+
+        lines, self.lines, self.size = self.lines, [], 0
+        self.stream.write("\n".join(lines) + "\n")
+        self.stream.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_typ, exc, tb):
+        self.flush()
@@ -19,6 +19,7 @@ from delfick_project.norms import dictobj, sb, va
 from photons_app import helpers as hp
 from photons_app.errors import ApplicationStopped, BadOption
 from photons_app.formatter import MergedOptionStringFormatter
+from photons_app.output import NDJsonWriter
 from photons_app.registers import ReferenceResolverRegister, Target, TargetRegister
 from photons_app.tasks.specifier import task_specifier_spec
 
@@ -43,6 +44,11 @@ class PhotonsApp(dictobj.Spec):
     )
     default_activate = dictobj.NullableField(sb.listof(sb.string_spec()), help="A list of photons modules to load by default")
     task_specifier = dictobj.Field(sb.delayed(task_specifier_spec()), help="Used to determine chosen task and target")
+    output = dictobj.Field(
+        sb.string_choice_spec(["text", "ndjson"]),
+        default="text",
+        help="Whether tasks print their results as text or as one json object per line",
+    )
 
     @hp.memoized_property
     def final_future(self):
@@ -85,6 +91,21 @@ class PhotonsApp(dictobj.Spec):
                 kwargs["read_from"] = location
             raise BadOption("The options after -- wasn't valid json", **kwargs)
 
+    @contextmanager
+    def ndjson_writer(self):
+        """
+        Yield a :class:`photons_app.output.NDJsonWriter` if ``output`` is
+        ``ndjson``, otherwise yield ``None``.
+
+        Anything left in the writer is written when the context manager exits.
+        """
+        if self.output != "ndjson":
+            yield None
+            return
+
+        with NDJsonWriter() as writer:
+            yield writer
+
     @hp.asynccontextmanager
     async def separate_final_future(self, sleep=0):
         other_future = hp.create_future(name="PhotonsApp::separate_final_future")
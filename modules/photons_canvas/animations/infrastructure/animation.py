@@ -19,6 +19,9 @@ class Animation:
     random_orientations = False
     skip_next_transition = False
 
+    # The Resolver this animation was made from, so it can be made again
+    resolver = None
+
     align_parts_separate = False
     align_parts_straight = False
     align_parts_vertically = False
@@ -38,6 +41,7 @@ class Animation:
         self.options = options
         self.final_future = final_future
 
+        self.ticks = 0
         self.started = None
         self.setup()
 
@@ -63,9 +67,19 @@ class Animation:
         self.started = time.time()
         del self.ticker
 
+        stats = getattr(animation_state, "stats", None)
+
         async def tick():
+            last = None
             async with self.ticker as ticks:
                 async for result in ticks:
+                    self.ticks += 1
+                    if stats is not None:
+                        # The ticker skips ahead when it's late rather than ticking many times
+                        now = time.time()
+                        missed = 0 if last is None or not self.every else max(0, round((now - last) / self.every) - 1)
+                        stats.tick(missed)
+                        last = now
                     yield result
 
         def errors(e):
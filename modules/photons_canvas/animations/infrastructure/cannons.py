@@ -13,8 +13,9 @@ log = logging.getLogger("photons_canvas.animations.infrastructure.cannons")
 
 
 class Writer:
-    def __init__(self, transport):
+    def __init__(self, transport, stats=None):
         self._t = None
+        self.stats = stats
         self.transport = transport
 
     async def t(self):
@@ -25,7 +26,11 @@ class Writer:
     async def write(self, msg):
         with hp.just_log_exceptions(log, reraise=[asyncio.CancelledError]):
             try:
-                await self.transport.write(await self.t(), msg.tobytes(), msg)
+                t = await self.t()
+                before = time.perf_counter()
+                await self.transport.write(t, msg.tobytes(), msg)
+                if self.stats is not None:
+                    self.stats.write.add(time.perf_counter() - before)
             except asyncio.CancelledError:
                 raise
             except AttributeError:
@@ -58,9 +63,10 @@ class Sem:
 
 
 class Cannon:
-    def __init__(self, afr, sem):
+    def __init__(self, afr, sem, stats=None):
         self.afr = afr
         self.sem = sem
+        self.stats = stats
         self.writers = {}
 
     async def make_messages(self, ts, serial, msgs):
@@ -82,15 +88,22 @@ class Cannon:
             else:
                 service = services[Services.UDP]
 
-            self.writers[serial] = Writer(service)
+            self.writers[serial] = Writer(service, stats=self.stats)
 
         if self.sem.should_drop(serial):
+            if self.stats is not None:
+                self.stats.dropped(len(msgs))
             return
 
+        before = time.perf_counter()
+
         async for write, result in self.make_messages(serial, msgs):
             self.sem.add(serial, result)
             await write()
 
+        if self.stats is not None:
+            self.stats.sent(len(msgs), time.perf_counter() - before)
+
 
 class FastNetworkCannon(Cannon):
     """
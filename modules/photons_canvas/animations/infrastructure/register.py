@@ -42,6 +42,7 @@ class Animator:
             def make_animation(final_future, pauser=None):
                 options = self.animator.Options.FieldSpec().normalise(Meta.empty(), self.options)
                 animation = self.animator.Animation(final_future, options, pauser=pauser)
+                animation.resolver = self
                 if self.options is not sb.NotSpecified:
                     for attr in animation.overridable:
                         if attr in self.options:
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import sys
+import time
 from collections import defaultdict
 from contextlib import contextmanager
 
@@ -33,8 +34,12 @@ def catch_finish(reraise_exceptions=True):
 
 
 class State:
-    def __init__(self, final_future):
+    def __init__(self, final_future, canvas_kls=Canvas, resend_every=0.5, counts=None, stats=None):
         self.final_future = final_future
+        self.canvas_kls = canvas_kls
+        self.resend_every = resend_every
+        self.counts = counts
+        self.stats = stats
 
         self.state = None
         self.by_device = defaultdict(list)
@@ -85,7 +90,7 @@ class State:
             self.animation = animation
             self.background = background
 
-            self.canvas = Canvas()
+            self.canvas = self.canvas_kls()
             await self.add_collected([[p.clone_real_part() for p in ps] for ps in self.by_device.values()])
 
     def add_parts(self, parts):
@@ -139,6 +144,9 @@ class State:
 
         self.canvas = self.canvas.clone()
 
+        before = time.perf_counter()
+        encoded = 0 if self.counts is None else self.counts.encode_time
+
         msgs = list(
             self.canvas.msgs(
                 layer,
@@ -146,8 +154,15 @@ class State:
                 duration=self.animation.duration,
                 acks=self.animation.retries,
                 randomize=self.animation.random_orientations,
+                resend_every=self.resend_every,
+                counts=self.counts,
             )
         )
+
+        if self.stats is not None:
+            encode = 0 if self.counts is None else self.counts.encode_time - encoded
+            self.stats.frame(time.perf_counter() - before - encode, encode)
+
         yield msgs
 
         if msgs:
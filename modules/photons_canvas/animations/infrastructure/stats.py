@@ -0,0 +1,108 @@
+class Timing:
+    """How many times something happened and how long it took"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, took):
+        self.count += 1
+        self.total += took
+        if took > self.max:
+            self.max = took
+
+    def as_dict(self):
+        average = 0 if not self.count else self.total / self.count
+        return {
+            "count": self.count,
+            "average_ms": round(average * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class FrameStats:
+    """
+    Numbers about the frames made for animations and the messages sent for
+    them. Times are in seconds and every number counts from when this object
+    was made.
+
+    ticks and ticks_missed
+        How many ticks the animations had and roughly how many ticks were
+        skipped because the previous tick was late
+
+    frames and frames_dropped
+        How many frames were made and how many ticks were ignored because the
+        previous frame was still being made in another process
+
+    render and encode
+        How long it took to get colors for the frame from the animation and
+        how long it took to turn those colors into messages
+
+    send and write
+        How long it took to send the messages for a frame to each device and
+        how long each write of a message took
+
+    messages_sent and messages_dropped
+        How many messages were written and how many were not sent because the
+        device already had too many messages waiting for a reply
+    """
+
+    def __init__(self):
+        self.ticks = 0
+        self.ticks_missed = 0
+
+        self.frames = 0
+        self.frames_dropped = 0
+
+        self.messages_sent = 0
+        self.messages_dropped = 0
+
+        self.render = Timing()
+        self.encode = Timing()
+        self.send = Timing()
+        self.write = Timing()
+
+    def tick(self, missed):
+        self.ticks += 1
+        self.ticks_missed += missed
+
+    def frame(self, render, encode):
+        self.frames += 1
+        self.render.add(render)
+        self.encode.add(encode)
+
+    def sent(self, count, took):
+        self.messages_sent += count
+        self.send.add(took)
+
+    def dropped(self, count):
+        self.messages_dropped += count
+
+    def as_dict(self):
+        return {
+            "ticks": self.ticks,
+            "ticks_missed": self.ticks_missed,
+            "frames": self.frames,
+            "frames_dropped": self.frames_dropped,
+            "messages_sent": self.messages_sent,
+            "messages_dropped": self.messages_dropped,
+            "render": self.render.as_dict(),
+            "encode": self.encode.as_dict(),
+            "send": self.send.as_dict(),
+            "write": self.write.as_dict(),
+        }
+
+    def summary(self):
+        """The numbers for a log line"""
+        return {
+            "ticks": self.ticks,
+            "ticks_missed": self.ticks_missed,
+            "frames": self.frames,
+            "frames_dropped": self.frames_dropped,
+            "messages_dropped": self.messages_dropped,
+            "render_ms": self.render.as_dict()["average_ms"],
+            "encode_ms": self.encode.as_dict()["average_ms"],
+            "send_ms": self.send.as_dict()["average_ms"],
+            "write_max_ms": self.write.as_dict()["max_ms"],
+        }
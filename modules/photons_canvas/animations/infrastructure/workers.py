@@ -0,0 +1,211 @@
+"""
+Make the frames of animations in other processes.
+
+With the ``render_workers`` run option each animation state is given to one
+of a pool of processes. That process has its own copy of the animation and the
+canvas and is told about every event the animation gets. For each tick it makes
+the frame and gives back the bytes of the messages for it, so the event loop
+only needs to write those bytes to the devices.
+
+Frames are made one at a time for each state. Ticks that happen while a frame
+is being made are dropped rather than making frames that are already late.
+
+Animations are made again in the other process from the ``Resolver`` they were
+made from and so their options, the parts and the values of user events must
+all be things that can be pickled.
+"""
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from photons_app import helpers as hp
+from photons_app.errors import PhotonsAppError
+
+from photons_canvas import Canvas
+from photons_canvas.animations.infrastructure.events import AnimationEvent
+from photons_canvas.animations.infrastructure.state import State
+from photons_canvas.points.containers import MessageCounts
+from photons_canvas.points.simple_messages import PackedMessage, SimpleMessage
+
+log = logging.getLogger("photons_canvas.animations.infrastructure.workers")
+
+
+class CantRenderElsewhere(PhotonsAppError):
+    desc = "Animation can't be made in another process"
+
+
+# The states in this process when it is a worker
+states = {}
+
+loop = None
+
+
+def run(coro):
+    global loop
+    if loop is None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
+
+
+def packed(msg):
+    """Return the bytes for this message"""
+    if isinstance(msg, SimpleMessage):
+        return msg.tobytes()
+    msg.source = 0
+    msg.sequence = 0
+    return msg.pack().tobytes()
+
+
+def start(key, canvas_kls, resend_every):
+    async def make():
+        final_future = hp.create_future(name=f"workers::start[{key}]")
+        states[key] = State(final_future, canvas_kls=canvas_kls, resend_every=resend_every)
+
+    run(make())
+
+
+def set_animation(key, resolver, background):
+    state = states[key]
+
+    async def change():
+        make_animation, _ = resolver.resolve()
+        await state.set_animation(make_animation(state.final_future), background)
+
+    run(change())
+
+
+def add_collected(key, collected):
+    run(states[key].add_collected(collected))
+
+
+def process_event(key, typ, value):
+    # Only whether an error was handled is needed, layers can't be pickled
+    return bool(run(states[key].process_event(typ, value)))
+
+
+def frame(key, typ, force):
+    """Process a TICK or ENDED event and return the bytes for that frame"""
+    state = states[key]
+    state.counts = MessageCounts()
+
+    async def make():
+        msgs = []
+        async for messages in state.send_canvas(await state.process_event(typ, force=force)):
+            msgs.extend(packed(msg) for msg in messages)
+        return msgs
+
+    return run(make()), state.counts.as_dict()
+
+
+class RenderPool:
+    """
+    Processes to make frames in. Each state uses one of the processes so that
+    it can keep the animation and canvas between frames.
+    """
+
+    def __init__(self, count):
+        context = multiprocessing.get_context("spawn")
+        self.executors = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(count)]
+        self.keys = itertools.count(1)
+
+    def worker(self):
+        """Return an executor and a key for a new state"""
+        key = next(self.keys)
+        return self.executors[key % len(self.executors)], key
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class RemoteState(State):
+    """
+    A ``State`` that keeps the animation in the event loop for ticks and user
+    events, but gives every event to a copy of the animation in a worker
+    process to make the frames.
+    """
+
+    def __init__(self, final_future, pool, canvas_kls=Canvas, resend_every=0.5, counts=None, stats=None):
+        super().__init__(final_future, canvas_kls=Canvas, resend_every=resend_every, counts=counts, stats=stats)
+        self.executor, self.key = pool.worker()
+        self.worker_canvas_kls = canvas_kls
+
+        self.started = False
+        self.ticks_seen = 0
+        self.frames_dropped = 0
+
+    async def call(self, func, *args):
+        return await hp.get_event_loop().run_in_executor(self.executor, func, self.key, *args)
+
+    async def ensure_started(self):
+        if not self.started:
+            await self.call(start, self.worker_canvas_kls, self.resend_every)
+            self.started = True
+
+    async def add_collected(self, collected):
+        for parts in collected:
+            self.add_parts(parts)
+
+        await self.ensure_started()
+        await self.call(add_collected, collected)
+
+    async def set_animation(self, animation, background):
+        if self.animation is animation:
+            return
+
+        if animation.resolver is None:
+            raise CantRenderElsewhere(animation=type(animation))
+
+        await self.ensure_started()
+        await self.call(set_animation, animation.resolver, background)
+
+        self.state = None
+        self.ticks_seen = 0
+        self.animation = animation
+        self.background = background
+
+        self.canvas = self.canvas_kls()
+        for parts in [[p.clone_real_part() for p in ps] for ps in self.by_device.values()]:
+            self.add_parts(parts)
+
+    async def send_canvas(self, layer):
+        if not layer:
+            return
+
+        typ, force = layer
+        before = time.perf_counter()
+        msgs, counts = await self.call(frame, typ, force)
+
+        if self.counts is not None:
+            self.counts.add(counts)
+        if self.stats is not None:
+            encode = counts["encode_time"]
+            self.stats.frame(time.perf_counter() - before - encode, encode)
+
+        yield [PackedMessage(bts=bytearray(msg)) for msg in msgs]
+
+    async def process_event(self, typ, value=None, force=False):
+        if not force and self.final_future.done():
+            raise asyncio.CancelledError()
+
+        if not self.animation:
+            return
+
+        if typ is AnimationEvent.Types.TICK:
+            self.ticks_seen += 1
+            if self.ticks_seen < self.animation.ticks:
+                self.frames_dropped += 1
+                if self.stats is not None:
+                    self.stats.frames_dropped += 1
+                log.debug(hp.lc("Dropped a frame", dropped=self.frames_dropped))
+                return
+
+        if typ in (AnimationEvent.Types.TICK, AnimationEvent.Types.ENDED):
+            return (typ, force)
+
+        return await self.call(process_event, typ, value)
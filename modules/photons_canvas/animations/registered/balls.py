@@ -170,6 +170,15 @@ class TileBallsState:
 
             return canvas.dim(point, self.options.fade_amount)
 
+        def dense(colors, canvas):
+            colors = canvas.dimmed(colors, self.options.fade_amount)
+            for point, color in by_point.items():
+                index = canvas.index(point)
+                if index is not None and color:
+                    colors[index] = color
+            return colors
+
+        layer.dense = dense
         return layer
 
 
@@ -6,6 +6,7 @@ from delfick_project.norms import BadSpecValue, Meta, dictobj, sb
 from photons_app.formatter import MergedOptionStringFormatter
 
 from photons_canvas.animations.infrastructure.register import resolve
+from photons_canvas.points import dense
 
 
 class Chooser:
@@ -51,6 +52,28 @@ class noisy_network_spec(sb.Spec):
         return sb.integer_spec().normalise(meta, val)
 
 
+class dense_canvas_spec(sb.Spec):
+    def normalise_empty(self, meta):
+        return False
+
+    def normalise_filled(self, meta, val):
+        val = sb.boolean().normalise(meta, val)
+        if val and not dense.available:
+            raise BadSpecValue("The dense canvas needs numpy to be installed", meta=meta)
+        return val
+
+
+class render_workers_spec(sb.Spec):
+    def normalise_empty(self, meta):
+        return 0
+
+    def normalise_filled(self, meta, val):
+        val = sb.integer_spec().normalise(meta, val)
+        if val < 0:
+            raise BadSpecValue("render_workers can't be less than 0", got=val, meta=meta)
+        return val
+
+
 class animation_spec(sb.Spec):
     def normalise_filled(self, meta, val):
         if not val:
@@ -133,6 +156,47 @@ class RunOptions(dictobj.Spec):
     """,
     )
 
+    dense_canvas = dictobj.Field(
+        dense_canvas_spec(),
+        help="""
+        Whether to keep the colors for the animation in a numpy array rather
+        than a dictionary of points. Animations that can make a whole frame
+        at once, like balls, are cheaper with this, and others are a little
+        slower. This needs numpy to be installed.
+    """,
+    )
+
+    resend_every = dictobj.Field(
+        sb.float_spec,
+        default=0.5,
+        help="""
+        Only the parts of the canvas that change are sent to the devices. This
+        is the number of seconds after which we send every part again anyway,
+        in case a message was lost. Set this to 0 to only send changes.
+    """,
+    )
+
+    render_workers = dictobj.Field(
+        render_workers_spec,
+        help="""
+        The number of processes to make the frames of animations in. When this
+        is 0 (default) frames are made in the same process that sends the
+        messages to the devices.
+
+        Frames that would be late because the last one took too long to make
+        are dropped.
+    """,
+    )
+
+    log_stats_every = dictobj.Field(
+        sb.float_spec,
+        default=0,
+        help="""
+        When this is more than 0 we log how long frames take to make and send
+        and how many ticks and messages were dropped every this many seconds.
+    """,
+    )
+
     rediscover_every = dictobj.Field(
         sb.integer_spec,
         default=20,
@@ -2,6 +2,7 @@ import asyncio
 import logging
 import time
 from collections import defaultdict
+from contextlib import contextmanager
 
 from photons_app import helpers as hp
 from photons_app.errors import FoundNoDevices
@@ -12,7 +13,11 @@ from photons_canvas import Canvas
 from photons_canvas.animations.infrastructure import cannons
 from photons_canvas.animations.infrastructure.finish import Finish
 from photons_canvas.animations.infrastructure.state import State
+from photons_canvas.animations.infrastructure.stats import FrameStats
+from photons_canvas.animations.infrastructure.workers import RemoteState, RenderPool
 from photons_canvas.animations.run_options import make_run_options
+from photons_canvas.points.containers import MessageCounts
+from photons_canvas.points.dense import DenseCanvas
 
 log = logging.getLogger("photons_canvas.animations.runner")
 
@@ -30,6 +35,9 @@ class AnimationRunner(hp.AsyncCMMixin):
         self.collected = {}
         self.animations_ran = 0
         self.current_animation = None
+        self.message_counts = MessageCounts()
+        self.stats = FrameStats()
+        self.render_pool = None
 
         self.seen_serials = set()
         self.used_serials = set()
@@ -49,6 +57,7 @@ class AnimationRunner(hp.AsyncCMMixin):
             "current_animation": current_animation,
             "animations_ran": self.animations_ran,
             "options": options,
+            "stats": {**self.stats.as_dict(), "messages": self.message_counts.as_dict()},
         }
 
     async def start(self):
@@ -58,40 +67,97 @@ class AnimationRunner(hp.AsyncCMMixin):
         if hasattr(self, "final_future"):
             self.final_future.cancel()
 
+    @property
+    def canvas_kls(self):
+        if self.run_options.dense_canvas:
+            return DenseCanvas
+        return Canvas
+
     def make_cannon(self):
         if not self.run_options.noisy_network:
-            return cannons.FastNetworkCannon(self.sender, cannons.Sem())
+            return cannons.FastNetworkCannon(self.sender, cannons.Sem(), stats=self.stats)
         else:
             sem = cannons.Sem(
                 wait_timeout=self.kwargs.get("message_timeout", 1),
                 inflight_limit=self.run_options.noisy_network,
             )
-            return cannons.NoisyNetworkCannon(self.sender, sem)
+            return cannons.NoisyNetworkCannon(self.sender, sem, stats=self.stats)
+
+    def make_state(self):
+        if self.render_pool is not None:
+            return RemoteState(
+                self.final_future,
+                self.render_pool,
+                canvas_kls=self.canvas_kls,
+                resend_every=self.run_options.resend_every,
+                counts=self.message_counts,
+                stats=self.stats,
+            )
+
+        return State(
+            self.final_future,
+            canvas_kls=self.canvas_kls,
+            resend_every=self.run_options.resend_every,
+            counts=self.message_counts,
+            stats=self.stats,
+        )
+
+    @contextmanager
+    def rendering(self):
+        if self.run_options.render_workers:
+            self.render_pool = RenderPool(self.run_options.render_workers)
+
+        try:
+            yield
+        finally:
+            if self.render_pool is not None:
+                self.render_pool.shutdown()
+                self.render_pool = None
+
+    @contextmanager
+    def logging_stats(self):
+        task = None
+        if self.run_options.log_stats_every:
+            task = hp.async_as_background(self.log_stats(self.run_options.log_stats_every))
+
+        try:
+            yield
+        finally:
+            if task is not None:
+                task.cancel()
+
+    async def log_stats(self, every):
+        async with hp.tick(every, final_future=self.final_future, name="AnimationRunner::log_stats[tick]") as ticks:
+            async for _ in ticks:
+                if self.stats.ticks:
+                    log.info(hp.lc("Animation stats", **self.stats.summary(), bytes_saved=self.message_counts.bytes_saved))
 
     async def run(self):
         cannon = self.make_cannon()
         self.started = time.time()
 
         animations = self.run_options.animations_iter
-        self.combined_state = State(self.final_future)
-
-        async with self.reinstate(), hp.TaskHolder(self.final_future, name="AnimationRunner::run[task_holder]") as ts:
-            self.transfer_error(ts, ts.add(self.animate(ts, cannon, self.combined_state, animations)))
 
-            async for collected in self.collect_parts(ts):
-                try:
-                    if self.run_options.combined:
-                        await self.combined_state.add_collected(collected)
-                    else:
-                        state = State(self.final_future)
-                        await state.add_collected(collected)
-                        self.transfer_error(ts, ts.add(self.animate(ts, cannon, state, animations)))
-                except asyncio.CancelledError:
-                    raise
-                except Finish:
-                    pass
-                except Exception as error:
-                    log.exception(hp.lc("Failed to add device", error=error))
+        with self.rendering(), self.logging_stats():
+            self.combined_state = self.make_state()
+
+            async with self.reinstate(), hp.TaskHolder(self.final_future, name="AnimationRunner::run[task_holder]") as ts:
+                self.transfer_error(ts, ts.add(self.animate(ts, cannon, self.combined_state, animations)))
+
+                async for collected in self.collect_parts(ts):
+                    try:
+                        if self.run_options.combined:
+                            await self.combined_state.add_collected(collected)
+                        else:
+                            state = self.make_state()
+                            await state.add_collected(collected)
+                            self.transfer_error(ts, ts.add(self.animate(ts, cannon, state, animations)))
+                    except asyncio.CancelledError:
+                        raise
+                    except Finish:
+                        pass
+                    except Exception as error:
+                        log.exception(hp.lc("Failed to add device", error=error))
 
     def transfer_error(self, ts, t):
         def process(res, fut):
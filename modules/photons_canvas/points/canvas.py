@@ -6,6 +6,8 @@ from photons_canvas.points import helpers as php
 
 
 class Canvas:
+    is_dense = False
+
     def __init__(self):
         self._parts = {}
         self._devices = {}
@@ -137,7 +139,7 @@ class Canvas:
                 cs = part.real_part.original_colors
                 yield from part.real_part.msgs(cs, duration=duration, force=True)
 
-    def msgs(self, layer, acks=False, duration=1, randomize=False, onto=None):
+    def msgs(self, layer, acks=False, duration=1, randomize=False, onto=None, resend_every=0.5, counts=None):
         msgs = []
 
         for part in self._parts:
@@ -150,7 +152,15 @@ class Canvas:
                 if onto is not None:
                     onto[point] = c
 
-            for msg in part.msgs(cs, acks=acks, duration=duration, randomize=randomize, force=False):
+            for msg in part.msgs(
+                cs,
+                acks=acks,
+                duration=duration,
+                randomize=randomize,
+                force=False,
+                resend_every=resend_every,
+                counts=counts,
+            ):
                 msgs.append(msg)
 
         return msgs
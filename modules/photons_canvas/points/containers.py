@@ -1,15 +1,72 @@
-import itertools
 import random
 import time
 
 from photons_messages import LightMessages
+from photons_products import Products
 
 from photons_canvas.orientation import Orientation, reorient, reverse_orientation
 from photons_canvas.points import helpers as php
-from photons_canvas.points.simple_messages import MultizoneMessagesMaker, Set64
+from photons_canvas.points.simple_messages import ColorEncoder, MultizoneMessagesMaker, Set64
 
 NO_MESSAGES = ()
 
+OrientationOrders = {}
+
+
+def orientation_order(orientation, count):
+    """Return the indexes of ``count`` colors in the order ``reorient`` would put them"""
+    key = (orientation, count)
+    order = OrientationOrders.get(key)
+    if order is None:
+        order = OrientationOrders[key] = reorient(list(range(count)), orientation)
+    return order
+
+
+class MessageCounts:
+    """
+    Counts of the frames given to parts and the messages that were sent for
+    them, or not sent because nothing changed. Also how many seconds were spent
+    turning colors into messages.
+    """
+
+    def __init__(self):
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+        self.encode_time = 0
+
+    def sent(self, msgs, all_msgs):
+        """Record that ``msgs`` were sent instead of ``all_msgs``"""
+        if not msgs:
+            self.skipped(all_msgs)
+            return
+
+        self.frames_sent += 1
+        sent = sum(msg.size for msg in msgs)
+        self.bytes_sent += sent
+        if msgs is not all_msgs:
+            self.bytes_saved += sum(msg.size for msg in all_msgs) - sent
+
+    def skipped(self, msgs):
+        """Record that nothing was sent instead of ``msgs``"""
+        self.frames_skipped += 1
+        self.bytes_saved += sum(msg.size for msg in msgs)
+
+    def add(self, counts):
+        """Add the counts from the ``as_dict`` of another ``MessageCounts``"""
+        for key, value in counts.items():
+            setattr(self, key, getattr(self, key) + value)
+
+    def as_dict(self):
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "bytes_sent": self.bytes_sent,
+            "bytes_saved": self.bytes_saved,
+            "encode_time": self.encode_time,
+        }
+
 
 class Part:
     def __init__(
@@ -38,6 +95,7 @@ class Part:
         self._hash = hash(self._key)
 
         self.last_msgs = []
+        self._windows = None
 
         self._set_64 = Set64(
             x=0,
@@ -52,6 +110,8 @@ class Part:
             target=self.device.serial,
         )
 
+        self._encoder = ColorEncoder(self.width * self.height)
+
         real_part = self.clone() if real_part is None else real_part
         self.real_part = real_part
         self.next_force_send = time.time() - 1
@@ -59,6 +119,11 @@ class Part:
     def __hash__(self):
         return self._hash
 
+    def __setstate__(self, state):
+        # hashes of strings are different in other processes
+        self.__dict__.update(state)
+        self._hash = hash(self._key)
+
     def __eq__(self, other):
         if isinstance(other, tuple) and other == self._key:
             return True
@@ -149,51 +214,102 @@ class Part:
 
         return reorient(colors, o)
 
-    def msgs(self, colors, *, acks=False, duration=1, randomize=False, force=True):
-        forced = False
-        if time.time() > self.next_force_send:
-            if self.colors is not None:
-                diff = any(c1 != c2 for c1, c2 in itertools.zip_longest(colors, self.colors))
-                if not diff:
-                    diff = True
-                    forced = True
-            else:
-                diff = True
-                forced = True
-
-        elif self.colors is None or force:
-            diff = True
-            forced = True
-
+    def msgs(
+        self,
+        colors,
+        *,
+        acks=False,
+        duration=1,
+        randomize=False,
+        force=True,
+        encoded=None,
+        resend_every=0.5,
+        counts=None,
+    ):
+        """
+        Return the messages for these colors if they are different from the
+        last colors given to this part.
+
+        For tiles only the messages for rows of the tile that changed are
+        returned. The messages for all the colors are returned again if
+        ``force`` is True or when ``resend_every`` seconds have passed since
+        we last sent messages. A ``resend_every`` of 0 or None means we only
+        send changes.
+
+        ``encoded`` may be these colors from ``ColorEncoder.pack`` in the
+        order of ``colors`` so they don't need to be encoded again.
+
+        ``counts`` may be a ``MessageCounts`` that is told about what was sent
+        and what was skipped.
+        """
+        now = time.time()
+
+        if force or self.colors is None:
+            changed = resend = True
         else:
-            diff = any(c1 != c2 for c1, c2 in itertools.zip_longest(colors, self.colors))
+            changed = colors != self.colors
+            resend = bool(resend_every) and now > self.next_force_send
 
         self.colors = colors
 
-        if diff or forced:
-            self.next_force_send = time.time() + 0.5
-
-        if not diff:
+        if not changed and not resend:
+            if counts is not None:
+                counts.skipped(self.last_msgs)
             return NO_MESSAGES
 
-        if (diff and not forced) or not self.last_msgs:
-            self.last_msgs = self._msgs(colors, acks=acks, duration=duration, randomize=randomize)
+        if resend_every:
+            self.next_force_send = now + resend_every
 
-        return self.last_msgs
+        msgs = self.last_msgs
+        if changed or not msgs:
+            windows = self._windows
+            before = time.perf_counter()
+            msgs = self.last_msgs = self._msgs(colors, acks=acks, duration=duration, randomize=randomize, encoded=encoded)
+            if counts is not None:
+                counts.encode_time += time.perf_counter() - before
+
+            if not resend and windows is not None and len(windows) == len(self._windows):
+                dirty = [before != after for before, after in zip(windows, self._windows)]
+                if not all(dirty):
+                    msgs = tuple([msg for msg, d in zip(msgs, dirty) if d])
+
+        if counts is not None:
+            counts.sent(msgs, self.last_msgs)
+        return msgs
+
+    def _msgs(self, colors, acks=False, duration=1, randomize=False, encoded=None):
+        self._windows = None
 
-    def _msgs(self, colors, acks=False, duration=1, randomize=False):
         if self.device.cap.has_matrix:
-            colors = [c if c is not None else None for c in self.reorient(colors, randomize=randomize)]
+            if encoded is not None:
+                o = self.random_orientation if randomize else self.orientation
+                encoded = encoded[orientation_order(o, len(encoded))].tobytes()
+            else:
+                encoded = self._encoder.encode(self.reorient(colors, randomize=randomize))
 
-            kwargs = {"colors": colors}
+            kwargs = {}
             if duration != 0:
                 kwargs["duration"] = duration
             if acks:
                 kwargs["acks"] = acks
 
-            msg = self._set_64.clone()
-            msg.update(kwargs)
-            return (msg,)
+            # A Set64 holds 64 colors, so bigger tiles are sent as windows of rows
+            rows = max(1, 64 // self.width)
+            size = rows * self.width * 8
+
+            msgs = []
+            self._windows = []
+            for y, start in zip(range(0, self.height, rows), range(0, len(encoded), size)):
+                window = encoded[start : start + size]
+                self._windows.append(window)
+
+                msg = self._set_64.clone()
+                msg.update(kwargs)
+                msg.y = y
+                msg.colors = window
+                msgs.append(msg)
+
+            return tuple(msgs)
 
         elif self.device.cap.has_multizone:
             return MultizoneMessagesMaker(self.device.serial, self.device.cap, colors, duration=duration).msgs
@@ -223,6 +339,12 @@ class Device:
     def __hash__(self):
         return self._hash
 
+    def __reduce__(self):
+        # Capabilities can't be pickled, so we find it again from the product
+        product = self.cap.product
+        firmware = (self.cap.firmware_major, self.cap.firmware_minor)
+        return (make_device, (self.serial, product.vendor.vid, product.pid, firmware))
+
     def __eq__(self, other):
         if isinstance(other, str) and other == self.serial:
             return True
@@ -243,3 +365,8 @@ class Device:
         if hasattr(self.cap, "product"):
             name = self.cap.product.name
         return f"<Device ({self.serial},{name})>"
+
+
+def make_device(serial, vid, pid, firmware):
+    """Make a Device for this product with this firmware"""
+    return Device(serial, Products[vid, pid].cap(*firmware))
@@ -0,0 +1,358 @@
+"""
+A ``DenseCanvas`` is a ``Canvas`` that keeps its colors in a numpy array of
+``(hue, saturation, brightness, kelvin)`` values instead of a dictionary of
+points. Cloning it is a copy of that array, and layers can give it a whole
+frame at once instead of being asked for each point.
+
+A layer opts into this by having a ``dense`` attribute that takes in a copy of
+the colors on the canvas and the canvas, and returns the colors for the next
+frame:
+
+.. code-block:: python
+
+    def layer(point, canvas):
+        return canvas.dim(point, 0.1)
+
+
+    def dense(colors, canvas):
+        return canvas.dimmed(colors, 0.1)
+
+
+    layer.dense = dense
+
+The colors are an array with shape ``(height, width, 4)`` and ``nan`` where a
+point has no color. ``canvas.index(point)`` says where a point is in that array
+and ``canvas.grid`` gives the ``x`` and ``y`` of every position in it.
+
+Layers without a ``dense`` attribute are asked for each point like they are for
+a normal ``Canvas``, but the canvas they are given has the colors from before
+this frame and changes they make to it are not kept.
+
+The ``DenseCanvas`` needs numpy to be installed.
+"""
+
+import time
+from collections import defaultdict
+from collections.abc import MutableMapping
+
+from delfick_project.norms import sb
+from photons_app.errors import PhotonsAppError
+
+from photons_canvas.points import helpers as php
+from photons_canvas.points.canvas import Canvas
+from photons_canvas.points.simple_messages import ColorEncoder
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+available = np is not None
+
+
+class PointLayer:
+    """Adapter that gives a layer that is asked for each point a dense signature"""
+
+    empty = (float("nan"),) * 4
+
+    def __init__(self, layer):
+        self.layer = layer
+
+    def __call__(self, colors, canvas):
+        layer = self.layer
+        empty = self.empty
+
+        rows, cols = canvas._part_indexes()
+        points = canvas._part_points()
+
+        canvas._snapshot = canvas._as_dict()
+        try:
+            cs = []
+            for point in points:
+                color = layer(point, canvas)
+                cs.extend(empty if color is None else color)
+        finally:
+            canvas._snapshot = None
+
+        colors[rows, cols] = np.fromiter(cs, dtype=float, count=len(cs)).reshape(-1, 4)
+        return colors
+
+
+class DensePoints(MutableMapping):
+    """
+    The ``points`` on a ``DenseCanvas``.
+
+    This behaves like the dictionary of ``{(x, y): color}`` on a normal
+    ``Canvas``, but reads from and writes to the arrays on the canvas.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+
+    def get(self, point, dflt=None):
+        found, color = self.canvas._lookup(point)
+        if not found:
+            return dflt
+        return color
+
+    def __getitem__(self, point):
+        found, color = self.canvas._lookup(point)
+        if not found:
+            raise KeyError(point)
+        return color
+
+    def __setitem__(self, point, color):
+        self.canvas._ensure([((point[0], point[0] + 1), (point[1], point[1] - 1), (1, 1))])
+        index = self.canvas.index(point)
+        self.canvas._colors[index] = np.nan if color is None else color
+        self.canvas._present[index] = True
+
+    def __delitem__(self, point):
+        index = self.canvas.index(point)
+        if index is None or not self.canvas._present[index]:
+            raise KeyError(point)
+        self.canvas._colors[index] = np.nan
+        self.canvas._present[index] = False
+
+    def __contains__(self, point):
+        return self.canvas._lookup(point)[0]
+
+    def __iter__(self):
+        left, top = self.canvas._origin
+        for row, col in zip(*np.nonzero(self.canvas._present)):
+            yield (left + int(col), top - int(row))
+
+    def __len__(self):
+        return int(np.count_nonzero(self.canvas._present))
+
+    def __eq__(self, other):
+        if isinstance(other, DensePoints):
+            other = dict(other.items())
+        return dict(self.items()) == other
+
+    def __repr__(self):
+        return f"<DensePoints {dict(self.items())}>"
+
+
+class DenseCanvas(Canvas):
+    is_dense = True
+
+    def __init__(self):
+        if np is None:
+            raise PhotonsAppError("The dense canvas needs numpy to be installed")
+
+        self._origin = (0, 0)
+        self._colors = np.full((0, 0, 4), np.nan)
+        self._present = np.zeros((0, 0), dtype=bool)
+        self._regions = {}
+        self._grid = None
+        self._snapshot = None
+        self._shared_maps = False
+        self._cached_parts = None
+        self._encoder = ColorEncoder()
+        self._points = DensePoints(self)
+
+        super().__init__()
+
+    @property
+    def points(self):
+        if self._snapshot is not None:
+            return self._snapshot
+        return self._points
+
+    @points.setter
+    def points(self, points):
+        self._colors[:] = np.nan
+        self._present[:] = False
+        for point, color in points.items():
+            self._points[point] = color
+
+    @property
+    def colors(self):
+        """The array of colors on this canvas"""
+        return self._colors
+
+    @property
+    def grid(self):
+        """Arrays of the ``x`` and ``y`` for each position in ``colors``"""
+        if self._grid is None:
+            height, width = self._present.shape
+            left, top = self._origin
+            ys, xs = np.mgrid[top : top - height : -1, left : left + width]
+            self._grid = (xs, ys)
+        return self._grid
+
+    def index(self, point):
+        """Return the ``(row, col)`` of this point in ``colors`` or None if it's outside"""
+        left, top = self._origin
+        row = top - point[1]
+        col = point[0] - left
+        height, width = self._present.shape
+        if 0 <= row < height and 0 <= col < width:
+            return row, col
+
+    def region(self, bounds):
+        """Return the slice of ``colors`` that covers these bounds"""
+        region = self._regions.get(bounds)
+        if region is None:
+            (left, right), (top, bottom), _ = bounds
+            row, col = self._origin[1] - top, left - self._origin[0]
+            region = self._regions[bounds] = (slice(row, row + top - bottom), slice(col, col + right - left))
+        return region
+
+    def dimmed(self, colors, change):
+        """
+        The same as ``dim`` for every point in ``colors``. The array is changed
+        in place and returned.
+        """
+        brightness = colors[..., 2] - change
+        dead = np.isnan(colors[..., 0]) | (colors[..., 2] == 0) | (brightness <= 0)
+        colors[..., 2] = np.minimum(brightness, 1)
+        colors[dead] = np.nan
+        return colors
+
+    def clone(self):
+        new = self.__class__()
+        new._parts.update(self._parts)
+        new._devices.update(self._devices)
+
+        new._origin = self._origin
+        new._colors = self._colors.copy()
+        new._present = self._present.copy()
+        new._regions = dict(self._regions)
+        new._cached_parts = self._cached_parts
+        new._encoder = self._encoder
+
+        new.point_to_parts = self.point_to_parts
+        new.point_to_devices = self.point_to_devices
+        new._shared_maps = self._shared_maps = True
+
+        if self.width is not None:
+            new._update_bounds([self.bounds])
+
+        return new
+
+    def msgs(self, layer, acks=False, duration=1, randomize=False, onto=None, resend_every=0.5, counts=None):
+        dense = getattr(layer, "dense", None)
+        if dense is None:
+            dense = PointLayer(layer)
+
+        frame = dense(self._colors.copy(), self)
+
+        rows, cols = self._part_indexes()
+        colors = frame[rows, cols]
+
+        before = time.perf_counter()
+        encoded = self._encoder.pack(colors)
+        if counts is not None:
+            counts.encode_time += time.perf_counter() - before
+
+        cs = [None if h != h else (h, s, b, int(k)) for h, s, b, k in colors.tolist()]
+
+        if onto is not None:
+            if isinstance(onto, DensePoints) and onto.canvas is self:
+                onto.canvas._colors[rows, cols] = colors
+                onto.canvas._present[rows, cols] = True
+            else:
+                for point, c in zip(self._part_points(), cs):
+                    onto[point] = c
+
+        msgs = []
+
+        start = 0
+        for part in self._parts:
+            end = start + php.Points.count_points(part.bounds)
+            for msg in part.msgs(
+                cs[start:end],
+                acks=acks,
+                duration=duration,
+                randomize=randomize,
+                force=False,
+                encoded=encoded[start:end],
+                resend_every=resend_every,
+                counts=counts,
+            ):
+                msgs.append(msg)
+            start = end
+
+        return msgs
+
+    def add_parts(self, *parts, with_colors=False, zero_color=sb.NotSpecified):
+        self._ensure([part[0].bounds if isinstance(part, tuple) else part.bounds for part in parts])
+
+        if self._shared_maps:
+            self.point_to_parts = defaultdict(set, {point: set(ps) for point, ps in self.point_to_parts.items()})
+            self.point_to_devices = defaultdict(set, {point: set(ds) for point, ds in self.point_to_devices.items()})
+            self._shared_maps = False
+
+        self._cached_parts = None
+        super().add_parts(*parts, with_colors=with_colors, zero_color=zero_color)
+
+    def _lookup(self, point):
+        """Return ``(found, color)`` for this point"""
+        index = self.index(point)
+        if index is None:
+            return False, None
+
+        row, col = index
+        if not self._present[row, col]:
+            return False, None
+        h, s, b, k = self._colors[row, col].tolist()
+
+        if h != h:
+            return True, None
+        return True, (h, s, b, int(k))
+
+    def _part_points(self):
+        """Every point in every part, in the order of the parts"""
+        if self._cached_parts is None:
+            points = [point for part in self._parts for point in part.points]
+            rows, cols = np.array([self.index(point) for point in points], dtype=np.intp).reshape(-1, 2).T
+            self._cached_parts = (points, (rows, cols))
+        return self._cached_parts[0]
+
+    def _part_indexes(self):
+        self._part_points()
+        return self._cached_parts[1]
+
+    def _as_dict(self):
+        """The colors on this canvas as a dictionary of ``{(x, y): color}``"""
+        rows, cols = np.nonzero(self._present)
+        left, top = self._origin
+        return {
+            point: None if h != h else (h, s, b, int(k))
+            for point, (h, s, b, k) in zip(
+                zip((cols + left).tolist(), (top - rows).tolist()),
+                self._colors[rows, cols].tolist(),
+            )
+        }
+
+    def _ensure(self, bounds):
+        """Make the arrays big enough to hold all these bounds"""
+        height, width = self._present.shape
+        left, top = self._origin
+        right, bottom = left + width, top - height
+
+        if width == 0:
+            (left, right), (top, bottom), _ = bounds[0]
+
+        for (bl, br), (bt, bb), _ in bounds:
+            left, right = min(left, bl), max(right, br)
+            top, bottom = max(top, bt), min(bottom, bb)
+
+        if (left, top) == self._origin and (top - bottom, right - left) == (height, width):
+            return
+
+        colors = np.full((top - bottom, right - left, 4), np.nan)
+        present = np.zeros((top - bottom, right - left), dtype=bool)
+
+        row, col = top - self._origin[1], self._origin[0] - left
+        colors[row : row + height, col : col + width] = self._colors
+        present[row : row + height, col : col + width] = self._present
+
+        self._origin = (left, top)
+        self._colors = colors
+        self._present = present
+        self._regions.clear()
+        self._cached_parts = None
+        self._grid = None
@@ -1,6 +1,3 @@
-from photons_canvas.points.canvas import Canvas
-
-
 class Separate:
     def rearrange(self, canvas):
         user_x = 0
@@ -24,7 +21,7 @@ class VerticalAlignment:
 
 
 def rearrange(canvas, rearranger, keep_colors=False):
-    new = Canvas()
+    new = canvas.__class__()
 
     parts = []
 
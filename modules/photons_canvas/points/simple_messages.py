@@ -5,11 +5,16 @@ The normal implementation of messages in photons is very flexible and has many
 features. Unfortunately this means that when we want to generate 5 Set64
 messages every 0.075 seconds we can't make them fast enough.
 
-This file contains a more manual implementation of the Set64 message that tries
-to be as efficient as possible to allow us to keep up with the animation.
+This file contains a more manual implementation of the Set64 and
+SetExtendedColorZones messages that tries to be as efficient as possible to
+allow us to keep up with the animation.
+
+Colors are turned into bytes with a ``ColorEncoder``, which does a whole list
+or array of colors at once with numpy if it is installed.
 """
 
 import binascii
+import itertools
 import struct
 
 import bitarray
@@ -19,6 +24,11 @@ from photons_messages import MultiZoneMessages, TileMessages
 from photons_messages.fields import Color
 from photons_protocol.packing import PacketPacking
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 ColorCache = LRU(0xFFFF)
 
 TargetCache = LRU(1000)
@@ -40,6 +50,20 @@ seed_set64 = TileMessages.Set64.create(
 
 seed_set64_bytes = seed_set64.pack().tobytes()
 
+seed_extended = MultiZoneMessages.SetExtendedColorZones.create(
+    source=0,
+    sequence=0,
+    target="d073d5000000",
+    res_required=False,
+    ack_required=True,
+    duration=0,
+    zone_index=0,
+    colors_count=0,
+    colors=[],
+)
+
+seed_extended_bytes = seed_extended.pack().tobytes()
+
 uint16_packer = struct.Struct("<H")
 uint32_packer = struct.Struct("<I")
 
@@ -92,6 +116,99 @@ def fill(color):
     return c
 
 
+class ColorEncoder:
+    """
+    Turns many ``(hue, saturation, brightness, kelvin)`` colors into the bytes
+    for those colors in a message.
+
+    The colors may be a list of tuples with ``None`` for no color, or a numpy
+    array with shape ``(count, 4)`` and ``nan`` for no color. With numpy the
+    colors are converted together with arrays that are made once and used
+    again for each frame.
+
+    Without numpy, and for lists shorter than ``vectorise_from``, each color is
+    packed with ``fill`` instead, which remembers colors it has seen before and
+    is quicker than numpy for a tile worth of colors.
+    """
+
+    vectorise_from = 128
+
+    def __init__(self, count=64):
+        self.count = count
+        self.values = None
+        self.buffer = None
+        if np is not None:
+            self._allocate(count)
+
+    def _allocate(self, count):
+        self.count = count
+        self.values = np.empty((count, 4), dtype=float)
+        self.buffer = np.empty((count, 4), dtype="<u2")
+
+    def encode(self, colors):
+        """Return the bytes for these colors"""
+        if np is None or (not isinstance(colors, np.ndarray) and len(colors) < self.vectorise_from):
+            return b"".join([fill(color) for color in colors])
+        return self.pack(colors).tobytes()
+
+    def pack(self, colors):
+        """
+        Return an array of ``(count, 4)`` unsigned 16 bit numbers for these
+        colors. This array is reused by the next call to ``pack``.
+        """
+        count = len(colors)
+        if count > self.count:
+            self._allocate(count)
+
+        values = self.values[:count]
+        if isinstance(colors, np.ndarray):
+            values[:] = colors
+        elif count:
+            values.reshape(-1)[:] = np.fromiter(
+                itertools.chain.from_iterable([EMPTY if color is None else color for color in colors]),
+                dtype=float,
+                count=count * 4,
+            )
+
+        # The same as ``fill``, but for all the colors at once
+        empty = np.isnan(values[:, 0])
+        if empty.any():
+            values[empty] = 0
+
+        hue = values[:, 0]
+        big_hue = hue >= 0x10000
+        hue /= 360
+
+        values *= MULTIPLY
+        np.trunc(values, out=values)
+        np.maximum(values, 0, out=values)
+
+        wrap = hue >= 0x10000
+        if wrap.any():
+            hue[wrap] %= 0x10000
+        if big_hue.any():
+            hue[big_hue] = 0xFFFF
+
+        np.minimum(values, 0xFFFF, out=values)
+
+        buffer = self.buffer[:count]
+        buffer[:] = values
+        return buffer
+
+
+EMPTY = (float("nan"),) * 4
+
+if np is not None:
+    MULTIPLY = np.array([0x10000, 0xFFFF, 0xFFFF, 1], dtype=float)
+
+encoder = ColorEncoder(82)
+
+
+def encode_colors(colors):
+    """Return the bytes for these colors in a message"""
+    return encoder.encode(colors)
+
+
 class Empty:
     pass
 
@@ -117,14 +234,26 @@ class Payload:
         return self._bts[rng.start + 36 : rng.stop + 36]
 
 
-class Set64:
+class ExtendedColorZonesPayload(Payload):
+    message_type = 510
+
+
+class SimpleMessage:
+    """
+    The header of a LIFX message over a bytearray. Subclasses say what the
+    message is and add properties for their payload.
+    """
+
     Payload = Payload
 
+    seed = None
+    seed_bytes = None
+
     def __init__(self, *, bts=None, set_source=False, **kwargs):
         if bts:
             self._bts = bts
         else:
-            self._bts = bytearray(seed_set64_bytes)
+            self._bts = bytearray(self.seed_bytes)
 
         self.set_source = set_source
         self.payload = Payload(self._bts)
@@ -143,7 +272,7 @@ class Set64:
         return self
 
     def clone(self):
-        return Set64(bts=bytearray(self._bts), set_source=self.set_source)
+        return self.__class__(bts=bytearray(self._bts), set_source=self.set_source)
 
     def tobytes(self, serial=None):
         return bytes(self._bts)
@@ -164,7 +293,7 @@ class Set64:
         self._bts[rng] = value
 
     def __or__(self, other):
-        return seed_set64 | other
+        return self.seed | other
 
     @property
     def size(self):
@@ -310,6 +439,24 @@ class Set64:
     def pkt_type(self, value):
         self[32:34] = uint16_packer.pack(value)
 
+    def _unpack_colors(self, start, count):
+        colors = []
+        for i in range(count):
+            b = bitarray.bitarray(endian="little")
+            b.frombytes(bytes(self.payload[start + i * 8 : start + 8 + i * 8]))
+            colors.append(PacketPacking.unpack(Color, b))
+        return colors
+
+    def _pack_colors(self, start, colors):
+        if not isinstance(colors, bytes | bytearray):
+            colors = encode_colors(colors)
+        self.payload[start : start + len(colors)] = colors
+
+
+class Set64(SimpleMessage):
+    seed = seed_set64
+    seed_bytes = seed_set64_bytes
+
     @property
     def tile_index(self):
         return self.payload[0]
@@ -360,19 +507,70 @@ class Set64:
 
     @property
     def colors(self):
-        colors = []
-        for i in range(64):
-            b = bitarray.bitarray(endian="little")
-            b.frombytes(bytes(self.payload[10 + i * 8 : 18 + i * 8]))
-            colors.append(PacketPacking.unpack(Color, b))
-        return colors
+        return self._unpack_colors(10, 64)
 
     @colors.setter
     def colors(self, colors):
-        b = b""
-        for color in colors:
-            b += fill(color)
-        self.payload[10 : 10 + len(colors) * 8] = b
+        """Set colors from a list of colors, an array of colors or bytes from a ``ColorEncoder``"""
+        self._pack_colors(10, colors)
+
+
+class SetExtendedColorZones(SimpleMessage):
+    Payload = ExtendedColorZonesPayload
+
+    seed = seed_extended
+    seed_bytes = seed_extended_bytes
+
+    @property
+    def duration(self):
+        return uint32_packer.unpack(self.payload[0:4])[0] / 1000
+
+    @duration.setter
+    def duration(self, value):
+        self.payload[0:4] = uint32_packer.pack(int(value * 1000))
+
+    @property
+    def apply(self):
+        return self.payload[4]
+
+    @apply.setter
+    def apply(self, value):
+        self.payload[4] = value
+
+    @property
+    def zone_index(self):
+        return uint16_packer.unpack(self.payload[5:7])[0]
+
+    @zone_index.setter
+    def zone_index(self, value):
+        self.payload[5:7] = uint16_packer.pack(value)
+
+    @property
+    def colors_count(self):
+        return self.payload[7]
+
+    @colors_count.setter
+    def colors_count(self, value):
+        self.payload[7] = value
+
+    @property
+    def colors(self):
+        return self._unpack_colors(8, 82)
+
+    @colors.setter
+    def colors(self, colors):
+        """Set colors from a list of colors, an array of colors or bytes from a ``ColorEncoder``"""
+        self._pack_colors(8, colors[:82])
+
+
+class PackedMessage(SimpleMessage):
+    """
+    A message that was packed somewhere else, like the process that made the
+    frame for an animation. Only the header of this message can be changed.
+    """
+
+    def __or__(self, other):
+        return self.pkt_type == other.Payload.message_type
 
 
 class MultizoneMessagesMaker:
@@ -440,20 +638,17 @@ class MultizoneMessagesMaker:
         return msgs
 
     def make_new_messages(self):
-        if not self.colors:
+        if not len(self.colors):
             return
 
-        colors = []
-        for c in self.colors:
-            if isinstance(c, dict) or getattr(c, "is_dict", False):
-                colors.append(c)
-            else:
-                colors.append(Color(*c))
+        colors = self.colors
+        if isinstance(colors, list) and any(isinstance(c, dict) or getattr(c, "is_dict", False) for c in colors):
+            colors = [(c["hue"], c["saturation"], c["brightness"], c["kelvin"]) for c in colors]
 
         return (
-            MultiZoneMessages.SetExtendedColorZones(
+            SetExtendedColorZones(
                 duration=self.duration,
-                colors_count=len(self.colors),
+                colors_count=min(len(colors), 82),
                 colors=colors,
                 target=self.serial,
                 zone_index=self.zone_index,
@@ -463,4 +658,11 @@ class MultizoneMessagesMaker:
         )
 
 
-__all__ = ["Set64", "MultizoneMessagesMaker"]
+__all__ = [
+    "Set64",
+    "SetExtendedColorZones",
+    "PackedMessage",
+    "MultizoneMessagesMaker",
+    "ColorEncoder",
+    "encode_colors",
+]
@@ -63,8 +63,12 @@ class find_devices(task.Task):
 
         async with self.target.session() as sender:
             _, serials = await self.reference.find(sender, timeout=20, broadcast=broadcast)
-            for serial in serials:
-                print(serial)
+            with self.photons_app.ndjson_writer() as writer:
+                for serial in serials:
+                    if writer is not None:
+                        writer.write({"serial": serial})
+                    else:
+                        print(serial)
 
 
 @task
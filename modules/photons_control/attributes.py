@@ -64,11 +64,14 @@ class attr(task.Task):
             self.reference.raise_on_missing(found)
 
             msg = kls.create(extra)
-            async for pkt in sender(msg, serials, **kwargs):
-                if len(serials) == 1:
-                    print(repr(pkt.payload))
-                else:
-                    print(f"{pkt.serial}: {repr(pkt.payload)}")
+            with self.photons_app.ndjson_writer() as writer:
+                async for pkt in sender(msg, serials, **kwargs):
+                    if writer is not None:
+                        writer.write({"serial": pkt.serial, "pkt_type": pkt.__class__.__name__, "payload": pkt.payload.as_dict()})
+                    elif len(serials) == 1:
+                        print(repr(pkt.payload))
+                    else:
+                        print(f"{pkt.serial}: {repr(pkt.payload)}")
 
 
 @task
@@ -174,20 +177,25 @@ class get_effects(task.Task):
         async with self.target.session() as sender:
             plans = sender.make_plans("firmware_effects")
 
-            async for serial, _, info in sender.gatherer.gather(plans, self.reference):
-                if info is Skip:
-                    continue
-
-                print(f"{serial}: {info['type']}")
-                for field, value in info["options"].items():
-                    if field == "palette":
-                        if value:
-                            print("\tpalette:")
-                            for c in value:
-                                print(f"\t\t{repr(c)}")
-                    else:
-                        print(f"\t{field}: {value}")
-                print()
+            with self.photons_app.ndjson_writer() as writer:
+                async for serial, _, info in sender.gatherer.gather(plans, self.reference):
+                    if info is Skip:
+                        continue
+
+                    if writer is not None:
+                        writer.write({"serial": serial, "type": info["type"], "options": info["options"]})
+                        continue
+
+                    print(f"{serial}: {info['type']}")
+                    for field, value in info["options"].items():
+                        if field == "palette":
+                            if value:
+                                print("\tpalette:")
+                                for c in value:
+                                    print(f"\t\t{repr(c)}")
+                        else:
+                            print(f"\t{field}: {value}")
+                    print()
 
 
 @task
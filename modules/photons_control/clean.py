@@ -131,8 +131,15 @@ class get_clean_config(task.Task):
     async def execute_task(self, **kwargs):
         async with self.target.session() as sender:
             plans = sender.make_plans("hev_config")
-            async for serial, _, info in sender.gatherer.gather(plans, self.reference, **kwargs):
-                if info is not Skip:
+            with self.photons_app.ndjson_writer() as writer:
+                async for serial, _, info in sender.gatherer.gather(plans, self.reference, **kwargs):
+                    if info is Skip:
+                        continue
+
+                    if writer is not None:
+                        writer.write({"serial": serial, **info})
+                        continue
+
                     indicator = "yes" if info["indication"] else "no"
                     duration_s = humanize_duration(info["duration_s"])
                     print(serial)
@@ -191,8 +198,15 @@ class get_clean_status(task.Task):
     async def execute_task(self, **kwargs):
         async with self.target.session() as sender:
             plans = sender.make_plans("hev_status")
-            async for serial, _, info in sender.gatherer.gather(plans, self.reference, **kwargs):
-                if info is not Skip:
+            with self.photons_app.ndjson_writer() as writer:
+                async for serial, _, info in sender.gatherer.gather(plans, self.reference, **kwargs):
+                    if info is Skip:
+                        continue
+
+                    if writer is not None:
+                        writer.write({"serial": serial, **info})
+                        continue
+
                     print(serial)
                     if info["current"]["active"]:
                         power_state = "off" if info["current"]["last_power"] == 0 else "on"
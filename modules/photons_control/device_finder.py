@@ -9,6 +9,7 @@ import re
 import sys
 import time
 import traceback
+from collections import namedtuple
 from functools import partial
 from urllib.parse import parse_qs
 
@@ -86,8 +87,12 @@ class device_finder_serials(DeviceFinderTask):
 
             _, serials = await device_finder.find(sender, timeout=5)
 
-            for serial in serials:
-                print(serial)
+            with self.photons_app.ndjson_writer() as writer:
+                for serial in serials:
+                    if writer is not None:
+                        writer.write({"serial": serial})
+                    else:
+                        print(serial)
 
 
 @task
@@ -104,9 +109,14 @@ class device_finder_info(DeviceFinderTask):
         async with self.target.session() as sender:
             device_finder = await self.make_device_finder(sender)
 
-            async for device in device_finder.info(sender):
-                print(device.serial)
-                print("\n".join(f"  {line}" for line in json.dumps(device.info, sort_keys=True, indent="  ").split("\n")))
+            with self.photons_app.ndjson_writer() as writer:
+                async for device in device_finder.info(sender):
+                    if writer is not None:
+                        writer.write(device.info)
+                        continue
+
+                    print(device.serial)
+                    print("\n".join(f"  {line}" for line in json.dumps(device.info, sort_keys=True, indent="  ").split("\n")))
 
 
 regexes = {"key_value": re.compile(r"^(?P<key>[\w_]+)=(?P<value>.+)")}
@@ -144,13 +154,21 @@ class Collections:
     """
     A collection of collections!
 
-    This knows about groups and locations.
+    This knows about groups and locations, and the firmware versions devices
+    have so that devices with the same firmware share one object.
     """
 
     def __init__(self):
+        self.firmwares = {}
         self.collections = {"group": {}, "location": {}}
         self.collection_spec = Collection.FieldSpec()
 
+    def add_firmware(self, major, minor, build):
+        key = (major, minor, build)
+        if key not in self.firmwares:
+            self.firmwares[key] = hp.Firmware(major, minor, build)
+        return self.firmwares[key]
+
     def add_group(self, uuid, updated_at, label):
         return self.add_collection("group", uuid, updated_at, label)
 
@@ -483,6 +501,235 @@ class InfoPoints(enum.Enum):
     LOCATION = Point(DeviceMessages.GetLocation(), ["location_id", "location_name"], 60)
 
 
+class DeviceIndex:
+    """
+    Remembers which devices have which values for the fields that filters
+    usually ask for so that a filter can find devices without looking at
+    every device.
+
+    ``by[field][value]`` is the set of serials that have that value. Devices
+    that don't know that field yet are under ``sb.NotSpecified`` because a
+    filter doesn't exclude a device for a field it doesn't know.
+    """
+
+    point_fields = {
+        InfoPoints.VERSION: ("product_id", "cap"),
+        InfoPoints.FIRMWARE: ("cap",),
+        InfoPoints.LIGHT_STATE: ("label", "power"),
+        InfoPoints.LABEL: ("label",),
+        InfoPoints.GROUP: ("group_id",),
+        InfoPoints.LOCATION: ("location_id",),
+    }
+
+    fields = ("label", "power", "group_id", "location_id", "product_id", "cap")
+
+    def __init__(self):
+        self.by = {field: {} for field in self.fields}
+        self.values = {}
+
+    def add(self, device):
+        self.values[device.serial] = {}
+        self.update(device)
+
+    def update(self, device, point=None):
+        """Index the fields on this device that may have changed from this point"""
+        values = self.values.get(device.serial)
+        if values is None:
+            return
+
+        fields = self.fields if point is None else self.point_fields.get(point, ())
+        for field in fields:
+            val = device["abilities" if field == "cap" else field]
+            keys = (val,) if val is sb.NotSpecified or not isinstance(val, list) else tuple(val)
+
+            old = values.get(field)
+            if old == keys:
+                continue
+
+            if old is not None:
+                self._discard(field, old, device.serial)
+
+            values[field] = keys
+            for key in keys:
+                self.by[field].setdefault(key, set()).add(device.serial)
+
+    def remove(self, serial):
+        values = self.values.pop(serial, None)
+        if values is not None:
+            for field, keys in values.items():
+                self._discard(field, keys, serial)
+
+    def _discard(self, field, keys, serial):
+        by = self.by[field]
+        for key in keys:
+            serials = by.get(key)
+            if serials is not None:
+                serials.discard(serial)
+                if not serials:
+                    del by[key]
+
+    def candidates(self, fltr, serials):
+        """
+        Return the serials from those provided that may match this filter.
+
+        The devices still need to be checked with ``matches_fltr`` for the
+        fields that aren't indexed.
+        """
+        found = set(serials)
+        if fltr.has("serial"):
+            found.intersection_update(fltr.serial)
+
+        for field in self.fields:
+            if not found:
+                break
+
+            if not fltr.has(field):
+                continue
+
+            by = self.by[field]
+            matching = set(by.get(sb.NotSpecified, ()))
+
+            if field in fltr.label_fields:
+                # Labels are matched with fnmatch, which allows wildcards and
+                # may ignore case, so ask the filter about each label we know
+                for key, keyed in by.items():
+                    if key is not sb.NotSpecified and fltr.matches(field, key):
+                        matching.update(keyed)
+            else:
+                for w in fltr[field]:
+                    matching.update(by.get(w, ()))
+
+            found.intersection_update(matching)
+
+        return found
+
+
+class ChangeKind(enum.Enum):
+    ADDED = "added"
+    REMOVED = "removed"
+    CHANGED = "changed"
+
+
+# changes is {field: (old, new)} for CHANGED events and empty otherwise
+DeviceChange = namedtuple("DeviceChange", ["kind", "serial", "changes"])
+
+
+class DeviceChanges:
+    """
+    Gives DeviceChange events to anything that has subscribed to them.
+
+    .. code-block:: python
+
+        async with finder.changes.subscribe() as queue:
+            async for change in queue:
+                print(change.kind, change.serial, change.changes)
+
+    ``version`` goes up by one for every event so that something can tell if
+    anything has changed since it last looked.
+    """
+
+    fields = (
+        "label",
+        "power",
+        "hue",
+        "saturation",
+        "brightness",
+        "kelvin",
+        "group_id",
+        "group_name",
+        "location_id",
+        "location_name",
+        "firmware_version",
+        "product_id",
+    )
+
+    def __init__(self, final_future):
+        self.final_future = final_future
+        self.queues = []
+        self.version = 0
+
+    def snapshot(self, device):
+        return {field: device[field] for field in self.fields}
+
+    def changed(self, device, before):
+        changes = {}
+        for field, old in before.items():
+            new = device[field]
+            if new != old:
+                changes[field] = (old, new)
+
+        if changes:
+            self.publish(DeviceChange(ChangeKind.CHANGED, device.serial, changes))
+
+    def publish(self, change):
+        self.version += 1
+        for queue in self.queues:
+            queue.append(change)
+
+    @hp.asynccontextmanager
+    async def subscribe(self):
+        queue = hp.Queue(self.final_future, name="DeviceChanges::subscribe[queue]")
+        self.queues.append(queue)
+        try:
+            yield queue
+        finally:
+            self.queues.remove(queue)
+            await queue.finish()
+
+
+class PointTime:
+    """
+    The time we last got a point of information from a device.
+
+    This has the parts of the future interface the finder uses, without
+    needing an asyncio future for every point of every device. Callbacks are
+    called straight away when a result is set.
+    """
+
+    __slots__ = ("value", "callbacks")
+
+    def __init__(self):
+        self.value = sb.NotSpecified
+        self.callbacks = None
+
+    def done(self):
+        return self.value is not sb.NotSpecified
+
+    def result(self):
+        if self.value is sb.NotSpecified:
+            raise hp.InvalidStateError("Result is not set.")
+        return self.value
+
+    def reset(self):
+        self.value = sb.NotSpecified
+
+    def set_result(self, value):
+        if self.value is not sb.NotSpecified:
+            raise hp.InvalidStateError("invalid state")
+        self.value = value
+
+        callbacks, self.callbacks = self.callbacks, None
+        for callback in callbacks or ():
+            callback(self)
+
+    def add_done_callback(self, callback):
+        if self.value is not sb.NotSpecified:
+            callback(self)
+        elif self.callbacks is None:
+            self.callbacks = [callback]
+        else:
+            self.callbacks.append(callback)
+
+    def remove_done_callback(self, callback):
+        if self.callbacks and callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def __repr__(self):
+        if self.value is sb.NotSpecified:
+            return "<PointTime pending>"
+        return f"<PointTime {self.value}>"
+
+
 class Device(dictobj.Spec):
     """
     An object representing a single device.
@@ -510,9 +757,11 @@ class Device(dictobj.Spec):
 
     def setup(self, *args, **kwargs):
         super().setup(*args, **kwargs)
-        self.point_futures = {e: hp.ResettableFuture(name=f"Device({self.serial})::setup[point_futures.{e.name}]") for e in InfoPoints}
-        self.point_futures[None] = hp.ResettableFuture(name=f"Device::setup({self.serial})[point_futures.None]")
-        self.refreshing = hp.ResettableFuture(name=f"Device({self.serial})::[refreshing]")
+        self.point_futures = {e: PointTime() for e in InfoPoints}
+        self.point_futures[None] = PointTime()
+        self.refreshing = PointTime()
+        self.index = None
+        self.changes = None
 
     @hp.memoized_property
     def final_future(self):
@@ -609,8 +858,20 @@ class Device(dictobj.Spec):
 
         We return a InfoPoints enum representing what type of information was set.
         """
+        before = None
+        if self.changes is not None:
+            before = self.changes.snapshot(self)
+
+        point = self._set_from_pkt(pkt, collections)
+        if self.index is not None and point is not None:
+            self.index.update(self, point)
+        if before is not None and point is not None:
+            self.changes.changed(self, before)
+        return point
+
+    def _set_from_pkt(self, pkt, collections):
         if pkt | LightMessages.LightState:
-            self.label = pkt.label
+            self.label = sys.intern(pkt.label)
             self.power = "off" if pkt.power == 0 else "on"
             self.hue = pkt.hue
             self.saturation = pkt.saturation
@@ -619,7 +880,7 @@ class Device(dictobj.Spec):
             return InfoPoints.LIGHT_STATE
 
         elif pkt | DeviceMessages.StateLabel:
-            self.label = pkt.label
+            self.label = sys.intern(pkt.label)
             return InfoPoints.LABEL
 
         elif pkt | DeviceMessages.StateGroup:
@@ -633,7 +894,7 @@ class Device(dictobj.Spec):
             return InfoPoints.LOCATION
 
         elif pkt | DeviceMessages.StateHostFirmware:
-            self.firmware = hp.Firmware(pkt.version_major, pkt.version_minor, pkt.build)
+            self.firmware = collections.add_firmware(pkt.version_major, pkt.version_minor, pkt.build)
             return InfoPoints.FIRMWARE
 
         elif pkt | DeviceMessages.StateVersion:
@@ -673,6 +934,16 @@ class Device(dictobj.Spec):
             return sb.NotSpecified
         return self.cap.product.friendly
 
+    def has_points_for(self, fltr):
+        """Say whether we already have all the information this filter needs"""
+        for e in InfoPoints:
+            if any(fltr.has(key) for key in e.value.keys) or fltr.matches_all:
+                if e.value.condition and not e.value.condition(self):
+                    continue
+                if not self.point_futures[e].done():
+                    return False
+        return True
+
     def points_from_fltr(self, fltr):
         """Return the relevant messages from this filter"""
         for e in InfoPoints:
@@ -811,6 +1082,127 @@ class Device(dictobj.Spec):
         return self.matches_fltr(fltr)
 
 
+class RefreshScheduler:
+    """
+    Refreshes information on all the devices in a finder from one loop rather
+    than a loop per device.
+
+    Every ``slot`` seconds we find the points on each device that are due for a
+    refresh and send up to ``messages_per_second * slot`` of them with one
+    sender call. The most overdue points are sent first, so when more points
+    are due than we may send, the rest are sent in the following slots and the
+    refreshes end up spread across the interval.
+
+    After each slot ``staleness`` is the age in seconds of the oldest
+    information we have for each point and ``waiting`` is how many points were
+    due but left for a following slot.
+    """
+
+    def __init__(self, sender, finder, *, messages_per_second, time_between_queries=None, final_future=None, slot=1):
+        self.slot = slot
+        self.sender = sender
+        self.finder = finder
+        self.budget = max(1, int(messages_per_second * slot))
+        self.final_future = hp.ChildOfFuture(final_future or finder.final_future, name="RefreshScheduler::__init__[final_future]")
+
+        time_between_queries = time_between_queries or {}
+        self.refreshes = {}
+        for e in InfoPoints:
+            if e.value.refresh is None:
+                self.refreshes[e] = None
+            else:
+                self.refreshes[e] = time_between_queries.get(e.name, e.value.refresh)
+
+        self.inflight = set()
+
+        self.sent = 0
+        self.waiting = 0
+        self.staleness = {e.name: 0 for e in InfoPoints}
+
+    async def run(self):
+        async with hp.TaskHolder(self.final_future, name="RefreshScheduler::run[ts]") as ts:
+            async with hp.tick(self.slot, final_future=self.final_future, name="RefreshScheduler::run[tick]") as ticks:
+                async for _ in ticks:
+                    chosen = self.next_slot()
+                    if chosen:
+                        ts.add(self.send(chosen))
+
+    def next_slot(self):
+        """Return ``[(serial, point), ...]`` to send in this slot"""
+        now = time.time()
+        due = []
+        staleness = {e.name: 0 for e in InfoPoints}
+
+        for serial, device in sorted(self.finder.devices.items()):
+            if serial not in self.sender.found:
+                continue
+            for e, overdue in self._due(device, now, staleness):
+                due.append((overdue, serial, e))
+
+        due.sort(key=lambda d: -d[0])
+        chosen = [(serial, e) for _, serial, e in due[: self.budget]]
+
+        self.inflight.update(chosen)
+        self.staleness = staleness
+        self.waiting = len(due) - len(chosen)
+        if self.waiting:
+            log.debug(hp.lc("Not all due information could be refreshed this slot", waiting=self.waiting))
+
+        return chosen
+
+    def _due(self, device, now, staleness):
+        # We need to know what kind of product the device is before we know what else to ask it
+        has_version = device.point_futures[InfoPoints.VERSION].done()
+
+        for e, refresh in self.refreshes.items():
+            if e is not InfoPoints.VERSION and not has_version:
+                continue
+
+            if e.value.condition and not e.value.condition(device):
+                continue
+
+            fut = device.point_futures[e]
+            if fut.done():
+                age = now - fut.result()
+                staleness[e.name] = max(staleness[e.name], age)
+                if refresh is None or age < refresh:
+                    continue
+                overdue = age - refresh
+            else:
+                overdue = float("inf")
+
+            if (device.serial, e) not in self.inflight:
+                yield e, overdue
+
+    async def send(self, chosen):
+        msgs = []
+        for serial, e in chosen:
+            msg = e.value.msg.clone()
+            msg.target = serial
+            msgs.append(msg)
+
+        def error(e):
+            log.error(hp.lc("Failed to refresh information", error=e))
+
+        self.sent += len(msgs)
+
+        try:
+            async for pkt in self.sender(msgs, error_catcher=error, limit=self.finder.limit, find_timeout=5):
+                if pkt | CoreMessages.StateUnhandled:
+                    continue
+
+                device = self.finder.devices.get(pkt.serial)
+                if device is None:
+                    continue
+
+                point = device.set_from_pkt(pkt, self.finder.collections)
+                if point is not None:
+                    device.point_futures[point].reset()
+                    device.point_futures[point].set_result(time.time())
+        finally:
+            self.inflight.difference_update(chosen)
+
+
 class DeviceFinderDaemon(hp.AsyncCMMixin):
     def __init__(
         self,
@@ -821,18 +1213,34 @@ class DeviceFinderDaemon(hp.AsyncCMMixin):
         forget_after=30,
         final_future=None,
         search_interval=20,
+        max_search_interval=None,
         time_between_queries=None,
+        messages_per_second=None,
     ):
         self.sender = sender
         self.search_interval = search_interval
+        self.max_search_interval = max_search_interval
         self.time_between_queries = time_between_queries
 
+        self.last_search = None
+        self.current_search_interval = search_interval
+
         final_future = final_future or sender.stop_fut
         self.final_future = hp.ChildOfFuture(final_future, name="DeviceFinderDaemon::__init__[final_future]")
 
         self.own_finder = not bool(finder)
         self.finder = finder or Finder(self.sender, self.final_future, forget_after=forget_after, limit=limit)
 
+        self.refresh_scheduler = None
+        if messages_per_second:
+            self.refresh_scheduler = RefreshScheduler(
+                self.sender,
+                self.finder,
+                messages_per_second=messages_per_second,
+                time_between_queries=time_between_queries,
+                final_future=self.final_future,
+            )
+
         self.ts = hp.TaskHolder(self.final_future, name="DeviceFinderDaemon::__init__[ts]")
         self.hp_tick = hp.tick
 
@@ -841,6 +1249,8 @@ class DeviceFinderDaemon(hp.AsyncCMMixin):
 
     async def start(self):
         self.ts.add(self.search_loop())
+        if self.refresh_scheduler is not None:
+            self.ts.add(self.refresh_scheduler.run())
         return self
 
     async def finish(self, exc_typ=None, exc=None, tb=None):
@@ -859,14 +1269,22 @@ class DeviceFinderDaemon(hp.AsyncCMMixin):
 
             refreshing.set_result(True)
 
+            serials = set()
             async for device in self.finder.find(refresh_discovery_fltr):
+                serials.add(device.serial)
+                if self.refresh_scheduler is not None:
+                    continue
                 await streamer.add_coroutine(
                     device.refresh_information_loop(self.sender, self.time_between_queries, self.finder.collections),
                     context=device,
                 )
 
+            self.searched(ticker, serials)
+
+        ticker = self.hp_tick(self.search_interval, final_future=self.final_future)
+
         async def ticks():
-            async with self.hp_tick(self.search_interval, final_future=self.final_future) as ticks:
+            async with ticker as ticks:
                 async for info in ticks:
                     yield info
 
@@ -885,6 +1303,25 @@ class DeviceFinderDaemon(hp.AsyncCMMixin):
                     refreshing.reset()
                     await streamer.add_coroutine(add(streamer))
 
+    def searched(self, ticker, serials):
+        """
+        Double the time till the next search if we found the same devices as
+        last time, up to max_search_interval, or go back to search_interval if
+        the devices have changed.
+        """
+        if not self.max_search_interval:
+            return
+
+        interval = self.search_interval
+        if serials and serials == self.last_search:
+            interval = min(self.max_search_interval, self.current_search_interval * 2)
+        self.last_search = serials
+
+        if interval != self.current_search_interval:
+            log.info(hp.lc("Changing time between searches", search_interval=interval))
+            self.current_search_interval = interval
+            ticker.change_after(interval)
+
     async def serials(self, fltr):
         async for device in self.finder.find(fltr):
             yield device
@@ -893,6 +1330,12 @@ class DeviceFinderDaemon(hp.AsyncCMMixin):
         async for device in self.finder.info(fltr):
             yield device
 
+    async def changes(self):
+        """Yield DeviceChange events as devices are added, removed and changed"""
+        async with self.finder.changes.subscribe() as queue:
+            async for change in queue:
+                yield change
+
 
 class Finder(hp.AsyncCMMixin):
     def __init__(self, sender, final_future=None, *, forget_after=30, limit=30):
@@ -907,7 +1350,10 @@ class Finder(hp.AsyncCMMixin):
         self.last_seen = {}
         self.searched = hp.ResettableFuture(name="Finder::__init__[searched]")
         self.collections = Collections()
+        self.device_spec = Device.FieldSpec()
+        self.index = DeviceIndex()
         self.final_future = hp.ChildOfFuture(final_future or self.sender.stop_fut, name="Finder::__init__[final_future]")
+        self.changes = DeviceChanges(self.final_future)
 
     async def find(self, fltr):
         if self.final_future.done():
@@ -924,6 +1370,12 @@ class Finder(hp.AsyncCMMixin):
             serials = []
 
         removed = self._ensure_devices(serials)
+        matched, unknown = self._from_index(fltr)
+
+        if not removed and not unknown:
+            for device in matched:
+                yield device
+            return
 
         catcher = partial(log_errors, "Failed to determine if device matched filter")
 
@@ -931,16 +1383,14 @@ class Finder(hp.AsyncCMMixin):
             for device in removed:
                 await streamer.add_coroutine(device.finish())
 
-            for serial, device in list(self.devices.items()):
-                if fltr.matches_all:
-                    fut = hp.create_future(name=f"Finder({serial})::find[fut]")
-                    fut.set_result(True)
-                    await streamer.add_task(fut, context=device)
-                else:
-                    await streamer.add_coroutine(device.matches(self.sender, fltr, self.collections), context=device)
+            for device in unknown:
+                await streamer.add_coroutine(device.matches(self.sender, fltr, self.collections), context=device)
 
             streamer.no_more_work()
 
+            for device in matched:
+                yield device
+
             async with streamer:
                 async for result in streamer:
                     if result.successful and result.value and result.context:
@@ -983,6 +1433,7 @@ class Finder(hp.AsyncCMMixin):
             for serial, device in sorted(self.devices.items()):
                 ts.add(device.finish(exc_typ, exc, tb))
                 del self.devices[serial]
+                self.index.remove(serial)
 
     async def start(self):
         return self
@@ -1002,16 +1453,49 @@ class Finder(hp.AsyncCMMixin):
 
         return serials
 
+    def _from_index(self, fltr):
+        """
+        Return ``(matched, unknown)`` where matched are the devices we already
+        know match this filter and unknown are the devices that need to ask for
+        more information before we know.
+        """
+        devices = list(self.devices.values())
+
+        if fltr.matches_all:
+            return devices, []
+
+        if fltr.refresh_info:
+            return [], devices
+
+        known = []
+        unknown = []
+        for device in devices:
+            if device.has_points_for(fltr):
+                known.append(device)
+            else:
+                unknown.append(device)
+
+        candidates = self.index.candidates(fltr, [device.serial for device in known])
+        return [device for device in known if device.serial in candidates and device.matches_fltr(fltr)], unknown
+
     def _ensure_devices(self, serials):
         removed = []
 
         if self.final_future.done():
             return []
 
+        capability_cache = getattr(self.sender, "capability_cache", None)
+
         for serial in serials:
             if serial not in self.devices:
-                device = Device.FieldSpec().empty_normalise(serial=serial, limit=self.limit)
+                device = self.device_spec.empty_normalise(serial=serial, limit=self.limit)
+                device.index = self.index
+                device.changes = self.changes
+                self.index.add(device)
                 self.devices[serial] = device
+                self.changes.publish(DeviceChange(ChangeKind.ADDED, serial, {}))
+                if capability_cache is not None:
+                    self._from_capability_cache(device, capability_cache)
             self.last_seen[serial] = time.time()
 
         for serial, device in list(self.devices.items()):
@@ -1019,6 +1503,15 @@ class Finder(hp.AsyncCMMixin):
                 del self.devices[serial]
                 if serial in self.last_seen:
                     del self.last_seen[serial]
+                self.index.remove(serial)
+                self.changes.publish(DeviceChange(ChangeKind.REMOVED, serial, {}))
                 removed.append(device)
 
         return removed
+
+    def _from_capability_cache(self, device, capability_cache):
+        """Use the product and firmware we remember for this device so we don't ask for them"""
+        for pkt in capability_cache.packets(device.serial):
+            point = device.set_from_pkt(pkt, self.collections)
+            device.point_futures[point].reset()
+            device.point_futures[point].set_result(time.time())
@@ -310,10 +310,15 @@ class get_zones(task.Task):
 
     async def execute_task(self, **kwargs):
         async with self.target.session() as sender:
-            async for serial, zones in zones_from_reference(self.reference, sender):
-                print(serial)
-                for zone, color in zones:
-                    print(f"\tZone {zone}: {repr(color)}")
+            with self.photons_app.ndjson_writer() as writer:
+                async for serial, zones in zones_from_reference(self.reference, sender):
+                    if writer is not None:
+                        writer.write({"serial": serial, "zones": [{"zone": zone, "color": color} for zone, color in zones]})
+                        continue
+
+                    print(serial)
+                    for zone, color in zones:
+                        print(f"\tZone {zone}: {repr(color)}")
 
 
 @task
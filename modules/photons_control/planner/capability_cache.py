@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import time
+
+from photons_app import helpers as hp
+from photons_messages import DeviceMessages
+
+log = logging.getLogger("photons_control.planner.capability_cache")
+
+
+class CapabilityCache:
+    """
+    Remembers the product and firmware of devices so that they don't need to be
+    asked for them every time photons starts.
+
+    The file is json of
+    ``{serial: {"vendor": <int>, "product": <int>, "firmware": {"build": <int>, "version_major": <int>, "version_minor": <int>}, "seen": <float>}}``
+
+    It is kept up to date with ``saw``, which is given every packet the session
+    receives. If a device reports different firmware to what we remember then
+    everything we remember about that device is forgotten and learnt again.
+
+    ``seen`` is when the device last told us its firmware. We stop using what we
+    remember about a device ``max_age`` seconds after that so that a device is
+    asked for its firmware again even if photons only ever uses what we
+    remember. ``seen`` is only written again when it is more than
+    ``refresh_after`` seconds old so that the file isn't written for every
+    reply from the device.
+
+    Changes are written to the file ``save_after`` seconds after they are made
+    so that discovering many devices doesn't write the file for every device.
+    """
+
+    save_after = 1
+    max_age = 60 * 60 * 24
+    refresh_after = 60 * 60
+
+    get_version_key = DeviceMessages.GetVersion().Key
+    get_host_firmware_key = DeviceMessages.GetHostFirmware().Key
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+        self._devices = None
+
+    @property
+    def devices(self):
+        if self._devices is None:
+            self._devices = self.load()
+        return self._devices
+
+    def load(self):
+        try:
+            with open(self.path) as fle:
+                devices = json.load(fle)
+        except FileNotFoundError:
+            return {}
+        except (OSError, TypeError, ValueError) as error:
+            log.warning(hp.lc("Failed to read capability cache", path=self.path, error=error))
+            return {}
+
+        if not isinstance(devices, dict):
+            log.warning(hp.lc("Capability cache wasn't a dictionary", path=self.path))
+            return {}
+
+        loaded = {}
+        for serial, info in devices.items():
+            try:
+                entry = {}
+                if "product" in info:
+                    entry["vendor"] = int(info["vendor"])
+                    entry["product"] = int(info["product"])
+                if "firmware" in info:
+                    entry["firmware"] = {k: int(info["firmware"][k]) for k in ("build", "version_major", "version_minor")}
+                    entry["seen"] = float(info.get("seen", 0))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                log.warning(hp.lc("Ignoring invalid entry in capability cache", path=self.path, serial=serial))
+                continue
+
+            if entry:
+                loaded[serial] = entry
+
+        return loaded
+
+    def saw(self, pkt):
+        """Remember the product or firmware from this packet if it has either"""
+        if pkt | DeviceMessages.StateVersion:
+            info = self.devices.setdefault(pkt.serial, {})
+            if info.get("vendor") != pkt.vendor or info.get("product") != pkt.product:
+                info["vendor"] = pkt.vendor
+                info["product"] = pkt.product
+                self.changed()
+
+        elif pkt | DeviceMessages.StateHostFirmware:
+            firmware = {
+                "build": pkt.build,
+                "version_major": pkt.version_major,
+                "version_minor": pkt.version_minor,
+            }
+
+            now = time.time()
+            info = self.devices.get(pkt.serial)
+            if info is not None and info.get("firmware") == firmware:
+                if now - info.get("seen", 0) > self.refresh_after:
+                    info["seen"] = now
+                    self.changed()
+                return
+
+            if info is not None and "firmware" in info:
+                log.info(hp.lc("Device has different firmware to what we remember", serial=pkt.serial))
+                info = None
+
+            if info is None:
+                info = self.devices[pkt.serial] = {}
+
+            info["firmware"] = firmware
+            info["seen"] = now
+            self.changed()
+
+    def known(self, serial):
+        """
+        Return what we remember about this device if we know both it's product
+        and firmware and it told us that firmware recently enough
+        """
+        info = self.devices.get(serial)
+        if not info or "product" not in info or "firmware" not in info:
+            return None
+        if time.time() - info.get("seen", 0) > self.max_age:
+            return None
+        return info
+
+    def seen(self, serial):
+        """Return when this device last told us its firmware"""
+        info = self.devices.get(serial)
+        if info is None:
+            return None
+        return info.get("seen", 0)
+
+    def packets(self, serial):
+        """Return the StateVersion and StateHostFirmware we remember for this device"""
+        if self.known(serial) is None:
+            return []
+        return [self.reply(self.get_version_key, serial), self.reply(self.get_host_firmware_key, serial)]
+
+    def reply(self, key, serial):
+        """
+        Return the reply we remember for this device for a message with this
+        Key, or None if we don't have one
+        """
+        info = self.known(serial)
+        if info is None:
+            return None
+
+        if key == self.get_version_key:
+            sender_message = DeviceMessages.GetVersion(target=serial)
+            pkt = DeviceMessages.StateVersion(vendor=info["vendor"], product=info["product"], target=serial)
+        elif key == self.get_host_firmware_key:
+            sender_message = DeviceMessages.GetHostFirmware(target=serial)
+            pkt = DeviceMessages.StateHostFirmware(target=serial, **info["firmware"])
+        else:
+            return None
+
+        pkt.Information.update(remote_addr=None, sender_message=sender_message)
+        return pkt
+
+    def changed(self):
+        if self.handle is None:
+            self.handle = hp.get_event_loop().call_later(self.save_after, self.save)
+
+    def save(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        tmp = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w") as fle:
+                json.dump(self.devices, fle, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as error:
+            log.warning(hp.lc("Failed to write capability cache", path=self.path, error=error))
+
+    def finish(self):
+        """Write any changes that haven't been written yet"""
+        if self.handle is not None:
+            self.save()
@@ -1,7 +1,7 @@
 import asyncio
 import time
 import uuid
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 from photons_app import helpers as hp
 from photons_app.errors import BadRunWithResults, ProgrammerError, RunErrors
@@ -78,6 +78,7 @@ class Planner:
         for label, info in sorted(self._by_label.items()):
             for message in info.not_done_messages:
                 key = message.Key
+                self.session.seed(key, self.serial)
                 self.session.refresh_received(key, self.serial, info.instance.refresh)
 
                 if not self.session.has_received(key, self.serial) and key not in sent:
@@ -226,25 +227,78 @@ class Session:
     """
     The cache of results from the Gatherer. It caches the replies to individual
     messages and the final results from plans. It caches per plan/serial.
+
+    Replies are stored as ``received[serial][key]`` and results as
+    ``filled[serial][plankey]`` so that finding what we have for a serial
+    doesn't look at any other serial.
+
+    The cache may be given limits:
+
+    max_age
+        Replies and results older than this many seconds are forgotten
+
+    max_serials
+        Only remember this many devices, forgetting the device that was least
+        recently used first
+
+    max_keys
+        Only remember replies for this many messages and results for this many
+        plans per device, forgetting the least recently used first
+
+    ``hits`` and ``misses`` count whether ``has_received`` and ``completed``
+    found something and ``evictions`` counts the replies and results forgotten
+    because of these limits.
+
+    If given a ``capability_cache`` then ``seed`` gives us the GetVersion and
+    GetHostFirmware replies from that cache the first time we don't have them
+    for a device. They are received at the time the cache last heard from the
+    device so that the refresh on plans and ``max_age`` treat them as being that
+    old. A device that is forgotten because of the limits above may be given
+    the replies from that cache again.
     """
 
-    def __init__(self):
-        self.received = defaultdict(lambda: defaultdict(list))
-        self.filled = defaultdict(dict)
+    def __init__(self, *, max_age=None, max_serials=None, max_keys=None, capability_cache=None):
+        self.max_age = max_age
+        self.max_keys = max_keys
+        self.max_serials = max_serials
+
+        self.capability_cache = capability_cache
+        self.seeded = set()
+
+        self.serials = OrderedDict()
+        self.received = {}
+        self.filled = {}
+        self.next_prune = None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
 
     def planner(self, plans, depinfo, serial, error_catcher):
         """Return a Planner instance for managing packets and results"""
         return Planner(self, plans, depinfo, serial, error_catcher)
 
-    def receive(self, pkt):
+    def receive(self, pkt, received_at=None):
         """
         Cache this reply packet for this key. We use pkt.serial
         for determining what serial this packet came from.
 
-        We also record the current time to use later for determining refreshes
+        We also record when it was received, which defaults to the current time,
+        to use later for determining refreshes
         """
         key = pkt.Information.sender_message.Key
-        self.received[pkt.serial][key].append((time.time(), pkt))
+        now = time.time()
+        self.prune(now)
+
+        if received_at is None:
+            received_at = now
+
+        received = self._entries(self.received, pkt.serial)
+        if key in received:
+            received.move_to_end(key)
+        else:
+            self._add(received, key, [])
+        received[key].append((received_at, pkt))
 
     def fill(self, plankey, serial, result):
         """
@@ -252,7 +306,12 @@ class Session:
 
         We also record the current time to use later for determining refreshes
         """
-        self.filled[plankey][serial] = (time.time(), result)
+        now = time.time()
+        self.prune(now)
+
+        filled = self._entries(self.filled, serial)
+        filled.pop(plankey, None)
+        self._add(filled, plankey, (now, result))
 
     def completed(self, plankey, serial):
         """
@@ -260,20 +319,63 @@ class Session:
 
         Otherwise, return None
         """
-        if plankey in self.filled and serial in self.filled[plankey]:
-            return self.filled[plankey][serial][1]
+        filled = self.filled.get(serial)
+        if filled and plankey in filled:
+            ts, result = filled[plankey]
+            if not self._expired(ts):
+                self._used(serial, filled, plankey)
+                self.hits += 1
+                return result
+
+            del filled[plankey]
+            self.evictions += 1
+
+        self.misses += 1
 
     def has_received(self, key, serial):
         """Return whether this serial has received results for this key"""
-        return bool(self.received[serial].get(key))
+        received = self.received.get(serial)
+        if received and key in received:
+            if self.max_age is not None:
+                received[key] = self._fresh(received[key])
+
+            if received[key]:
+                self._used(serial, received, key)
+                self.hits += 1
+                return True
+
+            del received[key]
+
+        self.misses += 1
+        return False
+
+    def seed(self, key, serial):
+        """
+        Receive the reply from the capability cache for this key if we don't
+        have one and haven't already used the cache for it
+        """
+        if not self._can_seed(key) or (serial, key) in self.seeded:
+            return
+
+        received = self.received.get(serial)
+        if received and key in received:
+            return
+
+        self.seeded.add((serial, key))
+        pkt = self.capability_cache.reply(key, serial)
+        if pkt is not None:
+            self.receive(pkt, received_at=self.capability_cache.seen(serial))
 
     def known_packets(self, serial):
         """Yield all the known reply packets from this serial"""
-        for s, pkts in self.received.items():
-            if s == serial:
-                for ps in pkts.values():
-                    for _, p in ps:
-                        yield p
+        received = self.received.get(serial)
+        if not received:
+            return
+
+        for ps in list(received.values()):
+            for ts, p in ps:
+                if not self._expired(ts):
+                    yield p
 
     def refresh_received(self, key, serial, refresh):
         """
@@ -288,16 +390,20 @@ class Session:
         if refresh is False:
             return
 
+        infos = self.received.get(serial)
+        if not infos or key not in infos:
+            return
+
         now = time.time()
 
-        for s, infos in self.received.items():
-            if s == serial and key in infos:
-                if refresh is True or refresh == 0:
-                    del infos[key]
-                else:
-                    infos[key] = [(ts, i) for ts, i in infos[key] if 0 < now - ts <= refresh]
-                    if not infos[key]:
-                        del infos[key]
+        if refresh is True or refresh == 0:
+            del infos[key]
+        else:
+            infos[key] = [(ts, i) for ts, i in infos[key] if 0 < now - ts <= refresh]
+            if not infos[key]:
+                del infos[key]
+
+        self._forget_if_empty(serial)
 
     def refresh_filled(self, plankey, serial, refresh):
         """
@@ -309,17 +415,193 @@ class Session:
         * refresh == integer - Look at the time the result was recorded
           if it's been refresh seconds, then remove the result.
         """
-        if refresh is False or plankey not in self.filled or serial not in self.filled[plankey]:
+        filled = self.filled.get(serial)
+        if refresh is False or not filled or plankey not in filled:
             return
 
         now = time.time()
-        ts, _ = self.filled[plankey][serial]
+        ts, _ = filled[plankey]
 
         if refresh is True or now - ts >= refresh:
-            del self.filled[plankey][serial]
+            del filled[plankey]
+
+        self._forget_if_empty(serial)
+
+    def prune(self, now=None):
+        """Remove everything older than max_age, at most once every max_age seconds"""
+        if self.max_age is None:
+            return
+
+        if now is None:
+            now = time.time()
+
+        if self.next_prune is not None and now < self.next_prune:
+            return
+        self.next_prune = now + self.max_age
+
+        for serial in list(self.serials):
+            received = self.received.get(serial)
+            if received:
+                for key, pkts in list(received.items()):
+                    fresh = self._fresh(pkts, now)
+                    if fresh:
+                        received[key] = fresh
+                    else:
+                        del received[key]
+
+            filled = self.filled.get(serial)
+            if filled:
+                for plankey, (ts, _) in list(filled.items()):
+                    if now - ts > self.max_age:
+                        del filled[plankey]
+                        self.evictions += 1
+
+            self._forget_if_empty(serial)
+            if serial not in self.serials:
+                self._forget_seeded(serial)
+
+    def _expired(self, ts, now=None):
+        if self.max_age is None:
+            return False
+        return (time.time() if now is None else now) - ts > self.max_age
+
+    def _fresh(self, pkts, now=None):
+        if now is None:
+            now = time.time()
+        fresh = [(ts, p) for ts, p in pkts if now - ts <= self.max_age]
+        self.evictions += len(pkts) - len(fresh)
+        return fresh
+
+    def _entries(self, store, serial):
+        """Return the entries for this serial in this store, forgetting old serials if we have too many"""
+        if serial in self.serials:
+            self.serials.move_to_end(serial)
+        else:
+            self.serials[serial] = True
+            if self.max_serials is not None:
+                while len(self.serials) > self.max_serials:
+                    self._forget(next(iter(self.serials)))
+
+        entries = store.get(serial)
+        if entries is None:
+            entries = store[serial] = OrderedDict()
+        return entries
+
+    def _add(self, entries, key, value):
+        """Add this entry, forgetting the least recently used if we have too many"""
+        entries[key] = value
+        if self.max_keys is not None:
+            while len(entries) > self.max_keys:
+                _, old = entries.popitem(last=False)
+                self.evictions += len(old) if isinstance(old, list) else 1
+
+    def _used(self, serial, entries, key):
+        self.serials.move_to_end(serial)
+        entries.move_to_end(key)
+
+    def _forget(self, serial):
+        del self.serials[serial]
+        self.evictions += sum(len(pkts) for pkts in self.received.pop(serial, {}).values())
+        self.evictions += len(self.filled.pop(serial, ()))
+        self._forget_seeded(serial)
+
+    def _can_seed(self, key):
+        cache = self.capability_cache
+        return cache is not None and key in (cache.get_version_key, cache.get_host_firmware_key)
+
+    def _forget_seeded(self, serial):
+        if self.capability_cache is not None:
+            self.seeded.discard((serial, self.capability_cache.get_version_key))
+            self.seeded.discard((serial, self.capability_cache.get_host_firmware_key))
+
+    def _forget_if_empty(self, serial):
+        if not self.received.get(serial) and not self.filled.get(serial):
+            self.received.pop(serial, None)
+            self.filled.pop(serial, None)
+            self.serials.pop(serial, None)
+
+
+class Dependencies:
+    """
+    Gets the information that plans depend on for many serials at once.
+
+    The plans that are depended on are gathered for all the serials with one
+    batched gather and each serial is given it's information as soon as that
+    serial is complete, so that serial doesn't wait for any other serial.
+
+    Information already in the session's cache is used rather than asking the
+    device again.
+    """
 
-        if not self.filled[plankey]:
-            del self.filled[plankey]
+    def __init__(self, gatherer, plans, serials, kwargs):
+        self.kwargs = kwargs
+        self.serials = list(serials)
+        self.gatherer = gatherer
+
+        self.deps = {}
+        self.depplan = {}
+        self.depinfo = {}
+
+        for _, plan in sorted(plans.items()):
+            d = plan.dependant_info
+            if d:
+                for item, p in d.items():
+                    uid = str(uuid.uuid4())
+                    self.deps[uid] = (plan, item)
+                    self.depplan[uid] = p
+                self.depinfo[plan] = None
+
+        self.task = None
+        self.futures = {serial: hp.create_future(name=f"Dependencies({serial})::__init__[future]") for serial in self.serials}
+
+    async def get(self, serial):
+        """
+        Return ``{plan: {label: information}}`` for this serial so that it may
+        be used to instantiate plan instances with their dependencies.
+        """
+        if not self.depplan:
+            return {}
+
+        if self.task is None:
+            self.task = hp.async_as_background(self.resolve())
+
+        return await self.futures[serial]
+
+    async def resolve(self):
+        try:
+            async for serial, completed, info in self.gatherer.gather_per_serial(self.depplan, self.serials, batch=True, **self.kwargs):
+                self.found(serial, completed, info)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            hp.add_error(self.kwargs["error_catcher"], error)
+        finally:
+            for serial in self.serials:
+                self.found(serial, False, {})
+
+    def found(self, serial, completed, info):
+        fut = self.futures.get(serial)
+        if fut is None or fut.done():
+            return
+
+        depinfo = dict(self.depinfo)
+        if completed:
+            for uid, i in info.items():
+                if uid in self.deps:
+                    plan, item = self.deps[uid]
+                    if depinfo.get(plan) is None:
+                        depinfo[plan] = {}
+                    depinfo[plan][item] = i
+
+        fut.set_result(depinfo)
+
+    async def finish(self):
+        if self.task is not None:
+            self.task.cancel()
+            await hp.wait_for_all_futures(self.task, name="Dependencies::finish[wait_for_task]")
+
+        for fut in self.futures.values():
+            fut.cancel()
 
 
 class Gatherer:
@@ -379,32 +661,48 @@ class Gatherer:
     give the plan a different label.
 
     Note that results from gathering will be cached and you may remove this cache
-    by calling gatherer.clear_cache()
+    by calling gatherer.clear_cache(). The ``max_age``, ``max_serials`` and
+    ``max_keys`` options limit the size of this cache, as described by
+    :class:`Session`.
+
+    If the sender has a ``gatherer_snapshot``, then the cache starts with what
+    a previous run saved with it.
     """
 
     Skip = Skip
 
-    def __init__(self, sender):
+    def __init__(self, sender, *, max_age=None, max_serials=None, max_keys=None):
         if isinstance(sender, Target):
             raise ProgrammerError("The Gatherer no longer takes in target instances. Please pass in a target.session result instead")
         self.sender = sender
+        self.session_options = {"max_age": max_age, "max_serials": max_serials, "max_keys": max_keys}
 
     @hp.memoized_property
     def session(self):
-        return Session()
+        session = Session(capability_cache=getattr(self.sender, "capability_cache", None), **self.session_options)
+
+        snapshot = getattr(self.sender, "gatherer_snapshot", None)
+        if snapshot is not None:
+            snapshot.restore(session)
+
+        return session
 
     def clear_cache(self):
         """Remove all cached results"""
         if hasattr(self, "_session"):
             del self.session
 
-    async def gather(self, plans, reference, error_catcher=None, **kwargs):
+    async def gather(self, plans, reference, error_catcher=None, *, batch=False, **kwargs):
         """
         This is an async generator that yields tuples of
         ``(serial, label, info)`` where ``serial`` is the serial of the device,
         ``label`` is the label of the plan, and ``info`` is the result of
         executing that plan.
 
+        If ``batch`` is True then the messages for all the devices are sent
+        with one sender call, which means they share one ``limit`` and we
+        don't need a stream of messages per device.
+
         The error handling of this function is the same as the async generator
         behaviour in :ref:`sender <sender_interface>` API.
         """
@@ -419,18 +717,26 @@ class Gatherer:
             for serial in missing:
                 hp.add_error(error_catcher, FailedToFindDevice(serial=serial))
 
-            async with hp.ResultStreamer(
-                self.sender.stop_fut,
-                error_catcher=error_catcher,
-                exceptions_only_to_error_catcher=True,
-            ) as streamer:
-                for serial in serials:
-                    await streamer.add_generator(self._follow(plans, serial, **kwargs))
-                streamer.no_more_work()
+            dependencies = Dependencies(self, plans, serials, kwargs)
 
-                async for result in streamer:
-                    if result.successful:
-                        yield result.value
+            try:
+                async with hp.ResultStreamer(
+                    self.sender.stop_fut,
+                    error_catcher=error_catcher,
+                    exceptions_only_to_error_catcher=True,
+                ) as streamer:
+                    if batch:
+                        await streamer.add_generator(self._follow_batch(plans, serials, dependencies, **kwargs))
+                    else:
+                        for serial in serials:
+                            await streamer.add_generator(self._follow(plans, serial, dependencies, **kwargs))
+                    streamer.no_more_work()
+
+                    async for result in streamer:
+                        if result.successful:
+                            yield result.value
+            finally:
+                await dependencies.finish()
 
     async def gather_all(self, plans, reference, **kwargs):
         """
@@ -487,7 +793,7 @@ class Gatherer:
                 if serial not in done:
                     yield serial, False, info
 
-    async def _follow(self, plans, serial, **kwargs):
+    async def _follow(self, plans, serial, dependencies, **kwargs):
         """
         * get dependency information
         * Determine messages to be sent to devices
@@ -496,7 +802,7 @@ class Gatherer:
         * Complete any plans that are finished after no more messages and yield
           completed results.
         """
-        depinfo = await self._deps(plans, serial, **kwargs)
+        depinfo = await dependencies.get(serial)
         planner = self.session.planner(plans, depinfo, serial, kwargs["error_catcher"])
 
         msgs_to_send = list(planner.find_msgs_to_send())
@@ -516,35 +822,52 @@ class Gatherer:
         async for complete in planner.ended():
             yield complete
 
-    async def _deps(self, plans, serial, **kwargs):
+    async def _follow_batch(self, plans, serials, dependencies, **kwargs):
         """
-        Determine if any of the plans have dependent plans and get that information
-        and return {plan: {label: information}} so that it may be used by
-        _follow to instantiate plan instances with required dependencies.
+        The same as _follow but for many serials at once.
+
+        A planner is made for each serial as soon as it has dependency
+        information and any completed results it already has are yielded
+        straight away. Then the messages from all the planners are sent with
+        one sender call and each reply is given to the planner for its serial.
+
+        Plans that are finished after no more messages are only completed once
+        there are no more messages for any of the serials.
         """
-        deps = {}
-        depplan = {}
-        depinfo = {}
+        planners = {}
+        msgs_to_send = []
 
-        for _, plan in sorted(plans.items()):
-            d = plan.dependant_info
-            if d:
-                for item, p in d.items():
-                    uid = str(uuid.uuid4())
-                    deps[uid] = (plan, item)
-                    depplan[uid] = p
-                depinfo[plan] = None
-
-        if depplan:
-            g = await self.gather_all(depplan, serial, **kwargs)
-            if serial in g:
-                completed, i = g[serial]
-                if completed:
-                    for uid, info in i.items():
-                        if uid in deps:
-                            plan, item = deps[uid]
-                        if depinfo.get(plan) is None:
-                            depinfo[plan] = {}
-                        depinfo[plan][item] = info
-
-        return depinfo
+        async def make_planner(serial):
+            depinfo = await dependencies.get(serial)
+            return self.session.planner(plans, depinfo, serial, kwargs["error_catcher"])
+
+        async with hp.ResultStreamer(
+            self.sender.stop_fut,
+            error_catcher=kwargs["error_catcher"],
+            exceptions_only_to_error_catcher=True,
+        ) as streamer:
+            for serial in serials:
+                await streamer.add_coroutine(make_planner(serial), context=serial)
+            streamer.no_more_work()
+
+            async for result in streamer:
+                if not result.successful:
+                    continue
+
+                planner = planners[result.context] = result.value
+                msgs_to_send.extend(planner.find_msgs_to_send())
+
+                # Must call completed after getting msgs_to_send
+                async for complete in planner.completed():
+                    yield complete
+
+        if msgs_to_send:
+            async for pkt in self.sender(msgs_to_send, **kwargs):
+                planner = planners.get(pkt.serial)
+                if planner is not None:
+                    async for complete in planner.add(pkt):
+                        yield complete
+
+        for planner in planners.values():
+            async for complete in planner.ended():
+                yield complete
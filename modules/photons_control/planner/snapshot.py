@@ -0,0 +1,138 @@
+import binascii
+import json
+import logging
+import os
+import time
+import zlib
+
+from photons_app import helpers as hp
+from photons_protocol.messages import Messages
+
+log = logging.getLogger("photons_control.planner.snapshot")
+
+
+class GathererSnapshot:
+    """
+    Saves the replies in a Gatherer ``Session`` to a file so that the next run
+    of photons can start with them.
+
+    The timestamps are saved with them, so the ``refresh`` on plans still
+    decides whether a reply is new enough to use. Anything older than
+    ``max_age`` seconds isn't saved or loaded.
+
+    Only the bytes of each reply are saved, as compressed json. Plan results
+    aren't saved because the plans make them again from the replies.
+
+    If the file wasn't made by this version of the snapshot then nothing is
+    loaded from it, and replies in it that can't be read are skipped.
+    """
+
+    max_age = 60
+
+    magic = b"PHGS"
+    version = 2
+
+    def __init__(self, path, protocol_register):
+        self.path = path
+        self.protocol_register = protocol_register
+
+    def dumps(self, session):
+        now = time.time()
+        received = {}
+
+        for serial, infos in session.received.items():
+            keys = []
+            for key, pkts in infos.items():
+                saved = []
+                for ts, pkt in pkts:
+                    if now - ts > self.max_age:
+                        continue
+                    try:
+                        saved.append([ts, binascii.hexlify(pkt.pack().tobytes()).decode(), pkt.Information.remote_addr])
+                    except Exception as error:
+                        log.debug(hp.lc("Not saving reply", serial=serial, error=error))
+                if saved:
+                    keys.append([list(key), saved])
+            if keys:
+                received[serial] = keys
+
+        data = json.dumps({"received": received}).encode()
+        return self.magic + bytes([self.version]) + zlib.compress(data)
+
+    def loads(self, session, data):
+        """Add what is in this data to the session and return how many replies were added"""
+        if data[: len(self.magic)] != self.magic or data[len(self.magic) : len(self.magic) + 1] != bytes([self.version]):
+            raise ValueError("Not a gatherer snapshot from this version of photons")
+
+        snapshot = json.loads(zlib.decompress(data[len(self.magic) + 1 :]))
+        if not isinstance(snapshot, dict) or not isinstance(snapshot.get("received"), dict):
+            raise ValueError("Gatherer snapshot has no replies")
+
+        now = time.time()
+        loaded = []
+
+        for serial, keys in snapshot["received"].items():
+            if not isinstance(keys, list):
+                log.warning(hp.lc("Skipping invalid entry in gatherer snapshot", serial=serial))
+                continue
+
+            for entry in keys:
+                try:
+                    key, saved = tuple(entry[0]), entry[1]
+                    if not isinstance(saved, list):
+                        raise TypeError("Replies should be a list")
+                except (IndexError, KeyError, TypeError) as error:
+                    log.warning(hp.lc("Skipping invalid entry in gatherer snapshot", serial=serial, error=error))
+                    continue
+
+                pkts = []
+                for item in saved:
+                    try:
+                        ts, raw, remote_addr = item
+                        if now - ts > self.max_age:
+                            continue
+                        pkt = Messages.create(binascii.unhexlify(raw), self.protocol_register, unknown_ok=True)
+                        pkt.Information.update(remote_addr=None if remote_addr is None else tuple(remote_addr), sender_message=None)
+                    except Exception as error:
+                        log.warning(hp.lc("Skipping invalid reply in gatherer snapshot", serial=serial, error=error))
+                        continue
+                    pkts.append((ts, pkt))
+
+                if pkts:
+                    loaded.append((serial, key, pkts))
+
+        count = 0
+        for serial, key, pkts in loaded:
+            session._add(session._entries(session.received, serial), key, pkts)
+            count += len(pkts)
+
+        return count
+
+    def save(self, session):
+        tmp = f"{self.path}.tmp"
+        try:
+            data = self.dumps(session)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "wb") as fle:
+                fle.write(data)
+            os.replace(tmp, self.path)
+        except Exception as error:
+            log.warning(hp.lc("Failed to write gatherer snapshot", path=self.path, error=error))
+
+    def restore(self, session):
+        try:
+            with open(self.path, "rb") as fle:
+                data = fle.read()
+        except FileNotFoundError:
+            return 0
+        except OSError as error:
+            log.warning(hp.lc("Failed to read gatherer snapshot", path=self.path, error=error))
+            return 0
+
+        try:
+            return self.loads(session, data)
+        except Exception as error:
+            log.warning(hp.lc("Failed to load gatherer snapshot", path=self.path, error=error))
+            return 0
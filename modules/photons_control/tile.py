@@ -153,10 +153,15 @@ class get_device_chain(task.Task):
                 if info["cap"].has_matrix:
                     yield TileMessages.GetDeviceChain(target=serial)
 
-        async for pkt in self.target.send(FromGenerator(gen), self.reference):
-            print(pkt.serial)
-            for tile in tiles_from(pkt):
-                print("    ", repr(tile))
+        with self.photons_app.ndjson_writer() as writer:
+            async for pkt in self.target.send(FromGenerator(gen), self.reference):
+                if writer is not None:
+                    writer.write({"serial": pkt.serial, "chain": tiles_from(pkt)})
+                    continue
+
+                print(pkt.serial)
+                for tile in tiles_from(pkt):
+                    print("    ", repr(tile))
 
 
 @task
@@ -175,22 +180,28 @@ class get_chain_state(task.Task):
             def error(e):
                 log.error(e)
 
-            async for serial, _, parts in sender.gatherer.gather(plans, self.reference, error_catcher=error):
-                if not parts or not parts[0].device.cap.has_matrix:
-                    continue
+            with self.photons_app.ndjson_writer() as writer:
+                async for serial, _, parts in sender.gatherer.gather(plans, self.reference, error_catcher=error):
+                    if not parts or not parts[0].device.cap.has_matrix:
+                        continue
 
-                print(serial)
-                for part in parts:
-                    print(f"    Tile {part.part_number}")
-                    for i, color in enumerate(part.colors):
-                        color = (
-                            round(color[0], 3),
-                            round(color[1], 3),
-                            round(color[2], 3),
-                            color[3],
-                        )
-                        print(f"        color {i:<2d}", repr(color))
-                    print("")
+                    if writer is not None:
+                        tiles = [{"part_number": part.part_number, "colors": part.colors} for part in parts]
+                        writer.write({"serial": serial, "tiles": tiles})
+                        continue
+
+                    print(serial)
+                    for part in parts:
+                        print(f"    Tile {part.part_number}")
+                        for i, color in enumerate(part.colors):
+                            color = (
+                                round(color[0], 3),
+                                round(color[1], 3),
+                                round(color[2], 3),
+                                color[3],
+                            )
+                            print(f"        color {i:<2d}", repr(color))
+                        print("")
 
 
 @task
@@ -387,8 +398,14 @@ class get_tile_positions(task.Task):
                 if info["cap"].has_matrix:
                     yield TileMessages.GetDeviceChain(target=serial)
 
-        async for pkt in self.target.send(FromGenerator(gen), self.reference):
-            print(pkt.serial)
-            for tile in tiles_from(pkt):
-                print(f"\tuser_x: {tile.user_x}, user_y: {tile.user_y}")
-            print("")
+        with self.photons_app.ndjson_writer() as writer:
+            async for pkt in self.target.send(FromGenerator(gen), self.reference):
+                if writer is not None:
+                    positions = [{"user_x": tile.user_x, "user_y": tile.user_y} for tile in tiles_from(pkt)]
+                    writer.write({"serial": pkt.serial, "positions": positions})
+                    continue
+
+                print(pkt.serial)
+                for tile in tiles_from(pkt):
+                    print(f"\tuser_x: {tile.user_x}, user_y: {tile.user_y}")
+                print("")
@@ -186,11 +186,6 @@ class MessagesMixin:
         if isinstance(data, str):
             data = binascii.unhexlify(data)
 
-        if isinstance(data, bytes):
-            b = bitarray(endian="little")
-            b.frombytes(data)
-            data = b
-
         prot = protocol_register.get(protocol)
         if prot is None:
             raise BadConversion("Unknown packet protocol", wanted=protocol, available=list(protocol_register))
@@ -489,7 +489,7 @@ class PacketSpecMixin:
         if args:
             val = args[0]
 
-        if isinstance(val, bitarray | bytes):
+        if isinstance(val, bitarray | bytes | bytearray | memoryview):
             return PacketPacking.unpack(kls, val)
 
         return kls.spec().normalise(Meta.empty(), val)
@@ -522,6 +522,11 @@ class PacketSpecMetaKls(dictobj.Field.metaclass):
       original_fields
         The original ``fields`` attribute on the class
 
+      codec
+        Added the first time the packet class is packed or unpacked. This is a
+        ``PacketCodec`` for packing and unpacking the fields with one
+        ``struct.Struct``, or None if the fields can't be represented that way
+
     * Replace the ``fields`` attribute with all the fields from the groups
     * Ensure the class has the ``PacketSpecMixin`` class as a base class
     """
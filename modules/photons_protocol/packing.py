@@ -19,6 +19,9 @@ def val_to_bitarray(val, doing):
     if type(val) is str:
         val = binascii.unhexlify(val.encode())
 
+    if type(val) in (bytearray, memoryview):
+        val = bytes(val)
+
     if type(val) is not bytes:
         raise BadConversion("Couldn't get bitarray from a value", value=val, doing=doing)
 
@@ -144,38 +147,270 @@ class FieldInfo(dictobj):
         return b
 
 
+def plain_type(typ):
+    """
+    Return the python type of values for this field that don't change when
+    they are normalised for packing, or None if values must always be
+    normalised.
+
+    Values of this type can be taken straight from the packet.
+    """
+    if typ._multiple or typ._allow_callable or typ._version_number:
+        return None
+
+    for option in (typ._enum, typ._bitmask, typ._dynamic, typ._override):
+        if option is not sb.NotSpecified:
+            return None
+
+    if typ.conversion is bool:
+        return bool if typ.struct_format is bool and typ.size_bits == 1 else None
+
+    return {int: int, float: float, bytes: bitarray}.get(typ.conversion)
+
+
+class StructField:
+    """
+    A byte aligned field with a ``struct_format`` that is the same size as the
+    field. This is packed and unpacked by the ``struct.Struct`` on the codec.
+    """
+
+    def __init__(self, name, typ):
+        self.name = name
+        self.plain = plain_type(typ)
+        self.multiple = typ._multiple
+        self.count = self.multiple or 1
+        self.code = typ.struct_format[1:] * self.count
+
+    def add_values(self, pkt, parent, serial, args):
+        if self.plain is not None:
+            val = dict.get(pkt, self.name)
+            if type(val) is self.plain:
+                args.append(val)
+                return
+
+        val = pkt.__getitem__(
+            self.name,
+            parent=parent,
+            serial=serial,
+            allow_bitarray=True,
+            unpacking=False,
+            do_transform=False,
+        )
+
+        if not self.multiple:
+            val = [val]
+        elif not isinstance(val, list) or len(val) != self.count:
+            raise CodecFallback()
+
+        for v in val:
+            if v is Optional:
+                v = 0
+            elif v is sb.NotSpecified or type(v) is bitarray:
+                raise CodecFallback()
+            args.append(v)
+
+    def set_values(self, final, values, index):
+        if self.multiple:
+            final[self.name] = list(values[index : index + self.count])
+        else:
+            dictobj.__setitem__(final, self.name, values[index])
+        return index + self.count
+
+
+class BitsChunk:
+    """
+    A run of fields that together start and end on a byte boundary but can't
+    be represented natively by ``struct``.
+
+    These are stored as a ``Ns`` in the struct and converted field by field
+    using bitarrays like ``PacketPacking`` does without a codec.
+    """
+
+    def __init__(self, fields, size_bits):
+        self.fields = [(name, typ, plain_type(typ), self.zeros_for(typ)) for name, typ in fields]
+        self.size_bits = size_bits
+        self.code = f"{size_bits // 8}s"
+
+    def zeros_for(self, typ):
+        """Return the bits to use for an empty value if this is a plain ``T.Reserved``"""
+        if typ.__class__.__name__ != "Reserved" or typ._optional or typ._default is not sb.NotSpecified:
+            return None
+        return bitarray("0" * typ.size_bits, endian="little")
+
+    def add_values(self, pkt, parent, serial, args):
+        b = bitarray(endian="little")
+        for name, typ, plain, zeros in self.fields:
+            if plain is not None:
+                val = dict.get(pkt, name, sb.NotSpecified)
+                if plain is bool and type(val) is bool:
+                    b.append(val)
+                    continue
+                elif plain is bitarray and type(val) is bitarray and len(val) == typ.size_bits:
+                    b += val
+                    continue
+                elif zeros is not None and val is sb.NotSpecified:
+                    b += zeros
+                    continue
+
+            for info in PacketPacking.field_infos(pkt, name, typ, parent, serial):
+                b += info.to_sized_bitarray()
+
+        if len(b) != self.size_bits:
+            raise CodecFallback()
+
+        args.append(b.tobytes())
+
+    def set_values(self, final, values, index):
+        b = bitarray(endian="little")
+        b.frombytes(values[index])
+
+        i = 0
+        group = final.__class__.__name__
+        for name, typ, _, _ in self.fields:
+            i = PacketPacking.unpack_field(final, group, name, typ, b, i)
+
+        return index + 1
+
+
+class CodecFallback(Exception):
+    """Used to say the codec can't produce the same result as packing field by field"""
+
+
+class PacketCodec:
+    """
+    A precompiled plan for packing and unpacking all the fields of a packet
+    class with a single ``struct.Struct``.
+
+    Byte aligned fields with a ``struct_format`` are handled by ``struct`` and
+    everything else is grouped into byte aligned chunks that are converted
+    using bitarrays.
+
+    ``compile`` returns ``None`` if the packet has fields with a dynamic size,
+    doesn't end on a byte boundary or has nothing ``struct`` can pack natively.
+    In those cases ``PacketPacking`` will pack and unpack field by field.
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self.struct = struct.Struct("<" + "".join(slot.code for slot in slots))
+        self.size_bytes = self.struct.size
+        self.size_bits = self.size_bytes * 8
+
+    @classmethod
+    def for_kls(kls, pkt_kls):
+        """
+        Return the codec for this packet class or None if it can't have one
+
+        The codec is compiled the first time it's asked for and stored on the
+        ``Meta`` of the packet class.
+        """
+        Meta = getattr(pkt_kls, "Meta", None)
+        if Meta is None or not hasattr(Meta, "all_field_types"):
+            return None
+
+        if not hasattr(Meta, "codec"):
+            Meta.codec = kls.compile(Meta.all_field_types)
+
+        return Meta.codec
+
+    @classmethod
+    def compile(kls, all_field_types):
+        slots = []
+        pending = []
+        pending_bits = 0
+
+        for name, typ in all_field_types:
+            size_bits = typ.size_bits
+            multiple = typ._multiple
+            if type(size_bits) is not int or callable(multiple):
+                return None
+
+            fmt = typ.struct_format
+            if not pending and type(fmt) is str and fmt.startswith("<") and struct.calcsize(fmt) * 8 == size_bits:
+                slots.append(StructField(name, typ))
+                continue
+
+            pending.append((name, typ))
+            pending_bits += size_bits * (multiple or 1)
+            if pending_bits % 8 == 0:
+                slots.append(BitsChunk(pending, pending_bits))
+                pending = []
+                pending_bits = 0
+
+        if pending or not any(isinstance(slot, StructField) for slot in slots):
+            return None
+
+        return kls(slots)
+
+    def pack(self, pkt, parent, serial):
+        """
+        Return a bitarray of the fields on this pkt
+
+        Or None if any of the values can't be packed in the same way as packing
+        field by field. In that case ``PacketPacking`` is used to get the
+        result or the appropriate error.
+        """
+        args = []
+        try:
+            for slot in self.slots:
+                slot.add_values(pkt, parent, serial, args)
+            packed = self.struct.pack(*args)
+        except Exception:
+            return None
+
+        final = bitarray(endian="little")
+        final.frombytes(packed)
+        return final
+
+    def unpack(self, pkt_kls, buf):
+        """Return an instance of ``pkt_kls`` from the start of buf, which must be at least ``size_bytes`` long"""
+        values = self.struct.unpack_from(buf)
+
+        index = 0
+        final = pkt_kls()
+        for slot in self.slots:
+            index = slot.set_values(final, values, index)
+
+        return final
+
+
 class PacketPacking:
     @classmethod
     def fields_in(kls, pkt, parent, serial):
         for name, typ in pkt.Meta.all_field_types:
-            val = pkt.__getitem__(
-                name,
-                parent=parent,
-                serial=serial,
-                allow_bitarray=True,
-                unpacking=False,
-                do_transform=False,
-            )
-            size_bits = typ.size_bits
-            if callable(size_bits):
-                size_bits = size_bits(pkt)
-            group = pkt.Meta.name_to_group.get(name, pkt.__class__.__name__)
+            yield from kls.field_infos(pkt, name, typ, parent, serial)
 
-            if not typ._multiple:
-                yield FieldInfo(name, typ, val, size_bits, group)
-            else:
-                if not isinstance(val, list):
-                    raise BadConversion("Expected field to be a list", name=name, val=type(val))
+    @classmethod
+    def field_infos(kls, pkt, name, typ, parent, serial):
+        """Yield a ``FieldInfo`` for each value in this one field of the ``pkt``"""
+        val = pkt.__getitem__(
+            name,
+            parent=parent,
+            serial=serial,
+            allow_bitarray=True,
+            unpacking=False,
+            do_transform=False,
+        )
+        size_bits = typ.size_bits
+        if callable(size_bits):
+            size_bits = size_bits(pkt)
+        group = pkt.Meta.name_to_group.get(name, pkt.__class__.__name__)
+
+        if not typ._multiple:
+            yield FieldInfo(name, typ, val, size_bits, group)
+        else:
+            if not isinstance(val, list):
+                raise BadConversion("Expected field to be a list", name=name, val=type(val))
 
-                number = typ._multiple
-                if callable(number):
-                    number = number(pkt)
+            number = typ._multiple
+            if callable(number):
+                number = number(pkt)
 
-                if len(val) != number:
-                    raise BadConversion("Expected correct number of items", name=name, found=len(val), want=number)
+            if len(val) != number:
+                raise BadConversion("Expected correct number of items", name=name, found=len(val), want=number)
 
-                for v in val:
-                    yield FieldInfo(name, typ, v, size_bits, group)
+            for v in val:
+                yield FieldInfo(name, typ, v, size_bits, group)
 
     @classmethod
     def pkt_from_bitarray(kls, pkt_kls, value):
@@ -183,36 +418,48 @@ class PacketPacking:
         final = pkt_kls()
 
         for name, typ in pkt_kls.Meta.all_field_types:
-            single_size_bits = typ.size_bits
-            if callable(single_size_bits):
-                single_size_bits = single_size_bits(final)
+            i = kls.unpack_field(final, pkt_kls.__name__, name, typ, value, i)
+        return final, i
 
-            multiple = typ._multiple
+    @classmethod
+    def unpack_field(kls, final, group, name, typ, value, i):
+        """
+        Set the value for this field on ``final`` from the bits in ``value``
+        starting at index ``i``.
 
-            size_bits = single_size_bits
-            if multiple:
-                if callable(multiple):
-                    multiple = multiple(final)
-                size_bits *= multiple
-
-            val = value[i : i + size_bits]
-            i += size_bits
-
-            if multiple:
-                if typ.struct_format:
-                    res = []
-                    j = 0
-                    for _ in range(multiple):
-                        v = val[j : j + single_size_bits]
-                        j += single_size_bits
-                        info = BitarraySlice(name, typ, v, single_size_bits, pkt_kls.__name__)
-                        res.append(info.unpackd)
-                    val = res
-                final[name] = val
-            else:
-                info = BitarraySlice(name, typ, val, size_bits, pkt_kls.__name__)
-                dictobj.__setitem__(final, info.name, info.unpackd)
-        return final, i
+        Return the index in ``value`` after this field.
+        """
+        single_size_bits = typ.size_bits
+        if callable(single_size_bits):
+            single_size_bits = single_size_bits(final)
+
+        multiple = typ._multiple
+
+        size_bits = single_size_bits
+        if multiple:
+            if callable(multiple):
+                multiple = multiple(final)
+            size_bits *= multiple
+
+        val = value[i : i + size_bits]
+        i += size_bits
+
+        if multiple:
+            if typ.struct_format:
+                res = []
+                j = 0
+                for _ in range(multiple):
+                    v = val[j : j + single_size_bits]
+                    j += single_size_bits
+                    info = BitarraySlice(name, typ, v, single_size_bits, group)
+                    res.append(info.unpackd)
+                val = res
+            final[name] = val
+        else:
+            info = BitarraySlice(name, typ, val, size_bits, group)
+            dictobj.__setitem__(final, info.name, info.unpackd)
+
+        return i
 
     @classmethod
     def pack(kls, pkt, payload=None, parent=None, serial=None):
@@ -224,21 +471,31 @@ class PacketPacking:
         Finally, the bitarray object is essentially concated together to create
         one final bitarray object.
 
+        If the packet class has a ``PacketCodec`` on it's ``Meta`` then that is
+        used to pack all the fields with one ``struct.Struct`` instead.
+
         This code assumes the packet has little endian.
 
         If ``payload`` is provided and this packet is a ``parent_packet`` and
         it's last field has a ``message_type`` property of 0, then that payload
         is converted into a bitarray and added to the end of the result.
         """
-        final = bitarray(endian="little")
+        final = None
 
-        for info in kls.fields_in(pkt, parent, serial):
-            result = info.to_sized_bitarray()
+        codec = PacketCodec.for_kls(type(pkt))
+        if codec is not None:
+            final = codec.pack(pkt, parent, serial)
 
-            if result is None:
-                raise BadConversion("Failed to convert field into a bitarray", field=info.as_dict())
+        if final is None:
+            final = bitarray(endian="little")
 
-            final += result
+            for info in kls.fields_in(pkt, parent, serial):
+                result = info.to_sized_bitarray()
+
+                if result is None:
+                    raise BadConversion("Failed to convert field into a bitarray", field=info.as_dict())
+
+                final += result
 
         # If this is a parent packet with a Payload of message_type 0
         # Then this means we have no payload fields and so must append
@@ -254,8 +511,12 @@ class PacketPacking:
     @classmethod
     def unpack(kls, pkt_kls, value):
         """
-        If the ``value`` is not a bitarray already, it is assumed to be ``bytes``
-        and converted into a bitarray.
+        If the packet class has a ``PacketCodec`` and the ``value`` is byte
+        aligned and long enough, then the codec is used to unpack all the
+        fields from the bytes in one go.
+
+        Otherwise, if the ``value`` is not a bitarray already, it is assumed to
+        be ``bytes`` and converted into a bitarray.
 
         We then get information about each field from ``Meta`` and use that to
         slice the value into chunks that are used to determine a value for each
@@ -265,6 +526,27 @@ class PacketPacking:
         property of 0, then the remainder of the ``value`` is assigned as
         bytes to that field on the final instance.
         """
+        codec = PacketCodec.for_kls(pkt_kls)
+        if codec is not None:
+            buf = None
+            if type(value) is bitarray:
+                if len(value) % 8 == 0:
+                    buf = value.tobytes()
+            elif isinstance(value, bytes | bytearray | memoryview):
+                buf = value
+
+            if buf is not None and len(buf) >= codec.size_bytes:
+                final = codec.unpack(pkt_kls, buf)
+
+                if getattr(pkt_kls, "parent_packet", False) and codec.size_bytes < len(buf):
+                    for name, typ in pkt_kls.Meta.field_types:
+                        if getattr(typ, "message_type", None) == 0:
+                            remainder = bitarray(endian="little")
+                            remainder.frombytes(buf[codec.size_bytes :])
+                            final[name] = remainder
+
+                return final
+
         value = val_to_bitarray(value, doing="Making bitarray to unpack")
         final, index = kls.pkt_from_bitarray(pkt_kls, value)
 
@@ -7,11 +7,13 @@ import struct
 
 from photons_app import helpers as hp
 from photons_app.errors import BadRunWithResults, FoundNoDevices, RunErrors, TimedOut
+from photons_messages import DiscoveryMessages
 from photons_protocol.messages import Messages
 from photons_protocol.packets import Information
 
 from photons_transport import catch_errors
 from photons_transport.comms.receiver import Receiver
+from photons_transport.comms.view import PacketView
 from photons_transport.comms.writer import Writer
 from photons_transport.errors import FailedToFindDevice, StopPacketStream
 
@@ -197,6 +199,12 @@ class Communication:
 
         self.make_plans = __import__("photons_control.planner").planner.make_plans
 
+        self.coalescer = None
+        self.rate_limiter = None
+        self.passive_discovery = False
+        self.capability_cache = None
+        self.gatherer_snapshot = None
+
         self.setup()
 
     def setup(self):
@@ -219,6 +227,12 @@ class Communication:
 
         await self.received_data_tasks.finish(exc_typ, exc, tb)
 
+        if self.capability_cache is not None:
+            self.capability_cache.finish()
+
+        if self.gatherer_snapshot is not None and hasattr(self, "_gatherer") and hasattr(self.gatherer, "_session"):
+            self.gatherer_snapshot.save(self.gatherer.session)
+
     @hp.memoized_property
     def source(self):
         """Return us a source to use for our packets"""
@@ -274,6 +288,9 @@ class Communication:
 
             self.found[serial][service] = new
 
+    async def add_passive_service(self, pkt, addr):
+        """Hook for a StateService that was received when passive_discovery is True"""
+
     async def find_devices(self, *, ignore_lost=False, raise_on_none=False, **kwargs):
         """Hook for finding devices"""
         kwargs["ignore_lost"] = ignore_lost
@@ -293,7 +310,7 @@ class Communication:
         return found, missing
 
     async def _find_specific_serials(self, serials, ignore_lost=False, raise_on_none=False, timeout=60, **kwargs):
-        found_now = await self._do_search(serials, timeout, **kwargs)
+        found_now = await self._do_search(serials, timeout, ignore_lost=ignore_lost, **kwargs)
 
         if not ignore_lost:
             await self.found.remove_lost(found_now)
@@ -306,7 +323,7 @@ class Communication:
 
         return self.found
 
-    async def _do_search(self, serials, timeout, **kwargs):
+    async def _do_search(self, serials, timeout, ignore_lost=False, **kwargs):
         raise NotImplementedError()
 
     async def make_transport(self, serial, service, kwargs):
@@ -327,6 +344,16 @@ class Communication:
         return await self.send_single(packet, **kwargs)
 
     async def send_single(self, original, packet, *, timeout, no_retry=False, broadcast=False, connect_timeout=10):
+        kwargs = dict(timeout=timeout, no_retry=no_retry, broadcast=broadcast, connect_timeout=connect_timeout)
+
+        if self.coalescer is not None:
+            key = self.coalescer.key_for(original, packet, **kwargs)
+            if key is not None:
+                return await self.coalescer.send(key, timeout, lambda: self._send_single(original, packet, **kwargs))
+
+        return await self._send_single(original, packet, **kwargs)
+
+    async def _send_single(self, original, packet, *, timeout, no_retry=False, broadcast=False, connect_timeout=10):
         transport, is_broadcast = await self._transport_for_send(None, packet, original, broadcast, connect_timeout)
 
         retry_gaps = self.retry_gaps(original, transport)
@@ -386,6 +413,8 @@ class Communication:
 
                     if result.context == "tick":
                         if not no_retry or not results:
+                            if self.rate_limiter is not None and not is_broadcast:
+                                await self.rate_limiter.acquire(packet.serial)
                             result = await writer()
                             results.append(result)
                             await streamer.add_task(result, context="write")
@@ -445,9 +474,28 @@ class Communication:
                     PacketKls = Packet
                 if isinstance(data, PacketKls):
                     pkt = data.clone()
+                elif protocol == 1024 and isinstance(data, bytes):
+                    pkt = PacketView(data, PacketKls)
                 else:
                     pkt = PacketKls.create(data)
         except Exception as error:
             log.exception(error)
         else:
+            if self.rate_limiter is not None:
+                try:
+                    self.rate_limiter.saw(pkt)
+                except Exception as error:
+                    log.exception(hp.lc("Failed to find product for rate limiting", error=error))
+            if self.capability_cache is not None:
+                try:
+                    self.capability_cache.saw(pkt)
+                except Exception as error:
+                    log.exception(hp.lc("Failed to remember device capability", error=error))
+            if self.passive_discovery and pkt | DiscoveryMessages.StateService:
+                try:
+                    await self.add_passive_service(pkt, addr)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:
+                    log.exception(hp.lc("Failed to add passively discovered service", error=error))
             await self.receiver.recv(pkt, addr, allow_zero=allow_zero)
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+
+from delfick_project.norms import dictobj, sb
+from photons_app import helpers as hp
+from photons_app.errors import TimedOut
+
+log = logging.getLogger("photons_transport.comms.coalesce")
+
+
+class InFlight:
+    """A send that one or more callers are waiting on"""
+
+    __slots__ = ["task", "waiting"]
+
+    def __init__(self, task):
+        self.task = task
+        self.waiting = 0
+
+
+class Coalescer:
+    """
+    Makes identical Get messages that are sent to the same device at the same
+    time share one send.
+
+    Messages are identical if they have the same serial, pkt_type, ack_required,
+    res_required and payload, and are sent with the same timeout, no_retry and
+    connect_timeout. Only messages whose name starts with ``Get`` are shared,
+    because those don't change the device.
+
+    If ``fresh_for`` is more than zero, then the replies are also given to
+    identical messages sent up to that many seconds after the replies arrived.
+
+    The number of sends that were shared is recorded in ``coalesced`` and the
+    number that used recent replies in ``fresh``.
+    """
+
+    def __init__(self, fresh_for=0):
+        self.fresh_for = fresh_for
+
+        self.recent = {}
+        self.inflight = {}
+        self.next_prune = 0
+
+        self.fresh = 0
+        self.coalesced = 0
+
+    def key_for(self, original, packet, *, timeout, no_retry=False, broadcast=False, connect_timeout=10):
+        """Return the key to share this message with, or None if it shouldn't be shared"""
+        if broadcast or not type(original).__name__.startswith("Get"):
+            return None
+
+        payload = packet.payload
+        if not isinstance(payload, bytes):
+            if packet.is_dynamic:
+                return None
+            payload = payload.pack().tobytes()
+
+        return (
+            packet.serial,
+            packet.pkt_type,
+            packet.ack_required,
+            packet.res_required,
+            payload,
+            timeout,
+            no_retry,
+            connect_timeout,
+        )
+
+    async def send(self, key, timeout, send):
+        """
+        Return the replies for this key, calling ``send`` to get them if no
+        identical message is in flight or was recently answered.
+        """
+        if self.fresh_for > 0:
+            recent = self.recent.get(key)
+            if recent is not None:
+                if time.time() - recent[0] < self.fresh_for:
+                    self.fresh += 1
+                    return list(recent[1])
+                del self.recent[key]
+
+        inflight = self.inflight.get(key)
+        if inflight is None:
+            inflight = self.inflight[key] = InFlight(hp.async_as_background(send()))
+            inflight.task.add_done_callback(self.finished(key, inflight))
+        else:
+            self.coalesced += 1
+            log.debug(hp.lc("Sharing in flight message", serial=key[0], pkt_type=key[1]))
+
+        inflight.waiting += 1
+        try:
+            return list(await asyncio.wait_for(asyncio.shield(inflight.task), timeout=timeout))
+        except asyncio.TimeoutError:
+            raise TimedOut("Waiting for reply to a packet", serial=key[0], sent_pkt_type=key[1])
+        finally:
+            inflight.waiting -= 1
+            if inflight.waiting == 0 and not inflight.task.done():
+                inflight.task.cancel()
+
+    def finished(self, key, inflight):
+        def finished(res):
+            if self.inflight.get(key) is inflight:
+                del self.inflight[key]
+
+            if self.fresh_for <= 0 or res.cancelled() or res.exception() is not None:
+                return
+
+            now = time.time()
+            if now >= self.next_prune:
+                self.recent = {k: v for k, v in self.recent.items() if now - v[0] < self.fresh_for}
+                self.next_prune = now + self.fresh_for
+            self.recent[key] = (now, res.result())
+
+        return finished
+
+
+class CoalesceOptions(dictobj.Spec):
+    enabled = dictobj.Field(
+        sb.boolean,
+        default=False,
+        help="Whether identical Get messages sent to a device at the same time share one send",
+    )
+
+    fresh_for = dictobj.Field(
+        sb.float_spec,
+        default=0,
+        help="How many seconds the replies to a Get message may be given to identical messages",
+    )
+
+    def make_coalescer(self):
+        return Coalescer(fresh_for=self.fresh_for)
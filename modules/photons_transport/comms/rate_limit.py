@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+
+from delfick_project.norms import BadSpecValue, dictobj, sb
+from photons_app import helpers as hp
+from photons_messages import DeviceMessages
+from photons_products import Products
+
+log = logging.getLogger("photons_transport.comms.rate_limit")
+
+
+class TokenBucket:
+    """Gains ``rate`` tokens a second and holds at most ``burst`` of them"""
+
+    __slots__ = ["rate", "burst", "tokens", "updated"]
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+
+    def change(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = min(self.tokens, burst)
+
+    def reserve(self):
+        """
+        Take a token and return how long to wait before using it.
+
+        Tokens may be taken before they are available, which means the callers
+        waiting on a bucket are given tokens in the order they asked for them.
+        """
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class RateLimiter:
+    """
+    Limits how many messages are sent to each device with a ``TokenBucket`` per
+    serial.
+
+    Each device waits on it's own bucket, so a burst of messages to one device
+    doesn't hold up messages to other devices.
+
+    The rate and burst for a device are ``rate`` and ``burst`` until we see a
+    ``StateVersion`` from that device, after which they come from ``products``
+    if the product is in there.
+    """
+
+    def __init__(self, rate, burst, products=None):
+        self.rate = rate
+        self.burst = burst
+        self.products = products or {}
+
+        self.buckets = {}
+        self.product_names = {}
+
+        self.delayed = 0
+        self.delayed_for = 0
+
+    def limits_for(self, serial):
+        limits = self.products.get(self.product_names.get(serial))
+        if limits is None:
+            return self.rate, self.burst
+        return limits.rate, limits.burst
+
+    def saw(self, pkt):
+        """Record the product of the device if this packet is a StateVersion"""
+        if not pkt | DeviceMessages.StateVersion:
+            return
+
+        name = Products[pkt.vendor, pkt.product].name
+        if self.product_names.get(pkt.serial) == name:
+            return
+
+        self.product_names[pkt.serial] = name
+        bucket = self.buckets.get(pkt.serial)
+        if bucket is not None:
+            bucket.change(*self.limits_for(pkt.serial))
+
+    async def acquire(self, serial):
+        """Wait till we may send another message to this serial"""
+        bucket = self.buckets.get(serial)
+        if bucket is None:
+            bucket = self.buckets[serial] = TokenBucket(*self.limits_for(serial))
+
+        if bucket.rate <= 0:
+            return
+
+        wait = bucket.reserve()
+        if wait <= 0:
+            return
+
+        self.delayed += 1
+        self.delayed_for += wait
+        log.debug(hp.lc("Waiting to send to device", serial=serial, wait=round(wait, 3)))
+
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            bucket.refund()
+            raise
+
+
+class product_name_spec(sb.Spec):
+    def normalise_filled(self, meta, val):
+        val = sb.string_spec().normalise(meta, val)
+        if val not in set(Products.names):
+            raise BadSpecValue("Unknown product", got=val, meta=meta)
+        return val
+
+
+class RateLimit(dictobj.Spec):
+    rate = dictobj.Field(
+        sb.float_spec,
+        default=0,
+        help="""
+        How many messages a second to send to each device. The default of 0
+        means messages aren't limited
+        """,
+    )
+
+    burst = dictobj.Field(
+        sb.integer_spec,
+        default=5,
+        help="How many messages may be sent to a device at once before they are limited to rate",
+    )
+
+
+class RateLimitOptions(RateLimit):
+    products = dictobj.Field(
+        sb.dictof(product_name_spec(), RateLimit.FieldSpec()),
+        help="""
+        A dictionary of product name, as in ``photons_products.Products``, to
+        the rate and burst to use for that product instead
+        """,
+    )
+
+    @property
+    def enabled(self):
+        return self.rate > 0 or any(limits.rate > 0 for limits in self.products.values())
+
+    def make_limiter(self):
+        return RateLimiter(self.rate, self.burst, self.products)
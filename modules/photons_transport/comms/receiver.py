@@ -3,17 +3,24 @@ import logging
 from bitarray import bitarray
 from photons_app import helpers as hp
 
+from photons_transport.comms.routing import RoutingTable
+from photons_transport.comms.view import PacketView
+
 log = logging.getLogger("photons_transport.comms.receiver")
 
 
 class Receiver:
-    """Hold onto and routes replies from the bridge"""
+    """
+    Hold onto and routes replies from the bridge
+
+    Results waiting for replies are kept in a ``RoutingTable`` at ``routes``.
+    """
 
     message_catcher = NotImplemented
 
     def __init__(self):
-        self.results = {}
         self.blank_target = bitarray("0" * 8 * 8).tobytes()
+        self.routes = RoutingTable(self.blank_target)
 
     @property
     def loop(self):
@@ -21,17 +28,29 @@ class Receiver:
 
     def register(self, packet, result, original):
         """Register a future waiting for a result"""
-        key = (packet.source, packet.sequence, packet.target)
-        self.results[key] = (original, result)
+        self.routes.add(packet.source, packet.sequence, packet.target, original, result)
 
-        def cleanup(res):
-            if key in self.results:
-                del self.results[key]
+    def materialise(self, pkt):
+        """
+        Turn a ``PacketView`` into the packet it represents
 
-        result.add_done_callback(cleanup)
+        Return None if that isn't possible.
+        """
+        if not isinstance(pkt, PacketView):
+            return pkt
+
+        try:
+            return pkt.materialise()
+        except Exception as error:
+            log.exception(hp.lc("Failed to unpack received packet", error=error, serial=pkt.serial, pkt_type=pkt.pkt_type))
 
     async def recv(self, pkt, addr, allow_zero=False):
-        """Find the result for this packet and add the packet"""
+        """
+        Find the result for this packet and add the packet
+
+        If the packet is a ``PacketView`` then it is only unpacked if there is
+        something to give it to.
+        """
         if getattr(pkt, "represents_ack", False):
             log.debug(hp.lc("Got ACK", source=pkt.source, sequence=pkt.sequence, serial=pkt.serial))
         else:
@@ -45,28 +64,37 @@ class Receiver:
                 )
             )
 
-        key = (pkt.source, pkt.sequence, pkt.target)
-        broadcast_key = (pkt.source, pkt.sequence, self.blank_target)
-
         if pkt.source == 0 and pkt.sequence == 0:
             if not allow_zero:
                 log.warning("Received message with 0 source and sequence")
                 return
 
-        if key not in self.results and broadcast_key not in self.results:
+        route = self.routes.find(pkt.source, pkt.sequence, pkt.target)
+        self.routes.record(route)
+
+        if route is None or not route.active:
             if self.message_catcher is not NotImplemented and callable(self.message_catcher):
-                await self.message_catcher(pkt)
+                pkt = self.materialise(pkt)
+                if pkt is not None:
+                    await self.message_catcher(pkt)
             else:
                 # This usually happens when Photons retries a message
                 # But gets a reply from multiple of these requests
-                # The first one back will unregister the future
+                # The first one back will finish the result
                 # And so there's nothing to resolve with this newly received data
-                log.debug(hp.lc("Received a message that wasn't expected", key=key, serial=pkt.serial))
+                log.debug(
+                    hp.lc(
+                        "Received a message that wasn't expected",
+                        source=pkt.source,
+                        sequence=pkt.sequence,
+                        serial=pkt.serial,
+                    )
+                )
             return
 
-        if key not in self.results:
-            key = broadcast_key
+        pkt = self.materialise(pkt)
+        if pkt is None:
+            return
 
-        original = self.results[key][0]
-        pkt.Information.update(remote_addr=addr, sender_message=original)
-        self.results[key][1].add_packet(pkt)
+        pkt.Information.update(remote_addr=addr, sender_message=route.original)
+        route.result.add_packet(pkt)
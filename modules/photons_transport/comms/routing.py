@@ -0,0 +1,168 @@
+import logging
+import time
+
+from photons_app import helpers as hp
+
+log = logging.getLogger("photons_transport.comms.routing")
+
+
+class Route:
+    """A result waiting for replies to a packet"""
+
+    __slots__ = ["key", "sequence", "original", "result"]
+
+    def __init__(self, key, sequence, original, result):
+        self.key = key
+        self.sequence = sequence
+        self.original = original
+        self.result = result
+
+    @property
+    def active(self):
+        return not self.result.done()
+
+    def __repr__(self):
+        return f"<Route {self.key[0]}:{self.sequence}:{self.key[1].hex()}>"
+
+
+class RoutingTable:
+    """
+    Knows which result is waiting for a reply.
+
+    Routes are stored in 256 slots per ``(source, target)``, one for each
+    sequence number. Registering a route for a sequence that already has an
+    active route replaces it and is counted as a ``collision``.
+
+    Routes are not removed when their result is done. Instead every route is
+    put on a timing wheel of ``size`` buckets that turns every ``resolution``
+    seconds. When a bucket comes around, the routes in it that are done are
+    removed and the rest are put back onto the wheel.
+
+    Replies are counted:
+
+    matched
+        Replies given to an active route
+
+    late
+        Replies for a route whose result was cancelled or errored
+
+    duplicate
+        Replies for a route whose result already has what it needs
+
+    unmatched
+        Replies that don't have a route
+    """
+
+    def __init__(self, blank_target, *, resolution=0.5, size=16):
+        self.blank_target = blank_target
+        self.resolution = resolution
+
+        self.slots = {}
+        self.count = 0
+
+        self.wheel = [[] for _ in range(size)]
+        self.position = 0
+        self.next_turn = time.time() + resolution
+
+        self.late = 0
+        self.matched = 0
+        self.expired = 0
+        self.duplicate = 0
+        self.unmatched = 0
+        self.collisions = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, source, sequence, target, original, result):
+        """Add a route for replies to this source, sequence and target"""
+        self.turn()
+
+        key = (source, target)
+        slots = self.slots.get(key)
+        if slots is None:
+            slots = self.slots[key] = [None] * 256
+
+        existing = slots[sequence]
+        if existing is None:
+            self.count += 1
+        elif existing.active:
+            self.collisions += 1
+            log.warning(hp.lc("Replaced a route that was still waiting for replies", source=source, sequence=sequence, target=target.hex()))
+
+        route = slots[sequence] = Route(key, sequence, original, result)
+        self.wheel[self.position - 1].append(route)
+        return route
+
+    def find(self, source, sequence, target):
+        """
+        Return the route for this reply, or None if there isn't one.
+
+        An active route is preferred over one that is done and a route for the
+        target is preferred over a route for the broadcast target.
+        """
+        found = None
+        for key in ((source, target), (source, self.blank_target)):
+            slots = self.slots.get(key)
+            if slots is None:
+                continue
+
+            route = slots[sequence]
+            if route is not None:
+                if route.active:
+                    return route
+                if found is None:
+                    found = route
+
+        return found
+
+    def record(self, route):
+        """Count a reply for this route, which may be None"""
+        if route is None:
+            self.unmatched += 1
+        elif route.active:
+            self.matched += 1
+        elif route.result.cancelled() or route.result.exception() is not None:
+            self.late += 1
+        else:
+            self.duplicate += 1
+
+    def turn(self, now=None):
+        """Process any buckets on the wheel that have come around since the last turn"""
+        if now is None:
+            now = time.time()
+
+        if now < self.next_turn:
+            return
+
+        size = len(self.wheel)
+        turns = min(size, int((now - self.next_turn) / self.resolution) + 1)
+        self.next_turn = now + self.resolution
+
+        for _ in range(turns):
+            bucket = self.wheel[self.position]
+            self.wheel[self.position] = []
+            self.position = (self.position + 1) % size
+            self.expire(bucket)
+
+    def expire(self, bucket):
+        keep = self.wheel[self.position - 1]
+        emptied = set()
+
+        for route in bucket:
+            slots = self.slots.get(route.key)
+            if slots is None or slots[route.sequence] is not route:
+                continue
+
+            if route.active:
+                keep.append(route)
+                continue
+
+            slots[route.sequence] = None
+            self.count -= 1
+            self.expired += 1
+            emptied.add(route.key)
+
+        for key in emptied:
+            if not any(self.slots[key]):
+                del self.slots[key]
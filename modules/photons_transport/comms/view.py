@@ -0,0 +1,77 @@
+import binascii
+import struct
+
+source_struct = struct.Struct("<I")
+pkt_type_struct = struct.Struct("<H")
+
+
+class PacketView:
+    """
+    A lazy view of a protocol 1024 datagram.
+
+    The header fields used to route a reply to the ``Receiver`` are read from
+    fixed offsets in the data when they are accessed. The packet itself is only
+    created with ``PacketKls.create`` when ``materialise`` is called or some
+    other attribute is accessed.
+
+    This means replies that nothing is waiting for can be dropped without
+    parsing the whole packet.
+    """
+
+    represents_ack = False
+
+    __slots__ = ["data", "PacketKls", "_packet"]
+
+    def __init__(self, data, PacketKls):
+        self.data = memoryview(data)
+        self.PacketKls = PacketKls
+        self._packet = None
+
+    @property
+    def protocol(self):
+        return pkt_type_struct.unpack_from(self.data, 2)[0] & 0xFFF
+
+    @property
+    def source(self):
+        return source_struct.unpack_from(self.data, 4)[0]
+
+    @property
+    def target(self):
+        return bytes(self.data[8:16])
+
+    @property
+    def serial(self):
+        return binascii.hexlify(self.data[8:14]).decode()
+
+    @property
+    def sequence(self):
+        return self.data[23]
+
+    @property
+    def pkt_type(self):
+        return pkt_type_struct.unpack_from(self.data, 32)[0]
+
+    @property
+    def Information(self):
+        return self.materialise().Information
+
+    @property
+    def materialised(self):
+        return self._packet is not None
+
+    def materialise(self):
+        """Create the packet this view represents, if it hasn't been created already"""
+        if self._packet is None:
+            self._packet = self.PacketKls.create(self.data)
+        return self._packet
+
+    def __or__(self, kls):
+        return kls.Payload.Meta.protocol == self.protocol and kls.Payload.message_type == self.pkt_type
+
+    def __getattr__(self, key):
+        return getattr(self.materialise(), key)
+
+    def __repr__(self):
+        if self._packet is not None:
+            return repr(self._packet)
+        return f"<PacketView source: {self.source}, sequence: {self.sequence}, serial: {self.serial}, pkt_type: {self.pkt_type}>"
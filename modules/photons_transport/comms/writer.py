@@ -34,6 +34,7 @@ class Writer:
         self.modify_sequence()
         result = self.register()
         bts = await self.write()
+        self.measure(result)
 
         lc = hp.lc.using(
             serial=self.clone.serial,
@@ -62,6 +63,12 @@ class Writer:
             self.receiver.register(self.clone, result, self.original)
         return result
 
+    def measure(self, result):
+        """Let the retry gaps measure how long this result takes, if they want to"""
+        measure = getattr(self.retry_gaps, "measure", None)
+        if measure is not None and not self.did_broadcast and not result.done():
+            measure(result)
+
     async def write(self):
         bts = self.clone.tobytes(self.clone.serial)
         t = await self.transport.spawn(self.original, timeout=self.connect_timeout)
@@ -1,8 +1,11 @@
+import logging
 import time
 
 from delfick_project.norms import dictobj, sb
 from photons_app import helpers as hp
 
+log = logging.getLogger("photons_transport.retry_options")
+
 
 def Gaps(*, gap_between_results, gap_between_ack_and_res, timeouts):
     default_timeouts = timeouts
@@ -112,3 +115,134 @@ class RetryTicker:
                         end = None
 
                 yield round(final_time - now, 3), nxt
+
+
+class RTTEstimate:
+    """The smoothed round trip time and variance for one device"""
+
+    __slots__ = ["srtt", "rttvar", "samples"]
+
+    def __init__(self, rtt):
+        self.srtt = rtt
+        self.rttvar = rtt / 2
+        self.samples = 1
+
+    def add(self, rtt, alpha, beta):
+        self.rttvar = (1 - beta) * self.rttvar + beta * abs(self.srtt - rtt)
+        self.srtt = (1 - alpha) * self.srtt + alpha * rtt
+        self.samples += 1
+
+
+class RTTEstimator:
+    """
+    Keeps a smoothed round trip time and variance per serial and turns them
+    into a retry timeout the same way TCP does (RFC 6298).
+
+    The retry timeout is ``srtt + 4 * rttvar`` kept between ``min_rto`` and
+    ``max_rto``, and ``timeouts`` turns that into a schedule for a
+    ``RetryTicker`` that doubles the gap between retries until it reaches
+    ``max_rto``.
+    """
+
+    alpha = 1 / 8
+    beta = 1 / 4
+    k = 4
+
+    def __init__(self, *, min_rto=0.1, max_rto=5):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.estimates = {}
+
+    def add_sample(self, serial, rtt):
+        estimate = self.estimates.get(serial)
+        if estimate is None:
+            estimate = self.estimates[serial] = RTTEstimate(rtt)
+        else:
+            estimate.add(rtt, self.alpha, self.beta)
+
+        log.debug(
+            hp.lc(
+                "Measured round trip",
+                serial=serial,
+                rtt=round(rtt, 4),
+                srtt=round(estimate.srtt, 4),
+                rttvar=round(estimate.rttvar, 4),
+                rto=self.rto(serial),
+            )
+        )
+
+    def rto(self, serial):
+        """Return the retry timeout for this serial or None if we have no measurements"""
+        estimate = self.estimates.get(serial)
+        if estimate is None:
+            return None
+        rto = estimate.srtt + self.k * estimate.rttvar
+        return round(min(self.max_rto, max(self.min_rto, rto)), 3)
+
+    def timeouts(self, serial, default):
+        """Return the ``(step, end)`` schedule for this serial, or default if we have no measurements"""
+        rto = self.rto(serial)
+        if rto is None:
+            return default
+
+        timeouts = []
+        step = end = rto
+        while step < self.max_rto:
+            timeouts.append((step, round(end, 3)))
+            step = round(step * 2, 3)
+            end += step
+
+        timeouts.append((self.max_rto, round(end, 3)))
+        return timeouts
+
+    def measure(self, serial, result):
+        """Add a sample for this serial from how long it takes for the result to get it's first reply"""
+        sent_at = time.time()
+
+        def done(res):
+            if res.cancelled() or res.exception() is not None:
+                return
+            first = getattr(res, "first_received", None)
+            if first is not None:
+                self.add_sample(serial, max(0, first - sent_at))
+
+        result.add_done_callback(done)
+
+
+class AdaptiveGaps:
+    """
+    Wraps the gaps from a target so that the retry timeouts for a device come
+    from the round trip times measured for that device.
+
+    Everything except the retry schedule comes from the wrapped gaps.
+    """
+
+    def __init__(self, gaps, estimator, serial):
+        self.gaps = gaps
+        self.serial = serial
+        self.estimator = estimator
+
+    @property
+    def gap_between_results(self):
+        return self.gaps.gap_between_results
+
+    @property
+    def gap_between_ack_and_res(self):
+        return self.gaps.gap_between_ack_and_res
+
+    @property
+    def finish_multi_gap(self):
+        return self.gaps.finish_multi_gap
+
+    @property
+    def timeouts(self):
+        return self.estimator.timeouts(self.serial, self.gaps.timeouts)
+
+    def retry_ticker(self, name=None):
+        timeouts = self.timeouts
+        if timeouts is not self.gaps.timeouts:
+            log.debug(hp.lc("Using adaptive retry timeouts", serial=self.serial, timeouts=timeouts))
+        return RetryTicker(timeouts=timeouts, name=name)
+
+    def measure(self, result):
+        self.estimator.measure(self.serial, result)
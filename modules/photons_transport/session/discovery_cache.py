@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import time
+
+from photons_app import helpers as hp
+from photons_messages import Services
+
+log = logging.getLogger("photons_transport.session.discovery_cache")
+
+
+class DiscoveryCache:
+    """
+    Remembers where devices were found so that they can be sent messages
+    straight away the next time photons starts.
+
+    The file is json of
+    ``{serial: {"last_seen": <time>, "services": {"UDP": {"host": <ip>, "port": <port>}}}}``
+    and devices that haven't been seen for ``max_age`` seconds are ignored.
+
+    ``changed`` writes the file ``save_after`` seconds later so that finding
+    many devices one at a time doesn't write the file for every device.
+    """
+
+    max_age = 60 * 60 * 24
+    save_after = 1
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+        self._devices = None
+
+    @property
+    def devices(self):
+        if self._devices is None:
+            self._devices = self.load()
+        return self._devices
+
+    def load(self):
+        try:
+            with open(self.path) as fle:
+                devices = json.load(fle)
+        except FileNotFoundError:
+            return {}
+        except (OSError, TypeError, ValueError) as error:
+            log.warning(hp.lc("Failed to read discovery cache", path=self.path, error=error))
+            return {}
+
+        if not isinstance(devices, dict):
+            log.warning(hp.lc("Discovery cache wasn't a dictionary", path=self.path))
+            return {}
+
+        now = time.time()
+        loaded = {}
+        for serial, info in devices.items():
+            try:
+                if now - info["last_seen"] > self.max_age:
+                    continue
+                services = {name: {"host": o["host"], "port": int(o["port"])} for name, o in info["services"].items() if name in Services.__members__}
+            except (AttributeError, KeyError, TypeError, ValueError):
+                log.warning(hp.lc("Ignoring invalid entry in discovery cache", path=self.path, serial=serial))
+                continue
+
+            if services:
+                loaded[serial] = {"last_seen": info["last_seen"], "services": services}
+
+        return loaded
+
+    def services(self):
+        """Yield ``(serial, service, host, port)`` for everything in the cache"""
+        for serial, info in self.devices.items():
+            for name, options in info["services"].items():
+                yield serial, Services.__members__[name], options["host"], options["port"]
+
+    def add(self, serial, service, host, port):
+        info = self.devices.get(serial)
+        if info is None:
+            info = self.devices[serial] = {"services": {}}
+        info["last_seen"] = time.time()
+        info["services"][service.name] = {"host": host, "port": port}
+
+    def remove(self, serial):
+        self.devices.pop(serial, None)
+
+    def changed(self):
+        if self.handle is None:
+            self.handle = hp.get_event_loop().call_later(self.save_after, self.save)
+
+    def save(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        tmp = f"{self.path}.tmp"
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(tmp, "w") as fle:
+                json.dump(self.devices, fle, sort_keys=True)
+            os.replace(tmp, self.path)
+        except OSError as error:
+            log.warning(hp.lc("Failed to write discovery cache", path=self.path, error=error))
+
+    def finish(self):
+        """Write any changes that haven't been written yet"""
+        if self.handle is not None:
+            self.save()
@@ -6,6 +6,8 @@ from delfick_project.norms import BadSpecValue, Meta, dictobj, sb
 from delfick_project.option_merge import MergedOptions
 from photons_messages import Services
 
+from photons_transport.session.discovery_cache import DiscoveryCache
+
 
 class service_type_spec(sb.Spec):
     def normalise(self, meta, val):
@@ -114,6 +116,13 @@ class serial_filter_spec(sb.Spec):
         return sb.listof(serial_spec()).normalise(meta, val)
 
 
+class cache_file_spec(sb.Spec):
+    def normalise(self, meta, val):
+        if val in (None, sb.NotSpecified):
+            return val
+        return os.path.expanduser(sb.string_spec().normalise(meta, val))
+
+
 class DiscoveryOptions(dictobj.Spec):
     """
     Used by NetworkSession to determine if we do broadcast discovery or hardcoded
@@ -129,10 +138,20 @@ class DiscoveryOptions(dictobj.Spec):
     Note that regardless of what you specify, if you have an HARDCODED_DISCOVERY
     in your environment, then hardcoded_discovery will be based off that, and
     the same goes for serial_filter and SERIAL_FILTER env variable.
+
+    cache_file may be a path to a file that remembers where devices were found.
+    The first discovery will use devices from that file straight away and
+    check they are still there in the background.
+
+    passive may be True to say that any StateService that arrives on our
+    sockets should update where we think devices are, even if we weren't
+    doing a discovery at the time.
     """
 
     serial_filter = dictobj.Field(serial_filter_spec)
     hardcoded_discovery = dictobj.Field(hardcoded_discovery_spec)
+    cache_file = dictobj.Field(cache_file_spec)
+    passive = dictobj.Field(sb.optional_spec(sb.boolean()))
 
     async def discover(self, add_service):
         found_now = set()
@@ -152,15 +171,26 @@ class DiscoveryOptions(dictobj.Spec):
     def has_hardcoded_discovery(self):
         return self.hardcoded_discovery and self.hardcoded_discovery is not sb.NotSpecified
 
+    @property
+    def has_passive_discovery(self):
+        return self.passive is True and not self.has_hardcoded_discovery
+
+    def make_cache(self):
+        """Return a DiscoveryCache if we have a cache_file"""
+        if not self.cache_file or self.cache_file is sb.NotSpecified:
+            return None
+        return DiscoveryCache(self.cache_file)
+
 
 class NoDiscoveryOptions(DiscoveryOptions):
     """
-    A DiscoveryOptions object that will never have hardcoded_discovery or
-    serial_filter
+    A DiscoveryOptions object that will never have hardcoded_discovery,
+    serial_filter or cache_file
     """
 
     serial_filter = dictobj.Field(sb.overridden(None))
     hardcoded_discovery = dictobj.Field(sb.overridden(None))
+    cache_file = dictobj.Field(sb.overridden(None))
 
 
 class NoEnvDiscoveryOptions(DiscoveryOptions):
@@ -201,4 +231,10 @@ class discovery_options_spec(sb.Spec):
         elif isinstance(base.serial_filter, list):
             base.serial_filter = list(base.serial_filter)
 
+        if val.cache_file is not sb.NotSpecified:
+            base.cache_file = val.cache_file
+
+        if val.passive is not sb.NotSpecified:
+            base.passive = val.passive
+
         return base
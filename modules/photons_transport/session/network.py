@@ -1,13 +1,15 @@
+import asyncio
 import binascii
 import logging
 
+from delfick_project.norms import sb
 from photons_app import helpers as hp
 from photons_messages import DiscoveryMessages, Services
 
 from photons_transport.comms.base import Communication
 from photons_transport.errors import InvalidBroadcast, NoDesiredService, UnknownService
-from photons_transport.retry_options import RetryTicker
-from photons_transport.transports.udp import UDP
+from photons_transport.retry_options import AdaptiveGaps, RetryTicker, RTTEstimator
+from photons_transport.transports.udp import UDP, SharedUDP, SocketPool
 
 log = logging.getLogger("photons_transport.session.network")
 
@@ -16,14 +18,87 @@ class NetworkSession(Communication):
     """
     Knows how to discover by broadcasting GetService. It then knows per packet
     which service to use for sending messages.
+
+    If the target has ``shared_sockets`` set to more than zero, then all
+    messages are sent through that many shared sockets rather than a socket
+    per device.
+
+    If the target has ``adaptive_retries`` set to True, then the retry timeouts
+    for each device come from the round trip times measured for that device.
+
+    If the target has a ``rate_limit`` with a rate, then messages to each
+    device are limited by a ``RateLimiter``.
+
+    If the discovery options have a ``cache_file``, then the first search uses
+    the devices in that file and checks they are still there in the background
+    by searching the network for the whole of the search timeout.
+
+    If the discovery options have ``passive`` set to True, then any StateService
+    we receive updates where we send messages for that device.
+
+    If the target has ``coalesce`` enabled, then identical Get messages sent to
+    a device at the same time share one send with a ``Coalescer``.
+
+    If the target has a ``capability_cache_file``, then the product and firmware
+    of devices are remembered in that file by a ``CapabilityCache``.
+
+    If the target has a ``gatherer_snapshot_file``, then the replies in the
+    gatherer are saved to that file when the session finishes and loaded by
+    the next session with a ``GathererSnapshot``.
     """
 
     UDPTransport = UDP
+    SharedUDPTransport = SharedUDP
 
     def setup(self):
         self.broadcast_transports = {}
 
+        self.used_discovery_cache = False
+        self.verify_cache_task = None
+
+        self.passively_found = 0
+        self.passive_targets = set()
+        discovery_options = getattr(self.transport_target, "discovery_options", None)
+        if discovery_options is not None:
+            self.passive_discovery = discovery_options.has_passive_discovery
+
+        self.socket_pool = None
+        shared_sockets = getattr(self.transport_target, "shared_sockets", 0)
+        if shared_sockets:
+            self.socket_pool = SocketPool(self, shared_sockets)
+
+        self.rtt = None
+        if getattr(self.transport_target, "adaptive_retries", False):
+            self.rtt = RTTEstimator()
+
+        rate_limit = getattr(self.transport_target, "rate_limit", None)
+        if rate_limit is not None and rate_limit.enabled:
+            self.rate_limiter = rate_limit.make_limiter()
+
+        coalesce = getattr(self.transport_target, "coalesce", None)
+        if coalesce is not None and coalesce.enabled:
+            self.coalescer = coalesce.make_coalescer()
+
+        capability_cache_file = getattr(self.transport_target, "capability_cache_file", None)
+        if capability_cache_file and capability_cache_file is not sb.NotSpecified:
+            capability_cache = __import__("photons_control.planner.capability_cache").planner.capability_cache
+            self.capability_cache = capability_cache.CapabilityCache(capability_cache_file)
+
+        gatherer_snapshot_file = getattr(self.transport_target, "gatherer_snapshot_file", None)
+        if gatherer_snapshot_file and gatherer_snapshot_file is not sb.NotSpecified:
+            snapshot = __import__("photons_control.planner.snapshot").planner.snapshot
+            self.gatherer_snapshot = snapshot.GathererSnapshot(gatherer_snapshot_file, self.transport_target.protocol_register)
+
     async def finish(self, exc_typ=None, exc=None, tb=None):
+        if self.verify_cache_task is not None:
+            self.verify_cache_task.cancel()
+            await hp.wait_for_all_futures(self.verify_cache_task, name=f"{type(self).__name__}::finish[wait_for_verify_cache]")
+
+        # Only if we made the discovery cache, otherwise there's nothing to write
+        discovery_cache = getattr(self, "_discovery_cache", None)
+        if discovery_cache is not None:
+            discovery_cache.finish()
+
         await super().finish(exc_typ, exc, tb)
 
         ts = [hp.async_as_background(t.close()) for t in self.broadcast_transports.values()]
@@ -35,8 +110,14 @@ class NetworkSession(Communication):
                 if exc:
                     log.error(hp.lc("Failed to close broadcast transport", error=exc))
 
+        if self.socket_pool is not None:
+            await self.socket_pool.close()
+
     def retry_gaps(self, packet, transport):
-        return self.transport_target.gaps
+        gaps = self.transport_target.gaps
+        if self.rtt is None:
+            return gaps
+        return AdaptiveGaps(gaps, self.rtt, packet.serial)
 
     async def determine_needed_transport(self, packet, services):
         return [Services.UDP]
@@ -57,14 +138,98 @@ class NetworkSession(Communication):
 
         raise NoDesiredService("Don't have a desired service", need=need, have=list(services))
 
-    async def _do_search(self, serials, timeout, **kwargs):
-        found_now = set()
+    @hp.memoized_property
+    def discovery_cache(self):
+        return self.transport_target.discovery_options.make_cache()
+
+    async def _do_search(self, serials, timeout, ignore_lost=False, **kwargs):
         discovery_options = self.transport_target.discovery_options
 
         if discovery_options.has_hardcoded_discovery:
             log.debug("Using hard coded discovery information")
             return await discovery_options.discover(self.add_service)
 
+        if not self.used_discovery_cache and self.discovery_cache is not None:
+            self.used_discovery_cache = True
+            found_now = await self._search_cache(serials)
+            if found_now:
+                self.verify_cache_task = hp.async_as_background(self._verify_cache(found_now, timeout, dict(kwargs), ignore_lost=ignore_lost))
+                return found_now
+
+        return await self._search_network(serials, timeout, **kwargs)
+
+    async def add_passive_service(self, pkt, addr):
+        """Add this service if it's for a device we don't know or that has moved"""
+        if not self.transport_target.discovery_options.want(pkt.serial):
+            return
+
+        services = self.found[pkt.serial] if pkt.serial in self.found else {}
+        if pkt.service in services:
+            existing = services[pkt.service]
+            if existing is None or (existing.host == addr[0] and existing.port == pkt.port):
+                return
+
+        self.passively_found += 1
+        self.passive_targets.add(binascii.unhexlify(pkt.serial)[:6])
+        log.info(hp.lc("Passively discovered device", serial=pkt.serial, host=addr[0], port=pkt.port))
+        await self.add_service(pkt.serial, pkt.service, host=addr[0], port=pkt.port)
+
+        if self.discovery_cache is not None:
+            self.discovery_cache.add(pkt.serial, pkt.service, addr[0], pkt.port)
+            self.discovery_cache.changed()
+
+    async def _search_cache(self, serials):
+        """Add the devices in our discovery cache and return them if they include all the serials we want"""
+        found_now = set()
+        discovery_options = self.transport_target.discovery_options
+
+        for serial, service, host, port in list(self.discovery_cache.services()):
+            if discovery_options.want(serial):
+                found_now.add(binascii.unhexlify(serial)[:6])
+                await self.add_service(serial, service, host=host, port=port)
+
+        if serials is not None and not all(binascii.unhexlify(serial)[:6] in found_now for serial in serials):
+            return None
+
+        log.debug(hp.lc("Using devices from discovery cache", found=len(found_now)))
+        return list(found_now)
+
+    async def _verify_cache(self, found_before, timeout, kwargs, ignore_lost=False):
+        """
+        Search the network for the whole of timeout and forget the devices from
+        our cache that weren't found, unless they were found passively.
+
+        Devices are only removed from ``found`` if ``ignore_lost`` is False.
+        """
+        try:
+            found_now = await self._search_network(None, timeout, until_timeout=True, **kwargs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            log.error(hp.lc("Failed to verify discovery cache", error=error))
+            return
+
+        if not found_now:
+            log.warning(hp.lc("No devices replied when verifying the discovery cache"))
+            return
+
+        found_now = [*found_now, *(target for target in self.passive_targets if target not in found_now)]
+
+        lost = [target for target in found_before if target not in found_now]
+        if lost:
+            log.info(hp.lc("Forgetting devices from discovery cache", lost=[binascii.hexlify(target).decode() for target in lost]))
+
+        if not ignore_lost:
+            await self.found.remove_lost(found_now)
+
+        for target in lost:
+            self.discovery_cache.remove(binascii.hexlify(target).decode())
+        self.discovery_cache.save()
+
+    async def _search_network(self, serials, timeout, until_timeout=False, **kwargs):
+        found_now = set()
+        discovery_options = self.transport_target.discovery_options
+
         get_service = DiscoveryMessages.GetService(target=None, tagged=True, addressable=True, res_required=True, ack_required=False)
 
         kwargs["no_retry"] = True
@@ -81,13 +246,20 @@ class NetworkSession(Communication):
                         addr = pkt.Information.remote_addr
                         found_now.add(pkt.target[:6])
                         await self.add_service(pkt.serial, pkt.service, host=addr[0], port=pkt.port)
+                        if self.discovery_cache is not None:
+                            self.discovery_cache.add(pkt.serial, pkt.service, addr[0], pkt.port)
 
-            if serials is None:
+            if until_timeout:
+                continue
+            elif serials is None:
                 if found_now:
                     break
             elif all(binascii.unhexlify(serial)[:6] in found_now for serial in serials):
                 break
 
+        if found_now and self.discovery_cache is not None:
+            self.discovery_cache.save()
+
         return list(found_now)
 
     async def _search_retry_iterator(self, end_after):
@@ -104,6 +276,9 @@ class NetworkSession(Communication):
         if service != Services.UDP:
             raise UnknownService(service=service)
 
+        if self.socket_pool is not None:
+            return self.SharedUDPTransport(self, kwargs["host"], kwargs["port"], serial=serial)
+
         return self.UDPTransport(self, kwargs["host"], kwargs["port"], serial=serial)
 
     async def make_broadcast_transport(self, broadcast):
@@ -119,6 +294,9 @@ class NetworkSession(Communication):
         if broadcast in self.broadcast_transports:
             return self.broadcast_transports[broadcast]
 
-        transport = UDP(self, *broadcast)
+        if self.socket_pool is not None:
+            transport = self.SharedUDPTransport(self, *broadcast)
+        else:
+            transport = UDP(self, *broadcast)
         self.broadcast_transports[broadcast] = transport
         return transport
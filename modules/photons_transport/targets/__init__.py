@@ -3,19 +3,47 @@ A target encapsulates the logic for finding devices over a particular medium and
 then talking to them over that medium.
 """
 
-from delfick_project.norms import dictobj, sb
+from delfick_project.norms import BadSpecValue, dictobj, sb
 
+from photons_transport.comms.coalesce import CoalesceOptions
+from photons_transport.comms.rate_limit import RateLimitOptions
 from photons_transport.retry_options import Gaps
-from photons_transport.session.discovery_options import discovery_options_spec
+from photons_transport.session.discovery_options import cache_file_spec, discovery_options_spec
 from photons_transport.session.network import NetworkSession
 from photons_transport.targets.base import Target
 
 
+class shared_sockets_spec(sb.Spec):
+    def normalise_filled(self, meta, val):
+        val = sb.integer_spec().normalise(meta, val)
+        if val < 0:
+            raise BadSpecValue("shared_sockets can't be less than 0", got=val, meta=meta)
+        return val
+
+
 class LanTarget(Target):
     """
-    Knows how to talk to a device over the local network. It's one configuration
+    Knows how to talk to a device over the local network. It's main configuration
     option is default_broadcast which says what address to broadcast discovery
     if broadcast is given to sender calls as True.
+
+    It can also be given shared_sockets to say how many udp sockets to share
+    between all the devices. The default of 0 means each device gets it's own
+    socket.
+
+    And adaptive_retries to say that the time between retries for a device
+    should come from how long that device takes to reply.
+
+    And rate_limit to limit how many messages a second are sent to each device.
+
+    And coalesce to make identical Get messages sent to a device at the same
+    time share one send.
+
+    And capability_cache_file to remember the product and firmware of devices
+    between runs.
+
+    And gatherer_snapshot_file to let the next run use recent replies from the
+    gatherer.
     """
 
     gaps = dictobj.Field(
@@ -28,6 +56,12 @@ class LanTarget(Target):
 
     default_broadcast = dictobj.Field(sb.defaulted(sb.string_spec(), "255.255.255.255"))
     discovery_options = dictobj.Field(discovery_options_spec)
+    shared_sockets = dictobj.Field(sb.defaulted(shared_sockets_spec(), 0))
+    adaptive_retries = dictobj.Field(sb.defaulted(sb.boolean(), False))
+    rate_limit = dictobj.Field(RateLimitOptions.FieldSpec())
+    coalesce = dictobj.Field(CoalesceOptions.FieldSpec())
+    capability_cache_file = dictobj.Field(cache_file_spec)
+    gatherer_snapshot_file = dictobj.Field(cache_file_spec)
 
     session_kls = NetworkSession
 
@@ -17,7 +17,8 @@ async def sender_wrapper(target, sender=sb.NotSpecified, kwargs=None):
 
         if kwargs is not None:
             if "limit" not in kwargs:
-                kwargs["limit"] = 30
+                # A sender that limits messages per device doesn't need a global limit
+                kwargs["limit"] = 30 if getattr(sender, "rate_limiter", None) is None else None
 
             if kwargs["limit"] is not None and not hasattr(kwargs["limit"], "acquire"):
                 kwargs["limit"] = asyncio.Semaphore(kwargs["limit"])
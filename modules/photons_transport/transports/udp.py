@@ -52,3 +52,60 @@ class UDP(Socket):
         if platform.system() == "Windows":
             sock.bind(("", 0))
         return sock
+
+
+class SharedSocket(UDP):
+    """A UDP socket bound to a local port that many ``SharedUDP`` transports send through"""
+
+    def make_socket(self):
+        sock = super().make_socket()
+        if platform.system() != "Windows":
+            sock.bind(("", 0))
+        return sock
+
+
+class SharedUDP(UDP):
+    """
+    Knows how to send to an address over udp using one of the sockets in the
+    ``socket_pool`` on the session rather than a socket of it's own.
+
+    Replies come back through the shared socket and are given to the session
+    like any other reply, where the receiver works out which message they are for.
+    """
+
+    def clone_for(self, session):
+        if getattr(session, "socket_pool", None) is None:
+            return UDP(session, self.host, self.port, serial=self.serial)
+        return super().clone_for(session)
+
+    async def spawn_transport(self, timeout):
+        return await self.session.socket_pool.socket_for(self.address, timeout)
+
+    async def close_transport(self, transport):
+        # The socket belongs to the pool and is closed when the session is finished
+        pass
+
+
+class SocketPool:
+    """
+    A fixed number of ``SharedSocket`` objects for ``SharedUDP`` transports.
+
+    Each address is always given the same socket.
+    """
+
+    def __init__(self, session, size):
+        self.sockets = [SharedSocket(session, "0.0.0.0", 0) for _ in range(size)]
+
+    def __len__(self):
+        return len(self.sockets)
+
+    async def socket_for(self, address, timeout):
+        shared = self.sockets[hash(address) % len(self.sockets)]
+        return await shared.spawn(None, timeout=timeout)
+
+    async def close(self):
+        for shared in self.sockets:
+            try:
+                await shared.close()
+            except Exception as error:
+                log.error(hp.lc("Failed to close shared socket", error=error))
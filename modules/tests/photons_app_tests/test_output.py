@@ -0,0 +1,96 @@
+import asyncio
+import enum
+import io
+import json
+
+from photons_app import helpers as hp
+from photons_app.output import NDJsonWriter, jsonable
+
+
+class Thing(enum.Enum):
+    ONE = 1
+
+
+class TestJsonable:
+    def test_it_turns_objects_into_json_friendly_values(self):
+        assert jsonable(hp.Color(100, 1, 0.5, 3500)) == {"hue": 100, "saturation": 1, "brightness": 0.5, "kelvin": 3500}
+        assert jsonable(Thing.ONE) == "ONE"
+        assert jsonable(b"\x01\xff") == "01ff"
+        assert jsonable({3, 1, 2}) == [1, 2, 3]
+        assert jsonable(object) == repr(object)
+
+
+class TestNDJsonWriter:
+    def test_it_writes_one_object_per_line_when_it_exits(self):
+        stream = io.StringIO()
+        with NDJsonWriter(stream, flush_after=100) as writer:
+            writer.write({"serial": "d073d5000001", "color": hp.Color(0, 0, 1, 3500)})
+            writer.write({"serial": "d073d5000002", "type": Thing.ONE})
+            assert stream.getvalue() == ""
+
+        lines = stream.getvalue().split("\n")
+        assert lines[-1] == ""
+        assert [json.loads(line) for line in lines[:-1]] == [
+            {"serial": "d073d5000001", "color": {"hue": 0, "saturation": 0, "brightness": 1, "kelvin": 3500}},
+            {"serial": "d073d5000002", "type": "ONE"},
+        ]
+
+    def test_it_writes_in_chunks_of_buffer_size(self):
+        stream = io.StringIO()
+        writer = NDJsonWriter(stream, buffer_size=30, flush_after=100)
+
+        writer.write({"serial": "d073d5000001"})
+        assert stream.getvalue() == ""
+
+        writer.write({"serial": "d073d5000002"})
+        assert stream.getvalue() == '{"serial": "d073d5000001"}\n{"serial": "d073d5000002"}\n'
+        assert writer.lines == []
+        assert writer.size == 0
+
+        writer.flush()
+        assert stream.getvalue().count("\n") == 2
+
+    def test_it_writes_lines_that_have_waited_long_enough(self, FakeTime):
+        stream = io.StringIO()
+        writer = NDJsonWriter(stream, flush_after=0.5)
+
+        with FakeTime() as t:
+            t.set(1)
+            writer.write({"serial": "d073d5000001"})
+            assert stream.getvalue() == ""
+
+            t.set(1.6)
+            writer.write({"serial": "d073d5000002"})
+            assert stream.getvalue().count("\n") == 2
+
+    async def test_it_writes_a_lone_line_after_flush_after_seconds(self):
+        stream = io.StringIO()
+        writer = NDJsonWriter(stream, flush_after=0.01)
+
+        writer.write({"serial": "d073d5000001"})
+        assert stream.getvalue() == ""
+        assert writer.handle is not None
+
+        await asyncio.sleep(0.05)
+        assert stream.getvalue() == '{"serial": "d073d5000001"}\n'
+        assert writer.handle is None
+
+    async def test_it_cancels_the_delayed_write_when_it_flushes(self):
+        stream = io.StringIO()
+        writer = NDJsonWriter(stream, buffer_size=30, flush_after=0.01)
+
+        writer.write({"serial": "d073d5000001"})
+        handle = writer.handle
+        writer.write({"serial": "d073d5000002"})
+        assert stream.getvalue().count("\n") == 2
+        assert writer.handle is None
+        assert handle.cancelled()
+
+        await asyncio.sleep(0.05)
+        assert stream.getvalue().count("\n") == 2
+
+    def test_it_writes_to_stdout_by_default(self, capsys):
+        with NDJsonWriter() as writer:
+            writer.write({"serial": "d073d5000001"})
+
+        assert capsys.readouterr().out == '{"serial": "d073d5000001"}\n'
@@ -5,10 +5,11 @@ from unittest import mock
 import alt_pytest_asyncio
 import pytest
 from delfick_project.errors_pytest import assertRaises
-from delfick_project.norms import Meta
+from delfick_project.norms import BadSpecValue, Meta
 from photons_app import helpers as hp
 from photons_app.errors import BadOption
 from photons_app.formatter import MergedOptionStringFormatter
+from photons_app.output import NDJsonWriter
 from photons_app.photons_app import PhotonsApp
 
 
@@ -74,6 +75,27 @@ class TestPhotonsApp:
             with assertRaises(BadOption, f"The path {path} does not exist"):
                 make_photons_app(extra="file://no_exist_yo.json").extra_as_json
 
+    class TestNDJsonWriter:
+        def test_it_yields_None_for_text_output(self):
+            photons_app = make_photons_app()
+            assert photons_app.output == "text"
+            with photons_app.ndjson_writer() as writer:
+                assert writer is None
+
+        def test_it_complains_about_unknown_output(self):
+            with assertRaises(BadSpecValue):
+                make_photons_app(output="yaml")
+
+        def test_it_yields_a_writer_that_flushes_on_exit(self, capsys):
+            photons_app = make_photons_app(output="ndjson")
+            with photons_app.ndjson_writer() as writer:
+                assert isinstance(writer, NDJsonWriter)
+                writer.flush_after = 100
+                writer.write({"serial": "d073d5000001"})
+                assert capsys.readouterr().out == ""
+
+            assert capsys.readouterr().out == '{"serial": "d073d5000001"}\n'
+
     class TestCleanup:
         def test_it_runs_all_the_cleaners_and_then_calls_finish_on_all_the_targets(self):
             called = []
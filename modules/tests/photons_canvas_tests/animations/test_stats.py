@@ -0,0 +1,185 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from photons_app import helpers as hp
+from photons_canvas.animations import AnimationRunner
+from photons_canvas.animations import runner as runner_module
+from photons_canvas.animations.infrastructure import cannons
+from photons_canvas.animations.infrastructure.animation import Animation
+from photons_canvas.animations.infrastructure.stats import FrameStats, Timing
+from photons_messages import Services
+
+serial = "d073d5001337"
+
+
+class TestTiming:
+    def test_it_has_nothing_to_start_with(self):
+        assert Timing().as_dict() == {"count": 0, "average_ms": 0, "max_ms": 0}
+
+    def test_it_records_count_average_and_max(self):
+        timing = Timing()
+        timing.add(0.001)
+        timing.add(0.004)
+        timing.add(0.0025)
+        assert timing.as_dict() == {"count": 3, "average_ms": 2.5, "max_ms": 4}
+
+
+class TestFrameStats:
+    def test_it_records_ticks_frames_and_messages(self):
+        stats = FrameStats()
+        stats.tick(0)
+        stats.tick(2)
+        stats.frame(0.002, 0.001)
+        stats.frames_dropped += 1
+        stats.sent(3, 0.004)
+        stats.dropped(2)
+        stats.write.add(0.0015)
+
+        assert stats.as_dict() == {
+            "ticks": 2,
+            "ticks_missed": 2,
+            "frames": 1,
+            "frames_dropped": 1,
+            "messages_sent": 3,
+            "messages_dropped": 2,
+            "render": {"count": 1, "average_ms": 2, "max_ms": 2},
+            "encode": {"count": 1, "average_ms": 1, "max_ms": 1},
+            "send": {"count": 1, "average_ms": 4, "max_ms": 4},
+            "write": {"count": 1, "average_ms": 1.5, "max_ms": 1.5},
+        }
+
+        assert stats.summary() == {
+            "ticks": 2,
+            "ticks_missed": 2,
+            "frames": 1,
+            "frames_dropped": 1,
+            "messages_dropped": 2,
+            "render_ms": 2,
+            "encode_ms": 1,
+            "send_ms": 4,
+            "write_max_ms": 1.5,
+        }
+
+
+class TestCannon:
+    @pytest.fixture()
+    def cannon(self):
+        afr = mock.Mock(name="afr", found={serial: {Services.UDP: mock.Mock(name="service")}})
+        afr.seq.return_value = 1
+        sem = mock.Mock(name="sem", spec=["add", "should_drop"])
+        return cannons.FastNetworkCannon(afr, sem, stats=FrameStats())
+
+    async def test_it_counts_messages_it_drops(self, cannon):
+        cannon.sem.should_drop.return_value = True
+        msgs = [mock.Mock(name=f"msg{i}") for i in range(3)]
+
+        await cannon.fire(None, serial, msgs)
+
+        cannon.sem.should_drop.assert_called_once_with(serial)
+        cannon.sem.add.assert_not_called()
+        assert cannon.stats.messages_dropped == 3
+        assert cannon.stats.messages_sent == 0
+        assert cannon.stats.send.count == 0
+
+    async def test_it_counts_messages_it_sends(self, cannon):
+        cannon.sem.should_drop.return_value = False
+        msgs = [mock.Mock(name=f"msg{i}") for i in range(3)]
+
+        writer = cannon.writers[serial] = mock.Mock(name="writer", spec=["write"])
+        writer.write = pytest.helpers.AsyncMock(name="write")
+
+        await cannon.fire(None, serial, msgs)
+
+        assert writer.write.mock_calls == [mock.call(msg) for msg in msgs]
+        assert cannon.stats.messages_dropped == 0
+        assert cannon.stats.messages_sent == 3
+        assert cannon.stats.send.count == 1
+
+    async def test_it_times_each_write(self):
+        stats = FrameStats()
+        transport = mock.Mock(name="transport", spec=["spawn", "write"])
+        transport.spawn = pytest.helpers.AsyncMock(name="spawn", return_value=mock.Mock(name="t"))
+        transport.write = pytest.helpers.AsyncMock(name="write")
+
+        writer = cannons.Writer(transport, stats=stats)
+        await writer.write(mock.Mock(name="msg", **{"tobytes.return_value": b"1"}))
+        await writer.write(mock.Mock(name="msg", **{"tobytes.return_value": b"2"}))
+
+        assert len(transport.write.mock_calls) == 2
+        assert stats.write.count == 2
+
+
+class TestMissedTicks:
+    async def test_it_estimates_ticks_missed_from_the_time_between_ticks(self, final_future, FakeTime):
+        class Ticker:
+            def __init__(s, *args, **kwargs):
+                pass
+
+            async def __aenter__(s):
+                return s.ticks()
+
+            async def __aexit__(s, exc_typ, exc, tb):
+                pass
+
+            async def ticks(s):
+                for i, now in enumerate([1, 1.1, 1.5, 1.6, 1.65]):
+                    t.set(now)
+                    yield i, 0
+
+        class Ticking(Animation):
+            every = 0.1
+
+        state = mock.Mock(name="state", stats=FrameStats())
+
+        with FakeTime() as t, mock.patch.object(hp, "ATicker", Ticker):
+            with hp.ChildOfFuture(final_future, name="test_stats::missed") as fut:
+                animation = Ticking(fut, mock.Mock(name="options"))
+                results = [result async for result in animation.stream(state)]
+
+        assert len(results) == 5
+        assert animation.ticks == 5
+        assert state.stats.ticks == 5
+
+        # 0.4 seconds is three ticks missed and being early misses none
+        assert state.stats.ticks_missed == 3
+
+
+class TestLogStats:
+    async def test_it_logs_the_stats_every_so_often(self, final_future):
+        runner = AnimationRunner(
+            mock.Mock(name="sender"),
+            serial,
+            {"animations": [["balls", {}]], "log_stats_every": 0.01},
+            final_future=final_future,
+        )
+
+        with mock.patch.object(runner_module.log, "info") as info:
+            with runner.logging_stats():
+                # Nothing is logged until there has been a tick
+                await asyncio.sleep(0.03)
+                info.assert_not_called()
+
+                runner.stats.tick(1)
+                runner.stats.frame(0.002, 0.001)
+                runner.message_counts.bytes_saved = 200
+
+                # hp.tick waits at least 0.1 seconds between ticks
+                await asyncio.sleep(0.15)
+
+        assert info.mock_calls
+        assert info.mock_calls[0] == mock.call(
+            {
+                "msg": "Animation stats",
+                "ticks": 1,
+                "ticks_missed": 1,
+                "frames": 1,
+                "frames_dropped": 0,
+                "messages_dropped": 0,
+                "render_ms": 2,
+                "encode_ms": 1,
+                "send_ms": 0,
+                "write_max_ms": 0,
+                "bytes_saved": 200,
+            }
+        )
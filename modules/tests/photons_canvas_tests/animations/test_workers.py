@@ -0,0 +1,206 @@
+from unittest import mock
+
+import pytest
+from delfick_project.errors_pytest import assertRaises
+from delfick_project.norms import BadSpecValue, dictobj
+from photons_app import helpers as hp
+from photons_canvas.animations import AnimationRunner
+from photons_canvas.animations import runner as runner_module
+from photons_canvas.animations.infrastructure.animation import Animation
+from photons_canvas.animations.infrastructure.events import AnimationEvent
+from photons_canvas.animations.infrastructure.register import Animator
+from photons_canvas.animations.infrastructure.stats import FrameStats
+from photons_canvas.animations.infrastructure.workers import CantRenderElsewhere, RemoteState, RenderPool
+from photons_canvas.animations.run_options import make_run_options
+from photons_canvas.orientation import Orientation
+from photons_canvas.points import containers as cont
+from photons_canvas.points.simple_messages import PackedMessage, Set64
+from photons_messages import TileMessages
+from photons_messages.fields import Color
+from photons_products import Products
+
+
+class Options(dictobj.Spec):
+    pass
+
+
+class SolidAnimation(Animation):
+    async def process_event(self, event):
+        if event.is_user_event:
+            if event.value == "layer":
+                return self.layer
+            return event.value == "yes"
+
+        if event.is_tick:
+            return self.layer
+
+    def layer(self, point, canvas):
+        return (100, 1, 1, 3500)
+
+
+animator = Animator(SolidAnimation, Options, name="test_workers_solid")
+
+
+def make_animation(final_future):
+    make, _ = animator.resolver({}).resolve()
+    return make(final_future)
+
+
+def make_parts():
+    device = cont.Device("d073d5001337", Products.LCM3_TILE.cap(3, 70))
+    return [cont.Part(i, 0, 8, 8, i, Orientation.RightSideUp, device) for i in range(2)]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = RenderPool(1)
+    try:
+        yield pool
+    finally:
+        pool.shutdown()
+
+
+@pytest.fixture()
+async def animation_fut(final_future):
+    with hp.ChildOfFuture(final_future, name="test_workers::animation_fut") as fut:
+        yield fut
+
+
+class TestRemoteState:
+    async def test_it_gets_frames_back_as_packed_messages(self, final_future, animation_fut, pool):
+        counts = cont.MessageCounts()
+        stats = FrameStats()
+        state = RemoteState(final_future, pool, counts=counts, stats=stats)
+
+        await state.add_collected([make_parts()])
+        await state.set_animation(make_animation(animation_fut), True)
+        assert state
+
+        layer = await state.process_event(AnimationEvent.Types.TICK)
+        assert layer == (AnimationEvent.Types.TICK, False)
+
+        frames = [msgs async for msgs in state.send_canvas(layer)]
+        assert len(frames) == 1
+
+        msgs = frames[0]
+        assert len(msgs) == 2
+        for i, msg in enumerate(msgs):
+            assert isinstance(msg, PackedMessage)
+            assert msg | TileMessages.Set64
+            assert msg.serial == "d073d5001337"
+
+            set64 = Set64(bts=bytearray(msg.tobytes()))
+            assert set64.tile_index == i
+            assert set64.colors == [Color(100, 1, 1, 3500)] * 64
+
+        assert counts.frames_sent == 2
+        assert counts.bytes_sent == 558 * 2
+        assert stats.frames == 1
+
+    async def test_it_forwards_user_events_as_a_bool(self, final_future, animation_fut, pool):
+        state = RemoteState(final_future, pool)
+        await state.add_collected([make_parts()])
+        await state.set_animation(make_animation(animation_fut), True)
+
+        assert await state.process_event(AnimationEvent.Types.USER_EVENT, "yes") is True
+        assert await state.process_event(AnimationEvent.Types.USER_EVENT, "no") is False
+
+        # The layer can't be pickled, only that something was returned
+        assert await state.process_event(AnimationEvent.Types.USER_EVENT, "layer") is True
+
+    async def test_it_complains_if_the_animation_has_no_resolver(self, final_future, animation_fut, pool):
+        state = RemoteState(final_future, pool)
+        animation = SolidAnimation(animation_fut, Options.FieldSpec().empty_normalise())
+        assert animation.resolver is None
+
+        with assertRaises(CantRenderElsewhere, animation=SolidAnimation):
+            await state.set_animation(animation, True)
+
+        assert state.animation is None
+
+    async def test_it_drops_ticks_that_arrive_while_a_frame_is_made(self, final_future, animation_fut):
+        stats = FrameStats()
+        pool = mock.Mock(name="pool", spec=["worker"])
+        pool.worker.return_value = (mock.Mock(name="executor"), 1)
+
+        state = RemoteState(final_future, pool, stats=stats)
+        state.call = pytest.helpers.AsyncMock(name="call")
+
+        await state.set_animation(make_animation(animation_fut), True)
+
+        # The ticker made three ticks while we were busy
+        state.animation.ticks = 3
+        got = [await state.process_event(AnimationEvent.Types.TICK) for _ in range(3)]
+        assert got == [None, None, (AnimationEvent.Types.TICK, False)]
+        assert state.frames_dropped == 2
+        assert stats.frames_dropped == 2
+        assert state.ticks_seen == 3
+
+        # A tick that we keep up with isn't dropped
+        state.animation.ticks = 4
+        assert await state.process_event(AnimationEvent.Types.TICK) == (AnimationEvent.Types.TICK, False)
+        assert state.frames_dropped == 2
+
+        # And a new animation starts the count again
+        animation = make_animation(animation_fut)
+        animation.ticks = 1
+        await state.set_animation(animation, True)
+        assert state.ticks_seen == 0
+        assert await state.process_event(AnimationEvent.Types.TICK) == (AnimationEvent.Types.TICK, False)
+        assert state.frames_dropped == 2
+
+        # The frame for ENDED is always made and forced
+        assert await state.process_event(AnimationEvent.Types.ENDED, force=True) == (AnimationEvent.Types.ENDED, True)
+
+
+class TestRendering:
+    def make_runner(self, final_future, **options):
+        return AnimationRunner(
+            mock.Mock(name="sender"),
+            "d073d5001337",
+            {"animations": [["balls", {}]], **options},
+            final_future=final_future,
+        )
+
+    async def test_it_shuts_down_the_pool_when_done(self, final_future):
+        render_pool = mock.Mock(name="pool", spec=["worker", "shutdown"])
+        render_pool.worker.return_value = (mock.Mock(name="executor"), 1)
+        FakeRenderPool = mock.Mock(name="RenderPool", return_value=render_pool)
+
+        runner = self.make_runner(final_future, render_workers=2)
+
+        with mock.patch.object(runner_module, "RenderPool", FakeRenderPool):
+            with assertRaises(ValueError, "stop"):
+                with runner.rendering():
+                    assert runner.render_pool is render_pool
+                    assert isinstance(runner.make_state(), RemoteState)
+                    raise ValueError("stop")
+
+        FakeRenderPool.assert_called_once_with(2)
+        render_pool.shutdown.assert_called_once_with()
+        assert runner.render_pool is None
+        assert not isinstance(runner.make_state(), RemoteState)
+
+    async def test_it_doesnt_make_a_pool_without_render_workers(self, final_future):
+        FakeRenderPool = mock.Mock(name="RenderPool")
+        runner = self.make_runner(final_future)
+
+        with mock.patch.object(runner_module, "RenderPool", FakeRenderPool):
+            with runner.rendering():
+                assert runner.render_pool is None
+                assert not isinstance(runner.make_state(), RemoteState)
+
+        FakeRenderPool.assert_not_called()
+
+
+class TestRenderWorkersOption:
+    def test_it_defaults_to_rendering_in_this_process(self):
+        assert make_run_options({"animations": [["balls", {}]]}, None).render_workers == 0
+
+    def test_it_can_be_a_number_of_processes(self):
+        for count in (0, 2):
+            assert make_run_options({"animations": [["balls", {}]], "render_workers": count}, None).render_workers == count
+
+    def test_it_cant_be_negative(self):
+        with assertRaises(BadSpecValue):
+            make_run_options({"animations": [["balls", {}]], "render_workers": -1}, None)
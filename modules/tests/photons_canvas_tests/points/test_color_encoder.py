@@ -0,0 +1,106 @@
+import random
+from unittest import mock
+
+import pytest
+from photons_canvas.orientation import Orientation
+from photons_canvas.points import simple_messages
+from photons_canvas.points.simple_messages import ColorEncoder, SetExtendedColorZones, encode_colors, fill
+from photons_messages import MultiZoneMessages
+from photons_messages.fields import Color
+
+np = pytest.importorskip("numpy")
+
+colors = [
+    None,
+    (0, 0, 0, 0),
+    (-10, -1, -1, -1),
+    (0.001, 0.0001, 0.5, 2500.5),
+    (90, 1, 1, 3500),
+    (120.5, 0.33, 0.66, 9000),
+    (359.999, 0.5, 0.2, 0xFFFE),
+    (360, 1, 1, 0xFFFF),
+    (400, 1, 0, 0x10000),
+    (0x10000, 0, 1, 3500),
+    (0x20000, 0, 1, 3500),
+] + [(random.random() * 360, random.random(), random.random(), random.randrange(1500, 9000)) for _ in range(200)]
+
+
+def expected(colors):
+    return b"".join([fill(color) for color in colors])
+
+
+class TestColorEncoder:
+    def test_it_encodes_lists_of_colors_like_fill(self):
+        encoder = ColorEncoder()
+        assert len(colors) >= ColorEncoder.vectorise_from
+        assert encoder.encode(colors) == expected(colors)
+        assert encoder.encode(colors[:10]) == expected(colors[:10])
+        assert encoder.pack(colors[:10]).tobytes() == expected(colors[:10])
+
+    def test_it_encodes_arrays_of_colors_like_fill(self):
+        arr = np.array([(np.nan,) * 4 if c is None else c for c in colors], dtype=float)
+        assert ColorEncoder().encode(arr) == expected(colors)
+        assert ColorEncoder().encode(arr[:10]) == expected(colors[:10])
+
+    def test_it_reuses_its_arrays(self):
+        encoder = ColorEncoder(4)
+        first = encoder.pack([(1, 1, 1, 3500)] * 3)
+        buffer = encoder.buffer
+        second = encoder.pack([(2, 1, 1, 3500)] * 4)
+        assert encoder.buffer is buffer
+        assert np.shares_memory(first, second)
+
+        encoder.pack([(1, 1, 1, 3500)] * 5)
+        assert encoder.buffer is not buffer
+        assert encoder.count == 5
+
+    def test_it_uses_fill_without_numpy(self):
+        with mock.patch.object(simple_messages, "np", None):
+            encoder = ColorEncoder()
+            assert encoder.buffer is None
+            assert encoder.encode(colors) == expected(colors)
+            assert encode_colors(colors[:82]) == expected(colors[:82])
+
+
+class TestSetExtendedColorZones:
+    def test_it_is_the_same_as_the_real_message(self):
+        cs = [(i * 4, 1, 0.5, 3500) for i in range(82)]
+
+        kwargs = {
+            "source": 2,
+            "sequence": 3,
+            "target": "d073d5000001",
+            "res_required": False,
+            "ack_required": True,
+            "duration": 2.5,
+            "zone_index": 300,
+            "colors_count": 82,
+        }
+
+        real = MultiZoneMessages.SetExtendedColorZones.create(**kwargs, colors=[Color(*c) for c in cs])
+        simple = SetExtendedColorZones(**kwargs, colors=cs)
+
+        assert simple.tobytes() == real.pack().tobytes()
+        assert simple | MultiZoneMessages.SetExtendedColorZones
+        assert simple.Payload.message_type == 510
+        assert (simple.duration, simple.zone_index, simple.colors_count) == (2.5, 300, 82)
+        assert simple.colors == real.colors
+
+        clone = simple.clone()
+        clone.colors = [(1, 1, 1, 3500)]
+        assert clone.colors[:2] == [Color(1, 1, 1, 3500), real.colors[1]]
+        assert simple.colors == real.colors
+
+
+class TestPartEncoded:
+    def test_it_makes_the_same_set64_from_encoded_colors(self, V):
+        cs = [None if i % 5 == 0 else (i * 5, 1, 0.5, 3500) for i in range(64)]
+
+        for orientation in Orientation.__members__.values():
+            part = V.make_part(V.device, 1, orientation=orientation)
+            want = part.msgs(cs, force=True)[0].tobytes()
+
+            part = V.make_part(V.device, 1, orientation=orientation)
+            got = part.msgs(cs, force=True, encoded=ColorEncoder().pack(cs))[0].tobytes()
+
+            assert got == want, orientation
@@ -0,0 +1,203 @@
+from unittest import mock
+
+import pytest
+from delfick_project.errors_pytest import assertRaises
+from delfick_project.norms import BadSpecValue, Meta
+from photons_canvas.animations.run_options import dense_canvas_spec
+from photons_canvas.points import dense
+from photons_canvas.points.canvas import Canvas
+from photons_canvas.points.dense import DenseCanvas, DensePoints
+
+np = pytest.importorskip("numpy")
+
+
+def layer(point, canvas):
+    if point[0] % 2 == 0:
+        return None
+    return (abs(point[0] * point[1]), 1, 1, 3500)
+
+
+def make_parts(V):
+    return [
+        V.make_part(V.device, 1, user_x=0, user_y=0, width=2, height=2),
+        V.make_part(V.device, 2, user_x=1, user_y=1, width=2, height=2),
+        V.make_part(V.other_device, 2, user_x=25 / 8, user_y=1, width=2, height=2),
+    ]
+
+
+class TestDenseCanvas:
+    def test_it_behaves_like_a_canvas_for_points(self):
+        canvas = DenseCanvas()
+        assert not canvas
+        assert canvas.is_dense
+        assert canvas.bounds == ((None, None), (None, None), (None, None))
+
+        canvas[1, 2] = (200, 1, 1, 3500)
+        canvas[3, 5] = (100, 0.5, 0.2, 9000)
+        canvas[4, 4] = None
+
+        assert canvas
+        assert canvas.bounds == ((1, 4), (5, 2), (3, 3))
+        assert canvas[1, 2] == (200, 1, 1, 3500)
+        assert canvas.points.get((3, 5)) == (100, 0.5, 0.2, 9000)
+        assert canvas[2, 2] is None
+        assert canvas[40, 40] is None
+
+        assert (4, 4) in canvas
+        assert (2, 2) not in canvas
+        assert canvas.points == {(1, 2): (200, 1, 1, 3500), (3, 5): (100, 0.5, 0.2, 9000), (4, 4): None}
+
+        del canvas[3, 5]
+        assert (3, 5) not in canvas
+        assert canvas.bounds == ((1, 4), (4, 2), (3, 2))
+        assert len(canvas.points) == 2
+
+    def test_it_gives_the_index_of_points_in_the_array(self, V):
+        canvas = DenseCanvas()
+        canvas.add_parts(*make_parts(V))
+
+        assert canvas.colors.shape == (10, 27, 4)
+        assert canvas.index((0, 8)) == (0, 0)
+        assert canvas.index((26, -1)) == (9, 26)
+        assert canvas.index((27, 0)) is None
+        assert canvas.index((0, 9)) is None
+
+        xs, ys = canvas.grid
+        assert xs[9, 26] == 26
+        assert ys[9, 26] == -1
+
+        part = canvas.parts[1]
+        assert canvas.colors[canvas.region(part.bounds)].shape == (2, 2, 4)
+
+    def test_it_keeps_colors_when_the_array_grows(self, V):
+        canvas = DenseCanvas()
+        canvas[-3, -3] = (1, 1, 1, 3500)
+        canvas[1, 1] = (2, 1, 1, 3500)
+
+        part = V.make_part(V.device, 1, user_x=0, user_y=1, width=8, height=8)
+        canvas.add_parts((part, [(i, 0, 1, 3500) for i in range(64)]))
+        assert canvas.colors.shape == (12, 11, 4)
+
+        canvas[20, 20] = (3, 1, 1, 3500)
+        assert canvas.colors.shape == (24, 24, 4)
+
+        assert canvas[-3, -3] == (1, 1, 1, 3500)
+        assert canvas[1, 1] == (57, 0, 1, 3500)
+        assert canvas[0, 8] == (0, 0, 1, 3500)
+        assert canvas[20, 20] == (3, 1, 1, 3500)
+        assert len(canvas.points) == 66
+
+    def test_it_can_clone_with_a_copy_of_the_colors(self, V):
+        part1, part2, part3 = make_parts(V)
+
+        canvas = DenseCanvas()
+        canvas.add_parts(part1)
+        canvas[0, 0] = (1, 1, 1, 3500)
+
+        clone = canvas.clone()
+        assert clone.bounds == canvas.bounds
+        assert clone.points == canvas.points
+        assert clone.parts == [part1]
+
+        clone[0, 0] = (2, 1, 1, 3500)
+        assert canvas[0, 0] == (1, 1, 1, 3500)
+
+        assert clone.point_to_parts is canvas.point_to_parts
+        clone.add_parts(part2)
+        assert clone.point_to_parts is not canvas.point_to_parts
+        assert (8, 8) in clone.point_to_parts
+        assert (8, 8) not in canvas.point_to_parts
+
+        canvas.add_parts(part3)
+        assert (25, 8) in canvas.point_to_parts
+        assert (25, 8) not in clone.point_to_parts
+
+    def test_it_makes_the_same_messages_as_a_canvas(self, V):
+        got = []
+        for kls in (Canvas, DenseCanvas):
+            onto = {}
+            canvas = kls()
+            canvas.add_parts(*make_parts(V))
+            msgs = canvas.msgs(layer, onto=onto)
+            got.append(([(m.serial, m.tile_index, m.colors) for m in msgs], onto))
+
+        assert got[0] == got[1]
+
+    def test_it_can_put_colors_onto_itself(self, V):
+        canvas = DenseCanvas()
+        canvas.add_parts(*make_parts(V))
+        canvas.msgs(layer, onto=canvas.points)
+
+        assert canvas[1, -1] == (1, 1, 1, 3500)
+        assert canvas[26, 8] is None
+        assert (26, 8) in canvas
+        assert len(canvas.points) == 12
+
+    def test_it_gives_per_point_layers_the_colors_from_before_the_frame(self, V):
+        canvas = DenseCanvas()
+        canvas.add_parts(V.make_part(V.device, 1, user_x=0, user_y=0, width=2, height=1))
+        canvas[0, 0] = (1, 1, 1, 3500)
+        canvas[5, 5] = (2, 1, 1, 3500)
+
+        seen = []
+
+        def layer(point, canvas):
+            seen.append((point, canvas.points.get((0, 0)), canvas[5, 5]))
+            return canvas.dim(point, 0.5)
+
+        canvas.msgs(layer, onto=canvas.points)
+
+        assert seen == [((0, 0), (1, 1, 1, 3500), (2, 1, 1, 3500)), ((1, 0), (1, 1, 1, 3500), (2, 1, 1, 3500))]
+        assert canvas.points == {(0, 0): (1, 1, 0.5, 3500), (1, 0): None, (5, 5): (2, 1, 1, 3500)}
+
+    def test_it_uses_the_dense_attribute_on_a_layer(self, V):
+        called = []
+
+        def per_point(point, canvas):
+            raise AssertionError("Should use the dense layer")
+
+        def whole_frame(colors, canvas):
+            called.append(colors.shape)
+            colors[:] = (20, 1, 0.5, 3500)
+            return colors
+
+        per_point.dense = whole_frame
+
+        canvas = DenseCanvas()
+        canvas.add_parts(*make_parts(V))
+        msgs = canvas.msgs(per_point, onto=canvas.points)
+
+        assert called == [(10, 27, 4)]
+        assert len(msgs) == 3
+        assert canvas[0, 0] == (20, 1, 0.5, 3500)
+        assert canvas[5, 5] is None
+
+    def test_it_can_dim_all_the_colors(self, V):
+        canvas = DenseCanvas()
+        canvas.add_parts(V.make_part(V.device, 1, user_x=0, user_y=0, width=3, height=1))
+        canvas[0, 0] = (1, 1, 0.5, 3500)
+        canvas[1, 0] = (1, 1, 0.1, 3500)
+        canvas[2, 0] = (1, 1, 0, 3500)
+
+        canvas.colors[:] = canvas.dimmed(canvas.colors.copy(), 0.2)
+        assert canvas.points == {(0, 0): (1, 1, 0.3, 3500), (1, 0): None, (2, 0): None}
+
+    def test_it_complains_without_numpy(self):
+        with mock.patch.object(dense, "np", None):
+            with assertRaises(Exception, "The dense canvas needs numpy to be installed"):
+                DenseCanvas()
+
+        assert isinstance(DenseCanvas().points, DensePoints)
+
+
+class TestDenseCanvasSpec:
+    def test_it_needs_numpy_to_be_true(self):
+        meta = Meta.empty()
+        spec = dense_canvas_spec()
+        assert spec.normalise(meta, True) is True
+        assert spec.normalise(meta, False) is False
+
+        with mock.patch.object(dense, "available", False):
+            assert spec.normalise(meta, False) is False
+            with assertRaises(BadSpecValue, "The dense canvas needs numpy to be installed"):
+                spec.normalise(meta, True)
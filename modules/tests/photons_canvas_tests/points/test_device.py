@@ -1,3 +1,5 @@
+import pickle
+
 from photons_canvas.points import containers as cont
 from photons_products import Products
 
@@ -34,3 +36,17 @@ class TestDevice:
 
         assert device1 != device3
         assert device1 != "d073d5004556"
+
+    def test_it_can_be_pickled_with_its_part(self, V):
+        device = cont.Device("d073d5001337", Products.LCM3_TILE.cap(3, 70))
+        part = V.make_part(device, 2, original_colors=[(1, 1, 1, 3500)] * 64)
+
+        got = pickle.loads(pickle.dumps(part))
+        assert got == part
+        assert hash(got) == hash(part)
+        assert got.colors == part.colors
+        assert got.real_part == part
+
+        assert got.device == device
+        assert got.device.cap.product is Products.LCM3_TILE
+        assert (got.device.cap.firmware_major, got.device.cap.firmware_minor) == (3, 70)
@@ -427,3 +427,63 @@ class TestPart:
                     assert part.last_msgs is msgs3
                     assert part.next_force_send == 3.5
                     assert part.colors == colors
+
+            def test_it_can_only_send_changes(self, FakeTime, V):
+                colors = [(i, 1, 1, 3500) for i in range(64)]
+                device = cont.Device("d073d5001337", Products.LCM3_TILE.cap)
+                counts = cont.MessageCounts()
+
+                with FakeTime() as t:
+                    t.set(2)
+                    part = V.make_part(device, 3)
+
+                    msgs = part.msgs(colors, force=False, resend_every=0, counts=counts)
+                    assert len(msgs) == 1
+
+                    t.set(20)
+                    assert part.msgs(colors, force=False, resend_every=0, counts=counts) is cont.NO_MESSAGES
+                    assert part.msgs(list(colors), force=False, resend_every=0, counts=counts) is cont.NO_MESSAGES
+
+                    assert counts.as_dict() == {
+                        "frames_sent": 1,
+                        "frames_skipped": 2,
+                        "bytes_sent": 558,
+                        "bytes_saved": 558 * 2,
+                        "encode_time": mock.ANY,
+                    }
+
+            def test_it_only_sends_the_rows_that_changed_on_big_tiles(self, FakeTime, V):
+                colors = [(i, 1, 1, 3500) for i in range(128)]
+                device = cont.Device("d073d5001337", Products.LCM3_TILE.cap)
+                counts = cont.MessageCounts()
+
+                with FakeTime() as t:
+                    t.set(2)
+                    part = V.make_part(device, 3, width=16, height=8)
+
+                    msgs = part.msgs(colors, force=False, counts=counts)
+                    assert [(m.x, m.y, m.width) for m in msgs] == [(0, 0, 16), (0, 4, 16)]
+                    assert msgs[0].colors == [Color(*c) for c in colors[:64]]
+                    assert msgs[1].colors == [Color(*c) for c in colors[64:]]
+
+                    t.set(2.1)
+                    changed = list(colors)
+                    changed[100] = (200, 1, 1, 3500)
+                    msgs2 = part.msgs(changed, force=False, counts=counts)
+                    assert [m.y for m in msgs2] == [4]
+                    assert msgs2[0].colors[36] == Color(200, 1, 1, 3500)
+                    assert len(part.last_msgs) == 2
+
+                    t.set(2.2)
+                    assert part.msgs(changed, force=False, counts=counts) is cont.NO_MESSAGES
+
+                    t.set(3)
+                    assert part.msgs(changed, force=False, counts=counts) is part.last_msgs
+
+                    assert counts.as_dict() == {
+                        "frames_sent": 3,
+                        "frames_skipped": 1,
+                        "bytes_sent": 558 * 5,
+                        "bytes_saved": 558 * 3,
+                        "encode_time": mock.ANY,
+                    }
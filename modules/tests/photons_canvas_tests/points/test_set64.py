@@ -2,7 +2,7 @@ import binascii
 
 import pytest
 from delfick_project.norms import sb
-from photons_canvas.points.simple_messages import Set64
+from photons_canvas.points.simple_messages import PackedMessage, Set64
 from photons_messages import TileMessages
 from photons_messages.fields import Color
 
@@ -206,3 +206,14 @@ class TestSet64:
         assert simple.source == 200
         assert simple.sequence == 3
         assert simple.serial == "d073d5001188"
+
+    def test_it_can_be_made_from_bytes_packed_elsewhere(self):
+        msg = Set64(source=1, sequence=2, target="d073d5001337", tile_index=3, colors=[(1, 1, 1, 3500)])
+
+        packed = PackedMessage(bts=bytearray(msg.tobytes()))
+        assert packed | TileMessages.Set64
+        assert packed.serial == "d073d5001337"
+
+        packed.update({"source": 5, "sequence": 6})
+        assert (packed.source, packed.sequence) == (5, 6)
+        assert packed.tobytes()[36:] == msg.tobytes()[36:]
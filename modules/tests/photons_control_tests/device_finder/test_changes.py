@@ -0,0 +1,133 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from delfick_project.norms import sb
+from photons_app import helpers as hp
+from photons_control.device_finder import (
+    ChangeKind,
+    Collections,
+    Device,
+    DeviceChange,
+    DeviceChanges,
+    DeviceFinderDaemon,
+    Filter,
+)
+from photons_messages import DeviceMessages, LightMessages
+from photons_products import Products
+
+devices = pytest.helpers.mimic()
+light = devices.add("light")(
+    "d073d5000001",
+    Products.LCM2_A19,
+    hp.Firmware(2, 80),
+    value_store=dict(label="kitchen", power=0, color=hp.Color(0, 1, 1, 3500)),
+)
+
+
+@pytest.fixture()
+def changes(final_future):
+    return DeviceChanges(final_future)
+
+
+class TestDeviceChanges:
+    def test_it_publishes_the_fields_that_changed(self, changes):
+        got = []
+        changes.queues.append(got)
+
+        device = Device.FieldSpec().empty_normalise(serial="d073d5000001")
+        device.changes = changes
+        collections = Collections()
+
+        device.set_from_pkt(LightMessages.LightState.create(label="kitchen", power=0, hue=100, saturation=1, brightness=1, kelvin=3500), collections)
+        device.set_from_pkt(
+            LightMessages.LightState.create(label="kitchen", power=65535, hue=100, saturation=1, brightness=1, kelvin=3500), collections
+        )
+        device.set_from_pkt(
+            LightMessages.LightState.create(label="kitchen", power=65535, hue=100, saturation=1, brightness=1, kelvin=3500), collections
+        )
+        device.set_from_pkt(DeviceMessages.StateLabel.create(label="den"), collections)
+
+        hue = got[0].changes["hue"][1]
+        assert got == [
+            DeviceChange(
+                ChangeKind.CHANGED,
+                "d073d5000001",
+                {
+                    "label": (sb.NotSpecified, "kitchen"),
+                    "power": (sb.NotSpecified, "off"),
+                    "hue": (sb.NotSpecified, hue),
+                    "saturation": (sb.NotSpecified, 1.0),
+                    "brightness": (sb.NotSpecified, 1.0),
+                    "kelvin": (sb.NotSpecified, 3500),
+                },
+            ),
+            DeviceChange(ChangeKind.CHANGED, "d073d5000001", {"power": ("off", "on")}),
+            DeviceChange(ChangeKind.CHANGED, "d073d5000001", {"label": ("kitchen", "den")}),
+        ]
+        assert changes.version == 3
+
+    async def test_it_gives_events_to_each_subscriber(self, changes):
+        change = DeviceChange(ChangeKind.ADDED, "d073d5000001", {})
+
+        async with changes.subscribe() as q1:
+            async with changes.subscribe() as q2:
+                assert changes.queues == [q1, q2]
+                changes.publish(change)
+                assert list(q2.remaining()) == [change]
+            assert changes.queues == [q1]
+            assert q2.final_future.done()
+
+            changes.publish(change)
+            assert list(q1.remaining()) == [change, change]
+
+        assert changes.queues == []
+        changes.publish(change)
+        assert changes.version == 3
+
+
+class TestFinderChanges:
+    async def test_it_publishes_added_and_removed_devices(self, fake_time, final_future):
+        sender = mock.NonCallableMock(name="sender", spec=[])
+        daemon = DeviceFinderDaemon(sender, final_future=final_future, forget_after=10)
+        got = []
+        daemon.finder.changes.queues.append(got)
+
+        fake_time.set(1)
+        daemon.finder._ensure_devices(["d073d5000001", "d073d5000002"])
+        fake_time.set(5)
+        daemon.finder._ensure_devices(["d073d5000002"])
+        fake_time.set(12)
+        daemon.finder._ensure_devices(["d073d5000002"])
+
+        assert got == [
+            DeviceChange(ChangeKind.ADDED, "d073d5000001", {}),
+            DeviceChange(ChangeKind.ADDED, "d073d5000002", {}),
+            DeviceChange(ChangeKind.REMOVED, "d073d5000001", {}),
+        ]
+
+    async def test_it_streams_changes_from_the_daemon(self, final_future):
+        async with devices.for_test(final_future) as sender:
+            async with DeviceFinderDaemon(sender, final_future=final_future) as daemon:
+                got = []
+
+                async def stream():
+                    async for change in daemon.changes():
+                        got.append(change)
+                        if len(got) == 3:
+                            return
+
+                async with hp.TaskHolder(final_future, name="TEST") as ts:
+                    task = ts.add(stream())
+                    while not daemon.finder.changes.queues:
+                        await asyncio.sleep(0)
+
+                    assert [d.serial async for d in daemon.info(Filter.from_kwargs(label="kitchen"))] == [light.serial]
+                    await light.change_one("label", "den", event=None)
+                    assert [d.serial async for d in daemon.info(Filter.from_kwargs(label="den", refresh_info=True))] == [light.serial]
+
+                    await task
+
+                assert [(c.kind, c.serial) for c in got] == [(ChangeKind.ADDED, light.serial)] + [(ChangeKind.CHANGED, light.serial)] * 2
+                assert got[1].changes["product_id"] == (sb.NotSpecified, Products.LCM2_A19.pid)
+                assert daemon.finder.changes.version > 3
@@ -2,6 +2,7 @@ import uuid
 from unittest import mock
 
 import pytest
+from photons_app import helpers as hp
 from photons_control.device_finder import Collection, Collections
 
 
@@ -169,3 +170,12 @@ class TestCollections:
 
                 assert len(collection_spec.empty_normalise.mock_calls) == 0
                 collection.add_name.assert_called_with(1, V.label)
+
+        class TestAddFirmware:
+            def test_it_shares_firmware_objects(self, V):
+                firmware = V.collections.add_firmware(3, 70, 1)
+                assert firmware == hp.Firmware(3, 70, 1)
+
+                assert V.collections.add_firmware(3, 70, 1) is firmware
+                assert V.collections.add_firmware(3, 70, 2) is not firmware
+                assert V.collections.add_firmware(3, 70, 2) == hp.Firmware(3, 70, 2)
@@ -10,6 +10,8 @@ from photons_control.device_finder import (
     DeviceFinderDaemon,
     Filter,
     Finder,
+    InfoPoints,
+    RefreshScheduler,
 )
 from photons_products import Products
 
@@ -26,7 +28,9 @@ class TestDeviceFinderDaemon:
         assert daemon.final_future.original_fut is sender.stop_fut
 
         assert daemon.search_interval == 20
+        assert daemon.max_search_interval is None
         assert daemon.time_between_queries is None
+        assert daemon.refresh_scheduler is None
 
         assert isinstance(daemon.finder, Finder)
         assert daemon.finder.sender is sender
@@ -58,6 +62,20 @@ class TestDeviceFinderDaemon:
         assert daemon.finder.final_future.original_fut is daemon.final_future
         assert daemon.finder.forget_after == 1
 
+    def test_it_can_use_a_refresh_scheduler(self):
+        stop_fut = hp.create_future()
+        sender = mock.Mock(name="sender", stop_fut=stop_fut)
+
+        daemon = DeviceFinderDaemon(sender, messages_per_second=20, time_between_queries={"GROUP": 3})
+
+        scheduler = daemon.refresh_scheduler
+        assert isinstance(scheduler, RefreshScheduler)
+        assert scheduler.sender is sender
+        assert scheduler.finder is daemon.finder
+        assert scheduler.budget == 20
+        assert scheduler.refreshes[InfoPoints.GROUP] == 3
+        assert scheduler.final_future.original_fut is daemon.final_future
+
     def test_it_can_be_given_an_explicit_finder(self):
         sender = mock.Mock(name="sender")
         finder = mock.Mock(name="finder")
@@ -187,6 +205,30 @@ class TestDeviceFinderDaemon:
                     ("find", si * 3),
                 ]
 
+            async def test_it_backs_off_while_the_same_devices_are_found(self, V):
+                called = []
+                finish_fut = hp.create_future()
+
+                device = Device.FieldSpec().empty_normalise(serial="d073d5000001")
+                ril = pytest.helpers.AsyncMock(name="refresh_information_loop")
+
+                async def find(fltr):
+                    called.append(time.time())
+                    if len(called) == 5:
+                        finish_fut.set_result(True)
+                    yield device
+
+                find = pytest.helpers.MagicAsyncMock(name="find", side_effect=find)
+
+                daemon = DeviceFinderDaemon(V.sender, final_future=V.final_future, search_interval=2, max_search_interval=8)
+
+                with mock.patch.object(daemon.finder, "find", find), mock.patch.object(device, "refresh_information_loop", ril):
+                    async with daemon:
+                        await finish_fut
+
+                assert called == [0, 2, 6, 14, 22]
+                assert daemon.current_search_interval == 8
+
             async def test_it_does_refresh_information_loops(self, V):
                 called = []
 
@@ -258,6 +300,32 @@ class TestDeviceFinderDaemon:
 
                     assert eril.mock_calls[0] == mock.call(V.daemon.sender, V.daemon.time_between_queries, V.daemon.finder.collections)
 
+            async def test_it_uses_the_refresh_scheduler_instead_of_refresh_information_loops(self, V):
+                d1 = Device.FieldSpec().empty_normalise(serial="d073d5000001")
+                d1ril = pytest.helpers.AsyncMock(name="d1_refresh_information_loop")
+
+                found = hp.create_future()
+
+                async def find(fltr):
+                    yield d1
+                    found.set_result(True)
+
+                find = pytest.helpers.MagicAsyncMock(name="find", side_effect=find)
+
+                daemon = DeviceFinderDaemon(V.sender, final_future=V.final_future, messages_per_second=10)
+                run = pytest.helpers.AsyncMock(name="run")
+
+                with (
+                    mock.patch.object(d1, "refresh_information_loop", d1ril),
+                    mock.patch.object(daemon.finder, "find", find),
+                    mock.patch.object(daemon.refresh_scheduler, "run", run),
+                ):
+                    async with daemon:
+                        await found
+
+                run.assert_called_once_with()
+                d1ril.assert_not_called()
+
             async def test_it_keeps_going_if_find_fails(self, V):
                 called = []
                 async with pytest.helpers.FutureDominoes(expected=5) as futs:
@@ -332,6 +400,39 @@ class TestDeviceFinderDaemon:
                             V.daemon.finder.collections,
                         )
 
+        class TestSearched:
+            def test_it_does_nothing_without_a_max_search_interval(self, V):
+                ticker = mock.Mock(name="ticker", spec=["change_after"])
+                V.daemon.searched(ticker, {"d073d5000001"})
+                V.daemon.searched(ticker, {"d073d5000001"})
+                assert V.daemon.current_search_interval == 2
+                ticker.change_after.assert_not_called()
+
+            def test_it_doubles_the_interval_till_the_devices_change(self, V):
+                ticker = mock.Mock(name="ticker", spec=["change_after"])
+                daemon = DeviceFinderDaemon(V.sender, final_future=V.final_future, search_interval=2, max_search_interval=5)
+
+                daemon.searched(ticker, {"d073d5000001"})
+                ticker.change_after.assert_not_called()
+
+                daemon.searched(ticker, {"d073d5000001"})
+                daemon.searched(ticker, {"d073d5000001"})
+                daemon.searched(ticker, {"d073d5000001"})
+                assert ticker.change_after.mock_calls == [mock.call(4), mock.call(5)]
+                assert daemon.current_search_interval == 5
+
+                daemon.searched(ticker, {"d073d5000001", "d073d5000002"})
+                assert ticker.change_after.mock_calls == [mock.call(4), mock.call(5), mock.call(2)]
+                assert daemon.current_search_interval == 2
+
+            def test_it_doesnt_back_off_when_nothing_is_found(self, V):
+                ticker = mock.Mock(name="ticker", spec=["change_after"])
+                daemon = DeviceFinderDaemon(V.sender, final_future=V.final_future, search_interval=2, max_search_interval=5)
+
+                daemon.searched(ticker, set())
+                daemon.searched(ticker, set())
+                ticker.change_after.assert_not_called()
+
         class TestSerials:
             async def test_it_yields_devices_from_finderfind(self, V):
                 fltr = Filter.from_kwargs(label="kitchen")
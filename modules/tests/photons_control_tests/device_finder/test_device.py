@@ -4,6 +4,7 @@ import uuid
 from unittest import mock
 
 import pytest
+from delfick_project.errors_pytest import assertRaises
 from delfick_project.norms import sb
 from photons_app import helpers as hp
 from photons_control.device_finder import (
@@ -14,10 +15,52 @@ from photons_control.device_finder import (
     Filter,
     InfoPoints,
     Point,
+    PointTime,
 )
 from photons_messages import DeviceMessages, LightMessages
 
 
+class TestPointTime:
+    def test_it_remembers_a_result_until_reset(self):
+        point = PointTime()
+        assert not point.done()
+        with assertRaises(hp.InvalidStateError):
+            point.result()
+
+        point.set_result(20)
+        assert point.done()
+        assert point.result() == 20
+        with assertRaises(hp.InvalidStateError):
+            point.set_result(30)
+
+        point.reset()
+        assert not point.done()
+        point.set_result(30)
+        assert point.result() == 30
+
+    async def test_it_can_be_waited_for(self):
+        point = PointTime()
+        point2 = PointTime()
+        point2.set_result(2)
+
+        called = []
+        point.add_done_callback(called.append)
+        point2.add_done_callback(called.append)
+        assert called == [point2]
+
+        async def wait():
+            await hp.wait_for_all_futures(point, point2)
+
+        task = hp.async_as_background(wait())
+        await asyncio.sleep(0)
+        assert not task.done()
+
+        point.set_result(1)
+        await task
+        assert called == [point2, point]
+        assert point.callbacks is None
+
+
 class TestDevice:
     @pytest.fixture()
     def device(self):
@@ -271,6 +314,15 @@ class TestDevice:
             assert device.set_from_pkt(pkt, collections) is InfoPoints.FIRMWARE
             assert str(device.firmware) == "1.20"
 
+        def test_it_shares_firmware_and_labels_between_devices(self, device, collections):
+            other = Device.FieldSpec().empty_normalise(serial="d073d5000002")
+            for d in (device, other):
+                d.set_from_pkt(DeviceMessages.StateHostFirmware.create(version_major=3, version_minor=70), collections)
+                d.set_from_pkt(DeviceMessages.StateLabel.create(label="kitchen"), collections)
+
+            assert device.firmware is other.firmware
+            assert device.label is other.label
+
         def test_it_takes_in_StateVersion(self, device, collections):
             pkt = DeviceMessages.StateVersion.create(vendor=1, product=22)
 
@@ -299,7 +351,7 @@ class TestDevice:
                     s.done = done
 
                 def __eq__(s, other):
-                    return isinstance(other, hp.ResettableFuture) and bool(other.done()) == s.done
+                    return isinstance(other, PointTime) and bool(other.done()) == s.done
 
                 def __repr__(self):
                     return "<RESETTABLE_FUTURE>"
@@ -317,8 +369,8 @@ class TestDevice:
                 TWO = Point("msg2", ["attr4"], None)
                 THREE = Point("msg3", ["attr5", "attr6"], 300)
 
-            device.point_futures = {e: hp.ResettableFuture() for e in IP}
-            device.point_futures[None] = hp.ResettableFuture()
+            device.point_futures = {e: PointTime() for e in IP}
+            device.point_futures[None] = PointTime()
 
             with mock.patch("photons_control.device_finder.InfoPoints", IP):
                 yield IP
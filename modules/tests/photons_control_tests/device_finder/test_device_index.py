@@ -0,0 +1,143 @@
+import uuid
+
+import pytest
+from delfick_project.norms import sb
+from photons_control.device_finder import Collections, Device, DeviceIndex, Filter, InfoPoints
+from photons_messages import DeviceMessages, LightMessages
+
+
+@pytest.fixture()
+def index():
+    return DeviceIndex()
+
+
+@pytest.fixture()
+def collections():
+    return Collections()
+
+
+def make_device(index, serial):
+    device = Device.FieldSpec().empty_normalise(serial=serial)
+    device.index = index
+    index.add(device)
+    return device
+
+
+class TestDeviceIndex:
+    def test_it_indexes_unknown_fields_as_not_specified(self, index):
+        make_device(index, "d073d5000001")
+
+        assert index.values == {"d073d5000001": {field: (sb.NotSpecified,) for field in DeviceIndex.fields}}
+        for field in DeviceIndex.fields:
+            assert index.by[field] == {sb.NotSpecified: {"d073d5000001"}}
+
+    def test_it_updates_from_set_from_pkt(self, index, collections):
+        device = make_device(index, "d073d5000001")
+
+        device.set_from_pkt(LightMessages.LightState.create(label="kitchen", power=0), collections)
+        assert index.by["label"] == {"kitchen": {"d073d5000001"}}
+        assert index.by["power"] == {"off": {"d073d5000001"}}
+
+        device.set_from_pkt(LightMessages.LightState.create(label="den", power=65535), collections)
+        assert index.by["label"] == {"den": {"d073d5000001"}}
+        assert index.by["power"] == {"on": {"d073d5000001"}}
+
+        group_uuid = str(uuid.uuid1()).replace("-", "")
+        device.set_from_pkt(DeviceMessages.StateGroup.create(group=group_uuid, updated_at=1, label="g1"), collections)
+        assert index.by["group_id"] == {group_uuid: {"d073d5000001"}}
+        assert index.by["location_id"] == {sb.NotSpecified: {"d073d5000001"}}
+
+        device.set_from_pkt(DeviceMessages.StateVersion.create(vendor=1, product=22), collections)
+        assert index.by["product_id"] == {22: {"d073d5000001"}}
+        assert "color" in index.by["cap"]
+        assert "not_matrix" in index.by["cap"]
+        assert sb.NotSpecified not in index.by["cap"]
+
+    def test_it_can_remove_devices(self, index, collections):
+        device = make_device(index, "d073d5000001")
+        device2 = make_device(index, "d073d5000002")
+
+        device.set_from_pkt(DeviceMessages.StateLabel.create(label="kitchen"), collections)
+        device2.set_from_pkt(DeviceMessages.StateLabel.create(label="kitchen"), collections)
+        assert index.by["label"] == {"kitchen": {"d073d5000001", "d073d5000002"}}
+
+        index.remove("d073d5000001")
+        index.remove("d073d5000003")
+        assert index.by["label"] == {"kitchen": {"d073d5000002"}}
+        assert list(index.values) == ["d073d5000002"]
+
+        # Devices that were removed aren't added back
+        device.set_from_pkt(DeviceMessages.StateLabel.create(label="den"), collections)
+        assert index.by["label"] == {"kitchen": {"d073d5000002"}}
+
+    class TestCandidates:
+        @pytest.fixture()
+        def serials(self, index, collections):
+            for serial, label, product in (
+                ("d073d5000001", "kitchen", 22),
+                ("d073d5000002", "kitchen two", 55),
+                ("d073d5000003", "den", 22),
+            ):
+                device = make_device(index, serial)
+                device.set_from_pkt(DeviceMessages.StateLabel.create(label=label), collections)
+                device.set_from_pkt(DeviceMessages.StateVersion.create(vendor=1, product=product), collections)
+            make_device(index, "d073d5000004")
+            return ["d073d5000001", "d073d5000002", "d073d5000003", "d073d5000004"]
+
+        def test_it_uses_the_index_for_values(self, index, serials):
+            assert index.candidates(Filter.from_kwargs(label="kitchen"), serials) == {"d073d5000001", "d073d5000004"}
+            assert index.candidates(Filter.from_kwargs(label=["kitchen", "den"], product_id=22), serials) == {
+                "d073d5000001",
+                "d073d5000003",
+                "d073d5000004",
+            }
+            assert index.candidates(Filter.from_kwargs(cap="matrix"), serials) == {"d073d5000002", "d073d5000004"}
+
+        def test_it_uses_fnmatch_for_patterns(self, index, serials):
+            assert index.candidates(Filter.from_kwargs(label="kitchen*"), serials) == {
+                "d073d5000001",
+                "d073d5000002",
+                "d073d5000004",
+            }
+
+        @pytest.mark.parametrize(
+            "label",
+            ["kitchen*", "KITCHEN", "Kitchen Two", "[kd]*", "kitchen?two", ["KITCHEN", "den*"]],
+        )
+        def test_it_matches_labels_the_same_as_without_the_index(self, index, serials, label):
+            fltr = Filter.from_kwargs(label=label)
+            devices = {}
+            for serial in serials:
+                device = Device.FieldSpec().empty_normalise(serial=serial)
+                device.label = index.values[serial]["label"][0]
+                devices[serial] = device
+
+            unindexed = {serial for serial, device in devices.items() if device.matches_fltr(fltr)}
+            indexed = {serial for serial in index.candidates(fltr, serials) if devices[serial].matches_fltr(fltr)}
+            assert indexed == unindexed
+
+        def test_it_only_returns_the_serials_it_was_given(self, index, serials):
+            assert index.candidates(Filter.from_kwargs(product_id=22), ["d073d5000003"]) == {"d073d5000003"}
+            assert index.candidates(Filter.from_kwargs(serial=["d073d5000001", "d073d5000002"], product_id=22), serials) == {"d073d5000001"}
+
+        def test_it_returns_everything_for_fields_it_doesnt_index(self, index, serials):
+            assert index.candidates(Filter.from_kwargs(hue="0-100"), serials) == set(serials)
+
+
+class TestHasPointsFor:
+    def test_it_says_whether_the_points_for_the_filter_are_done(self, collections):
+        device = Device.FieldSpec().empty_normalise(serial="d073d5000001")
+        fltr = Filter.from_kwargs(label="kitchen")
+
+        assert not device.has_points_for(fltr)
+
+        for point in (InfoPoints.VERSION, InfoPoints.LIGHT_STATE):
+            device.point_futures[point].set_result(1)
+        assert device.has_points_for(fltr)
+        assert not device.has_points_for(Filter.from_kwargs(group_id="aa"))
+
+        # A non light needs LABEL rather than LIGHT_STATE
+        device.set_from_pkt(DeviceMessages.StateVersion.create(vendor=1, product=89), collections)
+        assert not device.has_points_for(fltr)
+        device.point_futures[InfoPoints.LABEL].set_result(1)
+        assert device.has_points_for(fltr)
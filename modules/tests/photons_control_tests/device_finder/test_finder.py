@@ -1,8 +1,11 @@
 from unittest import mock
 
 import pytest
+from delfick_project.norms import sb
 from photons_app import helpers as hp
-from photons_control.device_finder import Collections, Device, Filter, Finder
+from photons_control.device_finder import Collections, Device, Filter, Finder, InfoPoints
+from photons_control.planner.capability_cache import CapabilityCache
+from photons_messages import DeviceMessages
 
 
 class TestFinder:
@@ -182,6 +185,30 @@ class TestFinder:
                 t.add(10)
                 await assertDevices(["s1", "s5"], [], [])
 
+            async def test_it_uses_the_capability_cache_for_new_devices(self, V, fake_time, tmp_path):
+                fake_time.set(5)
+
+                capability_cache = CapabilityCache(str(tmp_path / "capabilities.json"))
+                capability_cache.save_after = 100
+                capability_cache.saw(DeviceMessages.StateVersion(vendor=1, product=55, target="d073d5000001"))
+                capability_cache.saw(DeviceMessages.StateHostFirmware(build=1, version_major=3, version_minor=70, target="d073d5000001"))
+
+                V.sender = mock.NonCallableMock(name="sender", spec=["capability_cache"], capability_cache=capability_cache)
+                V.finder._ensure_devices(["d073d5000001", "d073d5000002"])
+
+                device = V.finder.devices["d073d5000001"]
+                assert device.product_id == 55
+                assert device.firmware_version == "3.70"
+                assert device.point_futures[InfoPoints.VERSION].result() == 5
+                assert device.point_futures[InfoPoints.FIRMWARE].result() == 5
+
+                device = V.finder.devices["d073d5000002"]
+                assert device.product_id is sb.NotSpecified
+                assert not device.point_futures[InfoPoints.VERSION].done()
+                assert not device.point_futures[InfoPoints.FIRMWARE].done()
+
+                capability_cache.finish()
+
         class TestFind:
             @pytest.mark.parametrize(
                 "fltr,matches_runs",
@@ -8,7 +8,7 @@ from photons_app.errors import FoundNoDevices
 from photons_app.mimic.event import Events
 from photons_app.special import FoundSerials
 from photons_control.device_finder import Device, Filter, Finder, InfoPoints
-from photons_messages import DeviceMessages, LightMessages
+from photons_messages import DeviceMessages, DiscoveryMessages, LightMessages
 from photons_products import Products
 
 devices = pytest.helpers.mimic()
@@ -607,3 +607,56 @@ class TestDevice:
                 assert not t3.done()
 
                 t3.cancel()
+
+
+class TestFinderIndex:
+    @pytest.fixture()
+    async def sender(self, final_future):
+        async with devices.for_test(final_future) as sender:
+            await devices["light"].power_on()
+            await devices["switch"].power_on()
+            yield sender
+
+    def received(self, by_device):
+        for name, msgs in by_device.items():
+            devices.store(devices[name]).assertIncoming(*msgs, ignore=[DiscoveryMessages.GetService])
+            devices.store(devices[name]).clear()
+
+    async def find(self, finder, **kwargs):
+        return sorted(device.serial for device in [d async for d in finder.find(Filter.from_kwargs(**kwargs))])
+
+    async def test_it_answers_from_the_index_when_devices_have_the_information(self, sender, final_future):
+        light = devices["light"].serial
+        switch = devices["switch"].serial
+
+        async with Finder(sender, final_future) as finder:
+            assert await self.find(finder, label="kitchen") == [light]
+            self.received(
+                {
+                    "light": [DeviceMessages.GetVersion(), LightMessages.GetColor()],
+                    "switch": [DeviceMessages.GetVersion(), LightMessages.GetColor(), DeviceMessages.GetLabel()],
+                }
+            )
+
+            assert finder.index.by["label"] == {"kitchen": {light}, "switcharoo": {switch}}
+
+            matches = pytest.helpers.AsyncMock(name="matches", side_effect=NotImplementedError())
+            with mock.patch.object(Device, "matches", matches):
+                assert await self.find(finder, label="kitchen") == [light]
+                assert await self.find(finder, label="switch*") == [switch]
+                assert await self.find(finder, label=["kitchen", "switch*"]) == [light, switch]
+                assert await self.find(finder, label="kitchen", cap="matrix") == []
+                assert await self.find(finder, label="kitchen", product_id=Products.LCM2_A19.pid) == [light]
+                assert await self.find(finder, serial=switch, product_id=Products.LCM3_32_SWITCH_I.pid) == [switch]
+                assert await self.find(finder, power="off") == [light]
+            matches.assert_not_called()
+            self.received({"light": [], "switch": []})
+
+            await devices["light"].change_one("label", "den", event=None)
+
+            assert await self.find(finder, label="kitchen", group_id="aa") == []
+            self.received({"light": [DeviceMessages.GetGroup()], "switch": [DeviceMessages.GetGroup()]})
+
+            assert await self.find(finder, label="den", refresh_info=True) == [light]
+            self.received({"light": [LightMessages.GetColor()], "switch": [DeviceMessages.GetLabel()]})
+            assert finder.index.by["label"] == {"den": {light}, "switcharoo": {switch}}
@@ -0,0 +1,154 @@
+import pytest
+from photons_app import helpers as hp
+from photons_control.device_finder import Filter, Finder, InfoPoints, RefreshScheduler
+from photons_messages import DeviceMessages, DiscoveryMessages, LightMessages
+from photons_products import Products
+
+devices = pytest.helpers.mimic()
+light = devices.add("light")(
+    "d073d5000001",
+    Products.LCM2_A19,
+    hp.Firmware(2, 80),
+    value_store=dict(
+        label="kitchen",
+        group={"identity": "aa", "label": "g1", "updated_at": 42},
+        location={"identity": "bb", "label": "l1", "updated_at": 56},
+    ),
+)
+switch = devices.add("switch")(
+    "d073d5000002",
+    Products.LCM3_32_SWITCH_I,
+    hp.Firmware(3, 90),
+    value_store=dict(
+        label="switcharoo",
+        group={"identity": "aa", "label": "g1", "updated_at": 42},
+        location={"identity": "bb", "label": "l1", "updated_at": 56},
+    ),
+)
+
+
+@pytest.fixture()
+async def sender(final_future):
+    async with devices.for_test(final_future) as sender:
+        yield sender
+
+
+@pytest.fixture()
+async def finder(sender, final_future):
+    async with Finder(sender, final_future) as finder:
+        assert sorted([d.serial async for d in finder.find(Filter.empty())]) == [light.serial, switch.serial]
+        yield finder
+
+
+def received(by_device):
+    for device, msgs in by_device.items():
+        devices.store(device).assertIncoming(*msgs, ignore=[DiscoveryMessages.GetService])
+        devices.store(device).clear()
+
+
+class TestRefreshScheduler:
+    def test_it_has_refreshes_from_time_between_queries(self, sender, finder):
+        scheduler = RefreshScheduler(sender, finder, messages_per_second=0.5, time_between_queries={"GROUP": 2})
+        assert scheduler.budget == 1
+        assert scheduler.refreshes == {
+            InfoPoints.VERSION: None,
+            InfoPoints.LIGHT_STATE: 10,
+            InfoPoints.LABEL: 10,
+            InfoPoints.FIRMWARE: 300,
+            InfoPoints.GROUP: 2,
+            InfoPoints.LOCATION: 60,
+        }
+        assert scheduler.final_future.original_fut is finder.final_future
+
+    async def test_it_only_sends_the_budget_each_slot(self, sender, finder):
+        scheduler = RefreshScheduler(sender, finder, messages_per_second=1)
+
+        first = scheduler.next_slot()
+        assert first == [(light.serial, InfoPoints.VERSION)]
+        assert scheduler.waiting == 1
+
+        # The point in flight isn't chosen again
+        second = scheduler.next_slot()
+        assert second == [(switch.serial, InfoPoints.VERSION)]
+        assert scheduler.waiting == 0
+
+        assert scheduler.next_slot() == []
+
+        await scheduler.send(first)
+        await scheduler.send(second)
+        assert scheduler.inflight == set()
+        assert scheduler.sent == 2
+
+        assert finder.devices[light.serial].product_id == Products.LCM2_A19.pid
+        assert finder.devices[switch.serial].product_id == Products.LCM3_32_SWITCH_I.pid
+        received({light: [DeviceMessages.GetVersion()], switch: [DeviceMessages.GetVersion()]})
+
+    async def test_it_refreshes_points_that_are_due(self, sender, finder, fake_time):
+        fake_time.set(1)
+        scheduler = RefreshScheduler(sender, finder, messages_per_second=20)
+
+        await scheduler.send(scheduler.next_slot())
+        received({light: [DeviceMessages.GetVersion()], switch: [DeviceMessages.GetVersion()]})
+
+        chosen = scheduler.next_slot()
+        assert chosen == [
+            (light.serial, InfoPoints.LIGHT_STATE),
+            (light.serial, InfoPoints.FIRMWARE),
+            (light.serial, InfoPoints.GROUP),
+            (light.serial, InfoPoints.LOCATION),
+            (switch.serial, InfoPoints.LABEL),
+            (switch.serial, InfoPoints.FIRMWARE),
+            (switch.serial, InfoPoints.GROUP),
+            (switch.serial, InfoPoints.LOCATION),
+        ]
+        await scheduler.send(chosen)
+        received(
+            {
+                light: [LightMessages.GetColor(), DeviceMessages.GetHostFirmware(), DeviceMessages.GetGroup(), DeviceMessages.GetLocation()],
+                switch: [DeviceMessages.GetLabel(), DeviceMessages.GetHostFirmware(), DeviceMessages.GetGroup(), DeviceMessages.GetLocation()],
+            }
+        )
+
+        assert finder.devices[light.serial].label == "kitchen"
+        assert finder.devices[switch.serial].label == "switcharoo"
+        assert finder.devices[switch.serial].group_name == "g1"
+
+        fake_time.set(5)
+        assert scheduler.next_slot() == []
+        assert scheduler.staleness == {
+            "VERSION": 4,
+            "LIGHT_STATE": 4,
+            "LABEL": 4,
+            "FIRMWARE": 4,
+            "GROUP": 4,
+            "LOCATION": 4,
+        }
+
+        fake_time.set(12)
+        chosen = scheduler.next_slot()
+        assert chosen == [(light.serial, InfoPoints.LIGHT_STATE), (switch.serial, InfoPoints.LABEL)]
+        assert scheduler.staleness["LIGHT_STATE"] == 11
+        await scheduler.send(chosen)
+        received({light: [LightMessages.GetColor()], switch: [DeviceMessages.GetLabel()]})
+
+    async def test_it_sends_the_most_overdue_first(self, sender, finder, fake_time):
+        fake_time.set(1)
+        scheduler = RefreshScheduler(sender, finder, messages_per_second=20)
+        await scheduler.send(scheduler.next_slot())
+        await scheduler.send(scheduler.next_slot())
+        for device in devices:
+            devices.store(device).clear()
+
+        fake_time.set(100)
+        finder.devices[switch.serial].point_futures[InfoPoints.LABEL].reset()
+        finder.devices[switch.serial].point_futures[InfoPoints.LABEL].set_result(50)
+
+        scheduler.budget = 1
+        assert scheduler.next_slot() == [(light.serial, InfoPoints.LIGHT_STATE)]
+        assert scheduler.waiting == 5
+        assert scheduler.next_slot() == [(switch.serial, InfoPoints.LABEL)]
+        assert scheduler.next_slot() == [(light.serial, InfoPoints.GROUP)]
+        assert scheduler.next_slot() == [(light.serial, InfoPoints.LOCATION)]
+        assert scheduler.next_slot() == [(switch.serial, InfoPoints.GROUP)]
+        assert scheduler.next_slot() == [(switch.serial, InfoPoints.LOCATION)]
+        assert scheduler.next_slot() == []
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+
+from photons_control.planner.capability_cache import CapabilityCache
+from photons_messages import DeviceMessages
+
+serial = "d073d5000001"
+
+
+def version(**kwargs):
+    return DeviceMessages.StateVersion(**{"vendor": 1, "product": 55, "target": serial, **kwargs})
+
+
+def firmware(**kwargs):
+    return DeviceMessages.StateHostFirmware(**{"build": 1, "version_major": 3, "version_minor": 70, "target": serial, **kwargs})
+
+
+class TestCapabilityCache:
+    async def test_it_is_empty_if_the_file_doesnt_exist(self, tmp_path):
+        cache = CapabilityCache(str(tmp_path / "nope.json"))
+        assert cache.devices == {}
+        assert cache.packets(serial) == []
+
+    async def test_it_is_empty_if_the_file_isnt_valid(self, tmp_path):
+        path = tmp_path / "cache.json"
+
+        for content in ("{", "[]", "1"):
+            path.write_text(content)
+            assert CapabilityCache(str(path)).devices == {}
+
+    async def test_it_loads_valid_entries(self, tmp_path):
+        path = tmp_path / "cache.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "d073d5000001": {"vendor": 1, "product": 55, "firmware": {"build": 1, "version_major": 3, "version_minor": 70}},
+                    "d073d5000002": {"vendor": 1, "product": "nope"},
+                    "d073d5000003": {"firmware": {"build": 1}},
+                    "d073d5000004": {"vendor": 1, "product": 22},
+                    "d073d5000005": {},
+                }
+            )
+        )
+
+        cache = CapabilityCache(str(path))
+        assert cache.devices == {
+            "d073d5000001": {"vendor": 1, "product": 55, "firmware": {"build": 1, "version_major": 3, "version_minor": 70}, "seen": 0},
+            "d073d5000004": {"vendor": 1, "product": 22},
+        }
+
+    async def test_it_only_gives_replies_for_devices_with_product_and_firmware(self, tmp_path):
+        cache = CapabilityCache(str(tmp_path / "cache.json"))
+        cache.save_after = 100
+
+        cache.saw(version())
+        assert cache.packets(serial) == []
+        assert cache.reply(DeviceMessages.GetVersion().Key, serial) is None
+
+        cache.saw(firmware())
+        pkts = cache.packets(serial)
+        assert pkts == [version(), firmware()]
+        assert [p.Information.sender_message.Key for p in pkts] == [DeviceMessages.GetVersion().Key, DeviceMessages.GetHostFirmware().Key]
+
+        assert cache.reply(DeviceMessages.GetPower().Key, serial) is None
+        assert cache.reply(DeviceMessages.GetVersion().Key, "d073d5000002") is None
+
+        cache.finish()
+
+    async def test_it_forgets_the_device_when_the_firmware_changes(self, tmp_path):
+        cache = CapabilityCache(str(tmp_path / "cache.json"))
+        cache.save_after = 100
+
+        cache.saw(version())
+        cache.saw(firmware())
+        assert cache.packets(serial) == [version(), firmware()]
+
+        cache.saw(firmware(version_minor=80))
+        assert cache.devices == {serial: {"firmware": {"build": 1, "version_major": 3, "version_minor": 80}, "seen": 0}}
+        assert cache.packets(serial) == []
+
+        cache.finish()
+
+    async def test_it_saves_changes_after_a_delay(self, tmp_path):
+        path = tmp_path / "sub" / "cache.json"
+        cache = CapabilityCache(str(path))
+        cache.save_after = 0.01
+
+        cache.saw(DeviceMessages.StatePower(level=0, target=serial))
+        assert cache.handle is None
+
+        cache.saw(version())
+        cache.saw(firmware())
+        handle = cache.handle
+        assert handle is not None
+        assert not path.exists()
+
+        await asyncio.sleep(0.05)
+        assert cache.handle is None
+        assert not os.path.exists(f"{path}.tmp")
+        assert json.loads(path.read_text()) == {
+            serial: {"vendor": 1, "product": 55, "firmware": {"build": 1, "version_major": 3, "version_minor": 70}, "seen": 0}
+        }
+
+        cache.saw(version())
+        cache.saw(firmware())
+        assert cache.handle is None
+
+        assert CapabilityCache(str(path)).packets(serial) == [version(), firmware()]
+
+    async def test_it_stops_using_firmware_the_device_hasnt_told_us_about_recently(self, tmp_path, fake_time):
+        cache = CapabilityCache(str(tmp_path / "cache.json"))
+        cache.save_after = 100
+        cache.max_age = 20
+        cache.refresh_after = 5
+
+        fake_time.set(1)
+        cache.saw(version())
+        cache.saw(firmware())
+        assert cache.devices[serial]["seen"] == 1
+        cache.finish()
+
+        fake_time.set(4)
+        cache.saw(firmware())
+        assert cache.devices[serial]["seen"] == 1
+        assert cache.handle is None
+
+        fake_time.set(7)
+        cache.saw(firmware())
+        assert cache.devices[serial]["seen"] == 7
+        assert cache.seen(serial) == 7
+        assert cache.seen("d073d5000002") is None
+        assert cache.handle is not None
+        cache.finish()
+
+        fake_time.set(27)
+        assert cache.packets(serial) == [version(), firmware()]
+
+        fake_time.set(28)
+        assert cache.packets(serial) == []
+        assert cache.reply(DeviceMessages.GetHostFirmware().Key, serial) is None
+
+        cache.saw(firmware())
+        assert cache.packets(serial) == [version(), firmware()]
+        cache.finish()
+
+    async def test_it_doesnt_use_entries_without_a_seen_once_they_are_old(self, tmp_path, fake_time):
+        path = tmp_path / "cache.json"
+        path.write_text(json.dumps({serial: {"vendor": 1, "product": 55, "firmware": {"build": 1, "version_major": 3, "version_minor": 70}}}))
+
+        fake_time.set(CapabilityCache.max_age + 1)
+        assert CapabilityCache(str(path)).packets(serial) == []
+
+    async def test_it_saves_on_finish(self, tmp_path):
+        path = tmp_path / "cache.json"
+        cache = CapabilityCache(str(path))
+        cache.save_after = 100
+
+        cache.finish()
+        assert not path.exists()
+
+        cache.saw(version())
+        cache.finish()
+        assert cache.handle is None
+        assert json.loads(path.read_text()) == {serial: {"vendor": 1, "product": 55}}
+
+    async def test_it_doesnt_complain_if_it_cant_save(self, tmp_path):
+        path = tmp_path / "file"
+        path.write_text("")
+        cache = CapabilityCache(str(path / "cache.json"))
+        cache.saw(version())
+        cache.finish()
@@ -7,6 +7,9 @@ from delfick_project.errors_pytest import assertRaises, assertSameError
 from photons_app import helpers as hp
 from photons_app.errors import BadRunWithResults, TimedOut
 from photons_control.planner import Gatherer, NoMessages, Plan, Skip, make_plans
+from photons_control.planner.capability_cache import CapabilityCache
+from photons_control.planner.plans import FirmwarePlan
+from photons_control.planner.snapshot import GathererSnapshot
 from photons_messages import DeviceMessages, DiscoveryMessages, LightMessages
 from photons_products import Products
 
@@ -1104,6 +1107,215 @@ class TestGatherer:
 
             compare_received({light1: [], light2: [], light3: []})
 
+    class TestBatch:
+        async def test_it_sends_messages_for_all_devices_with_one_sender_call(self, sender):
+            class LabelPlan(Plan):
+                messages = [DeviceMessages.GetLabel()]
+
+                class Instance(Plan.Instance):
+                    def process(s, pkt):
+                        if pkt | DeviceMessages.StateLabel:
+                            s.label = pkt.label
+                            return True
+
+                    async def info(s):
+                        return s.label
+
+            class PowerPlan(Plan):
+                messages = [DeviceMessages.GetPower()]
+
+                class Instance(Plan.Instance):
+                    finished_after_no_more_messages = True
+
+                    def process(s, pkt):
+                        if pkt | DeviceMessages.StatePower:
+                            s.level = pkt.level
+
+                    async def info(s):
+                        return s.level
+
+            sent = []
+            original = type(sender).__call__
+
+            def call(s, msg, reference=None, **kwargs):
+                if isinstance(msg, list):
+                    sent.append(msg)
+                return original(s, msg, reference, **kwargs)
+
+            gatherer = Gatherer(sender)
+            plans = make_plans(label=LabelPlan(), power=PowerPlan())
+
+            with mock.patch.object(type(sender), "__call__", call):
+                got = dict(await gatherer.gather_all(plans, two_lights, batch=True))
+
+            assert got == {
+                light1.serial: (True, {"label": "bob", "power": 0}),
+                light2.serial: (True, {"label": "sam", "power": 65535}),
+            }
+
+            assert len(sent) == 1
+            msgs = sent[0]
+            assert sorted((msg.serial, msg.pkt_type) for msg in msgs) == sorted(
+                [
+                    (light1.serial, DeviceMessages.GetLabel.Payload.message_type),
+                    (light1.serial, DeviceMessages.GetPower.Payload.message_type),
+                    (light2.serial, DeviceMessages.GetLabel.Payload.message_type),
+                    (light2.serial, DeviceMessages.GetPower.Payload.message_type),
+                ]
+            )
+
+            compare_received(
+                {
+                    light1: [DeviceMessages.GetLabel(), DeviceMessages.GetPower()],
+                    light2: [DeviceMessages.GetLabel(), DeviceMessages.GetPower()],
+                    light3: [],
+                }
+            )
+
+            # And it uses the cache like normal
+            got = dict(await gatherer.gather_all(plans, two_lights, batch=True))
+            assert got[light1.serial] == (True, {"label": "bob", "power": 0})
+            compare_received({light1: [], light2: [], light3: []})
+
+        async def test_it_yields_results_per_serial_as_they_complete(self, sender):
+            class LabelPlan(Plan):
+                messages = [DeviceMessages.GetLabel()]
+
+                class Instance(Plan.Instance):
+                    def process(s, pkt):
+                        if pkt | DeviceMessages.StateLabel:
+                            s.label = pkt.label
+                            return True
+
+                    async def info(s):
+                        return s.label
+
+            gatherer = Gatherer(sender)
+            plans = make_plans(label=LabelPlan())
+
+            found = []
+            async for serial, label, info in gatherer.gather(plans, devices.serials, batch=True):
+                found.append((serial, label, info))
+
+            assert sorted(found) == [
+                (light1.serial, "label", "bob"),
+                (light2.serial, "label", "sam"),
+                (light3.serial, "label", "strip"),
+            ]
+
+    class TestBoundedCache:
+        async def test_it_asks_again_for_devices_the_cache_forgot(self, sender):
+            class LabelPlan(Plan):
+                default_refresh = False
+                messages = [DeviceMessages.GetLabel()]
+
+                class Instance(Plan.Instance):
+                    def process(s, pkt):
+                        if pkt | DeviceMessages.StateLabel:
+                            s.label = pkt.label
+                            return True
+
+                    async def info(s):
+                        return s.label
+
+            gatherer = Gatherer(sender, max_serials=1)
+            plans = make_plans(label=LabelPlan())
+
+            assert dict(await gatherer.gather_all(plans, light1.serial)) == {light1.serial: (True, {"label": "bob"})}
+            assert dict(await gatherer.gather_all(plans, light1.serial)) == {light1.serial: (True, {"label": "bob"})}
+            compare_received({light1: [DeviceMessages.GetLabel()], light2: [], light3: []})
+
+            assert dict(await gatherer.gather_all(plans, light2.serial)) == {light2.serial: (True, {"label": "sam"})}
+            assert dict(await gatherer.gather_all(plans, light1.serial)) == {light1.serial: (True, {"label": "bob"})}
+            compare_received({light1: [DeviceMessages.GetLabel()], light2: [DeviceMessages.GetLabel()], light3: []})
+
+            assert gatherer.session.evictions > 0
+
+            gatherer.clear_cache()
+            assert gatherer.session.max_serials == 1
+
+    class TestCapabilityCache:
+        async def test_it_uses_remembered_versions_and_firmware(self, sender, tmp_path):
+            capability_cache = CapabilityCache(str(tmp_path / "capabilities.json"))
+            capability_cache.save_after = 100
+
+            plans = make_plans("version", "firmware")
+            want = dict(await Gatherer(sender).gather_all(plans, two_lights))
+            compare_received(
+                {
+                    light1: [DeviceMessages.GetVersion(), DeviceMessages.GetHostFirmware()],
+                    light2: [DeviceMessages.GetVersion(), DeviceMessages.GetHostFirmware()],
+                }
+            )
+
+            with modified_time() as t, mock.patch.object(sender, "capability_cache", capability_cache):
+                await sender([DeviceMessages.GetVersion(), DeviceMessages.GetHostFirmware()], light1.serial)
+                devices.store(light1).clear()
+                assert sorted(capability_cache.devices) == [light1.serial]
+
+                t.forward(0.5)
+                gatherer = Gatherer(sender)
+                assert dict(await gatherer.gather_all(plans, two_lights)) == want
+                compare_received(
+                    {
+                        light1: [],
+                        light2: [DeviceMessages.GetVersion(), DeviceMessages.GetHostFirmware()],
+                    }
+                )
+
+                assert sorted(capability_cache.devices) == [light1.serial, light2.serial]
+                capability_cache.finish()
+
+        async def test_it_still_asks_the_device_if_the_plan_wants_fresh_information(self, sender, tmp_path):
+            capability_cache = CapabilityCache(str(tmp_path / "capabilities.json"))
+            capability_cache.save_after = 100
+
+            with modified_time() as t, mock.patch.object(sender, "capability_cache", capability_cache):
+                await sender([DeviceMessages.GetVersion(), DeviceMessages.GetHostFirmware()], light1.serial)
+                devices.store(light1).clear()
+
+                t.forward(0.5)
+                plans = make_plans(firmware=FirmwarePlan(refresh=True))
+                got = dict(await Gatherer(sender).gather_all(plans, light1.serial))
+                assert got[light1.serial][0]
+                compare_received({light1: [DeviceMessages.GetHostFirmware()], light2: []})
+
+                # Or if what the cache remembers is older than the refresh
+                t.forward(20)
+                plans = make_plans(firmware=FirmwarePlan(refresh=10))
+                got = dict(await Gatherer(sender).gather_all(plans, light1.serial))
+                assert got[light1.serial][0]
+                compare_received({light1: [DeviceMessages.GetHostFirmware()], light2: []})
+
+                capability_cache.finish()
+
+    class TestGathererSnapshot:
+        async def test_it_uses_replies_and_results_from_a_previous_run(self, sender, tmp_path):
+            snapshot = GathererSnapshot(str(tmp_path / "snapshot"), sender.transport_target.protocol_register)
+            plans = make_plans("label", "power")
+            await sender.find_devices()
+
+            with modified_time() as t:
+                gatherer = Gatherer(sender)
+                want = dict(await gatherer.gather_all(plans, two_lights))
+                compare_received(
+                    {
+                        light1: [DeviceMessages.GetLabel(), DeviceMessages.GetPower()],
+                        light2: [DeviceMessages.GetLabel(), DeviceMessages.GetPower()],
+                    }
+                )
+                snapshot.save(gatherer.session)
+
+                with mock.patch.object(sender, "gatherer_snapshot", snapshot, create=True):
+                    t.forward(0.5)
+                    assert dict(await Gatherer(sender).gather_all(plans, two_lights)) == want
+                    compare_received({light1: [], light2: []})
+
+                    # The refresh on the plan still applies
+                    t.forward(2)
+                    assert dict(await Gatherer(sender).gather_all(plans, two_lights)) == want
+                    compare_received({light1: [DeviceMessages.GetPower()], light2: [DeviceMessages.GetPower()]})
+
     class TestDependencies:
         async def test_it_it_can_get_dependencies(self, sender):
             called = []
@@ -1172,13 +1384,15 @@ class TestGatherer:
             compare_called(
                 called,
                 [
+                    # light3 skips the power plan and so doesn't wait for the other lights
+                    ("info.process.label", light3.serial, label_type),
+                    ("info.info", light3.serial),
+                    # And each light starts as soon as it has it's own power
                     ("power.process.power", light1.serial, power_type),
                     ("info.power", light1.serial),
+                    ("info.process.power", light1.serial, power_type),
                     ("power.process.power", light2.serial, power_type),
                     ("info.power", light2.serial),
-                    ("info.process.label", light3.serial, label_type),
-                    ("info.info", light3.serial),
-                    ("info.process.power", light1.serial, power_type),
                     ("info.process.power", light2.serial, power_type),
                     ("info.process.infrared", light1.serial, infrared_type),
                     ("info.info", light1.serial),
@@ -1195,6 +1409,85 @@ class TestGatherer:
                 }
             )
 
+        async def test_it_gets_dependencies_for_all_serials_together_and_uses_the_cache(self, sender):
+            class LabelPlan(Plan):
+                messages = [DeviceMessages.GetLabel()]
+
+                class Instance(Plan.Instance):
+                    def process(s, pkt):
+                        if pkt | DeviceMessages.StateLabel:
+                            s.label = pkt.label
+                            return True
+
+                    async def info(s):
+                        return s.label
+
+            class PowerPlan(Plan):
+                messages = [DeviceMessages.GetPower()]
+                dependant_info = {"l": LabelPlan(refresh=False)}
+
+                class Instance(Plan.Instance):
+                    def process(s, pkt):
+                        if pkt | DeviceMessages.StatePower:
+                            s.level = pkt.level
+                            return True
+
+                    async def info(s):
+                        return (s.deps["l"], s.level)
+
+            sent = []
+            original = type(sender).__call__
+
+            def call(s, msg, reference=None, **kwargs):
+                if isinstance(msg, list):
+                    sent.append(sorted((m.serial, m.pkt_type) for m in msg))
+                return original(s, msg, reference, **kwargs)
+
+            gatherer = Gatherer(sender)
+            plans = make_plans(power=PowerPlan())
+
+            with mock.patch.object(type(sender), "__call__", call):
+                got = dict(await gatherer.gather_all(plans, two_lights))
+
+            assert got == {
+                light1.serial: (True, {"power": ("bob", 0)}),
+                light2.serial: (True, {"power": ("sam", 65535)}),
+            }
+
+            get_label = DeviceMessages.GetLabel.Payload.message_type
+            get_power = DeviceMessages.GetPower.Payload.message_type
+
+            # One sender call for the labels of both lights, then one per light for power
+            assert sorted(sent) == sorted(
+                [
+                    [(light1.serial, get_label), (light2.serial, get_label)],
+                    [(light1.serial, get_power)],
+                    [(light2.serial, get_power)],
+                ]
+            )
+
+            sent.clear()
+            compare_received(
+                {
+                    light1: [DeviceMessages.GetLabel(), DeviceMessages.GetPower()],
+                    light2: [DeviceMessages.GetLabel(), DeviceMessages.GetPower()],
+                    light3: [],
+                }
+            )
+
+            # And the cached labels are used the next time
+            with mock.patch.object(type(sender), "__call__", call):
+                got = dict(await gatherer.gather_all(make_plans(power=PowerPlan(refresh=True)), two_lights))
+
+            assert got[light2.serial] == (True, {"power": ("sam", 65535)})
+            compare_received(
+                {
+                    light1: [DeviceMessages.GetPower()],
+                    light2: [DeviceMessages.GetPower()],
+                    light3: [],
+                }
+            )
+
         async def test_it_it_can_get_dependencies_of_dependencies_and_messages_can_be_shared(self, sender):
             called = []
 
@@ -1263,9 +1556,9 @@ class TestGatherer:
                     ("info.plan1", light2.serial),
                     ("plan2", light1.serial, label_type),
                     ("info.plan2", light1.serial),
+                    ("plan3", light1.serial, label_type),
                     ("plan2", light2.serial, label_type),
                     ("info.plan2", light2.serial),
-                    ("plan3", light1.serial, label_type),
                     ("plan3", light2.serial, label_type),
                     ("plan3", light1.serial, power_type),
                     ("info.plan3", light1.serial),
@@ -21,20 +21,30 @@ def Information(key):
 
 class TestSession:
     def test_it_has_received_and_filled(self, session):
-        assert hasattr(session, "received")
-        assert hasattr(session, "filled")
+        assert session.received == {}
+        assert session.filled == {}
+
+        assert session.max_age is None
+        assert session.max_keys is None
+        assert session.max_serials is None
+
+        assert session.hits == 0
+        assert session.misses == 0
+        assert session.evictions == 0
 
+    def test_it_doesnt_make_entries_when_looking_for_things(self, session):
         key = str(uuid.uuid4())
-        d = session.received[key]
-        assert isinstance(d, dict)
+        serial = "d073d5000001"
 
-        key2 = str(uuid.uuid4())
-        item = d[key2]
-        assert isinstance(item, list)
+        assert not session.has_received(key, serial)
+        assert session.completed(key, serial) is None
+        assert list(session.known_packets(serial)) == []
+        session.refresh_received(key, serial, True)
+        session.refresh_filled(key, serial, True)
 
-        key3 = str(uuid.uuid4())
-        d = session.filled[key3]
-        assert isinstance(d, dict)
+        assert session.received == {}
+        assert session.filled == {}
+        assert session.misses == 2
 
     def test_it_can_make_a_planner(self, session):
         plans = mock.Mock(name="plans")
@@ -119,15 +129,15 @@ class TestSession:
 
         with mock.patch("time.time", t):
             session.fill(plankey, serial, result)
-            assert session.filled == {plankey: {serial: (t1, result)}}
+            assert session.filled == {serial: {plankey: (t1, result)}}
 
             session.fill(plankey, serial, result2)
-            assert session.filled == {plankey: {serial: (t2, result2)}}
+            assert session.filled == {serial: {plankey: (t2, result2)}}
 
         serial2 = "d073d5000002"
         with mock.patch("time.time", t):
             session.fill(plankey, serial2, result)
-            assert session.filled == {plankey: {serial: (t2, result2), serial2: (t3, result)}}
+            assert session.filled == {serial: {plankey: (t2, result2)}, serial2: {plankey: (t3, result)}}
 
         plankey2 = str(uuid.uuid4())
         serial3 = "d073d5000003"
@@ -136,8 +146,9 @@ class TestSession:
         with mock.patch("time.time", t):
             session.fill(plankey2, serial3, result3)
             assert session.filled == {
-                plankey: {serial: (t2, result2), serial2: (t3, result)},
-                plankey2: {serial3: (t4, result3)},
+                serial: {plankey: (t2, result2)},
+                serial2: {plankey: (t3, result)},
+                serial3: {plankey2: (t4, result3)},
             }
 
     class TestCompleted:
@@ -364,8 +375,8 @@ class TestSession:
                 @hp.memoized_property
                 def starting_filled(s):
                     return {
-                        s.plankeya: {s.serial1: (1, s.result1a), s.serial2: (2, s.result2a)},
-                        s.plankeyb: {s.serial1: (5, s.result1b), s.serial2: (10, s.result2b)},
+                        s.serial1: {s.plankeya: (1, s.result1a), s.plankeyb: (5, s.result1b)},
+                        s.serial2: {s.plankeya: (2, s.result2a), s.plankeyb: (10, s.result2b)},
                     }
 
                 def __init__(s):
@@ -400,12 +411,12 @@ class TestSession:
         def test_it_removes_result_if_refresh_is_True_or_0(self, session, V):
             session.refresh_filled(V.plankeya, V.serial1, True)
             assert session.filled == {
-                V.plankeya: {V.serial2: session.filled[V.plankeya][V.serial2]},
-                V.plankeyb: session.filled[V.plankeyb],
+                V.serial1: {V.plankeyb: (5, V.result1b)},
+                V.serial2: V.starting_filled[V.serial2],
             }
 
-            session.refresh_filled(V.plankeya, V.serial2, 0)
-            assert session.filled == {V.plankeyb: session.filled[V.plankeyb]}
+            session.refresh_filled(V.plankeyb, V.serial1, 0)
+            assert session.filled == {V.serial2: V.starting_filled[V.serial2]}
 
         def test_it_removes_result_if_been_refresh_seconds(self, session, fake_time, V):
             fake_time.set(6)
@@ -415,11 +426,182 @@ class TestSession:
             session.refresh_filled(V.plankeyb, V.serial1, 1)
 
             assert session.filled == {
-                V.plankeya: session.filled[V.plankeya],
-                V.plankeyb: {V.serial2: session.filled[V.plankeyb][V.serial2]},
+                V.serial1: {V.plankeya: (1, V.result1a)},
+                V.serial2: V.starting_filled[V.serial2],
             }
 
             fake_time.set(20)
             session.refresh_filled(V.plankeyb, V.serial2, 5)
 
-            assert session.filled == {V.plankeya: session.filled[V.plankeya]}
+            assert session.filled == {
+                V.serial1: {V.plankeya: (1, V.result1a)},
+                V.serial2: {V.plankeya: (2, V.result2a)},
+            }
+
+    class TestLimits:
+        def pkt(self, serial, key):
+            return mock.Mock(name=f"pkt_{serial}_{key}", serial=serial, Information=Information(key))
+
+        def test_it_forgets_the_least_recently_used_serial(self, fake_time):
+            session = Session(max_serials=2)
+
+            session.receive(self.pkt("d073d5000001", "k1"))
+            session.receive(self.pkt("d073d5000002", "k1"))
+            session.fill("p1", "d073d5000002", "r2")
+
+            # Using a serial makes it recently used
+            assert session.has_received("k1", "d073d5000001")
+
+            session.receive(self.pkt("d073d5000003", "k1"))
+
+            assert sorted(session.received) == ["d073d5000001", "d073d5000003"]
+            assert session.filled == {}
+            assert session.evictions == 2
+
+        def test_it_forgets_the_least_recently_used_key_per_serial(self, fake_time):
+            session = Session(max_keys=2)
+
+            session.receive(self.pkt("d073d5000001", "k1"))
+            session.receive(self.pkt("d073d5000001", "k1"))
+            session.receive(self.pkt("d073d5000001", "k2"))
+            session.receive(self.pkt("d073d5000002", "k3"))
+
+            assert session.has_received("k1", "d073d5000001")
+            session.receive(self.pkt("d073d5000001", "k3"))
+
+            assert list(session.received["d073d5000001"]) == ["k1", "k3"]
+            assert list(session.received["d073d5000002"]) == ["k3"]
+            assert session.evictions == 1
+
+            session.fill("p1", "d073d5000001", "r1")
+            session.fill("p2", "d073d5000001", "r2")
+            assert session.completed("p1", "d073d5000001") == "r1"
+            session.fill("p3", "d073d5000001", "r3")
+
+            assert list(session.filled["d073d5000001"]) == ["p1", "p3"]
+            assert session.evictions == 2
+
+        def test_it_forgets_things_older_than_max_age(self, fake_time):
+            session = Session(max_age=10)
+
+            fake_time.set(1)
+            session.receive(self.pkt("d073d5000001", "k1"))
+            session.fill("p1", "d073d5000001", "r1")
+
+            fake_time.set(5)
+            p2 = self.pkt("d073d5000001", "k1")
+            session.receive(p2)
+
+            fake_time.set(11)
+            assert session.has_received("k1", "d073d5000001")
+            assert session.completed("p1", "d073d5000001") == "r1"
+            assert session.hits == 2
+
+            fake_time.set(12)
+            assert list(session.known_packets("d073d5000001")) == [p2]
+            assert session.has_received("k1", "d073d5000001")
+            assert session.completed("p1", "d073d5000001") is None
+            assert session.misses == 1
+            assert session.evictions == 2
+
+            fake_time.set(30)
+            session.receive(self.pkt("d073d5000002", "k1"))
+            assert list(session.received) == ["d073d5000002"]
+            assert session.filled == {}
+            assert session.evictions == 3
+
+    class TestCapabilityCache:
+        def capability_cache(self, reply, seen=1):
+            capability_cache = mock.Mock(name="capability_cache", get_version_key="k1", get_host_firmware_key="k2")
+            capability_cache.reply.side_effect = reply
+            capability_cache.seen.return_value = seen
+            return capability_cache
+
+        def test_it_uses_the_capability_cache_once_per_key(self, fake_time):
+            pkt = mock.Mock(name="pkt", serial="d073d5000001", Information=Information("k1"))
+            capability_cache = self.capability_cache(lambda key, serial: pkt if key == "k1" else None)
+            session = Session(capability_cache=capability_cache)
+
+            fake_time.set(5)
+            session.seed("k1", "d073d5000001")
+            session.seed("k2", "d073d5000001")
+            assert session.has_received("k1", "d073d5000001")
+            assert not session.has_received("k2", "d073d5000001")
+
+            # It was received when the capability cache last heard from the device
+            assert session.received["d073d5000001"]["k1"] == [(1, pkt)]
+            capability_cache.seen.assert_called_once_with("d073d5000001")
+
+            session.refresh_received("k1", "d073d5000001", True)
+            session.seed("k1", "d073d5000001")
+            session.seed("k2", "d073d5000001")
+            assert not session.has_received("k1", "d073d5000001")
+            assert not session.has_received("k2", "d073d5000001")
+
+            assert capability_cache.reply.mock_calls == [
+                mock.call("k1", "d073d5000001"),
+                mock.call("k2", "d073d5000001"),
+            ]
+
+        def test_it_doesnt_seed_if_it_already_has_a_reply(self, fake_time):
+            pkt = mock.Mock(name="pkt", serial="d073d5000001", Information=Information("k1"))
+            capability_cache = self.capability_cache(lambda key, serial: None)
+            session = Session(capability_cache=capability_cache)
+
+            fake_time.set(5)
+            session.receive(pkt)
+            session.seed("k1", "d073d5000001")
+            assert session.received["d073d5000001"]["k1"] == [(5, pkt)]
+            assert session.seeded == set()
+            capability_cache.reply.assert_not_called()
+
+        def test_it_lets_the_refresh_remove_old_seeded_replies(self, fake_time):
+            pkt = mock.Mock(name="pkt", serial="d073d5000001", Information=Information("k1"))
+            capability_cache = self.capability_cache(lambda key, serial: pkt, seen=1)
+            session = Session(capability_cache=capability_cache)
+
+            fake_time.set(20)
+            session.seed("k1", "d073d5000001")
+            session.refresh_received("k1", "d073d5000001", 30)
+            assert session.has_received("k1", "d073d5000001")
+
+            session.refresh_received("k1", "d073d5000001", 10)
+            assert not session.has_received("k1", "d073d5000001")
+
+        def test_it_only_uses_the_capability_cache_for_version_and_firmware(self, fake_time):
+            capability_cache = self.capability_cache(lambda key, serial: None)
+            session = Session(capability_cache=capability_cache)
+
+            for key in ("k1", "k2", "k3", "k4"):
+                session.seed(key, "d073d5000001")
+                session.seed(key, "d073d5000002")
+
+            assert session.seeded == {("d073d5000001", "k1"), ("d073d5000001", "k2"), ("d073d5000002", "k1"), ("d073d5000002", "k2")}
+            assert capability_cache.reply.mock_calls == [
+                mock.call("k1", "d073d5000001"),
+                mock.call("k1", "d073d5000002"),
+                mock.call("k2", "d073d5000001"),
+                mock.call("k2", "d073d5000002"),
+            ]
+
+        def test_it_forgets_what_it_seeded_when_it_forgets_a_device(self, fake_time):
+            pkt = mock.Mock(name="pkt", serial="d073d5000001", Information=Information("k1"))
+            capability_cache = self.capability_cache(lambda key, serial: pkt if serial == "d073d5000001" else None)
+            session = Session(max_age=10, max_serials=1, capability_cache=capability_cache)
+
+            fake_time.set(1)
+            session.seed("k1", "d073d5000001")
+            session.seed("k2", "d073d5000002")
+            assert session.has_received("k1", "d073d5000001")
+            assert session.seeded == {("d073d5000001", "k1"), ("d073d5000002", "k2")}
+
+            # Receiving from another device forgets the least recently used
+            session.receive(mock.Mock(name="other", serial="d073d5000002", Information=Information("k3")))
+            assert list(session.serials) == ["d073d5000002"]
+            assert session.seeded == {("d073d5000002", "k2")}
+
+            # And pruning forgets devices with nothing left
+            fake_time.set(30)
+            session.prune()
+            assert session.serials == {}
+            assert session.seeded == set()
@@ -0,0 +1,160 @@
+import binascii
+import json
+import zlib
+
+from photons_control.planner.gatherer import Session
+from photons_control.planner.snapshot import GathererSnapshot
+from photons_messages import DeviceMessages, protocol_register
+
+serial = "d073d5000001"
+
+
+def reply(sender_message, pkt):
+    pkt.Information.update(remote_addr=("192.168.0.3", 56700), sender_message=sender_message)
+    return pkt
+
+
+def power(level):
+    return reply(DeviceMessages.GetPower(target=serial), DeviceMessages.StatePower(level=level, target=serial, source=1, sequence=1))
+
+
+def make_snapshot(received, version=GathererSnapshot.version):
+    return GathererSnapshot.magic + bytes([version]) + zlib.compress(json.dumps({"received": received}).encode())
+
+
+class TestGathererSnapshot:
+    def test_it_saves_and_loads_replies(self, tmp_path, FakeTime):
+        path = str(tmp_path / "snapshot")
+        session = Session()
+
+        with FakeTime() as t:
+            t.set(10)
+            session.receive(power(0))
+            t.set(11)
+            session.receive(power(65535))
+            session.fill(DeviceMessages, serial, {"level": 65535})
+
+            GathererSnapshot(path, protocol_register).save(session)
+
+            t.set(30)
+            restored = Session()
+            assert GathererSnapshot(path, protocol_register).restore(restored) == 2
+
+        key = DeviceMessages.GetPower().Key
+        assert list(restored.received) == [serial]
+        pkts = restored.received[serial][key]
+        assert [ts for ts, _ in pkts] == [10, 11]
+        assert [pkt.level for _, pkt in pkts] == [0, 65535]
+        assert all(pkt | DeviceMessages.StatePower for _, pkt in pkts)
+        assert pkts[0][1].Information.remote_addr == ("192.168.0.3", 56700)
+        assert pkts[0][1].serial == serial
+
+        # Plan results are made again from the replies
+        assert restored.filled == {}
+        assert list(restored.serials) == [serial]
+
+    def test_it_only_keeps_what_is_new_enough(self, tmp_path, FakeTime):
+        path = str(tmp_path / "snapshot")
+        session = Session()
+        snapshot = GathererSnapshot(path, protocol_register)
+        snapshot.max_age = 20
+
+        with FakeTime() as t:
+            t.set(10)
+            session.receive(power(0))
+            t.set(25)
+            session.receive(power(1))
+
+            t.set(35)
+            snapshot.save(session)
+
+            restored = Session()
+            assert snapshot.restore(restored) == 1
+            assert [pkt.level for _, pkt in restored.received[serial][DeviceMessages.GetPower().Key]] == [1]
+
+            t.set(46)
+            restored = Session()
+            assert snapshot.restore(restored) == 0
+            assert restored.received == {}
+
+    def test_it_skips_replies_that_cant_be_read(self, tmp_path, FakeTime):
+        path = tmp_path / "snapshot"
+        key = list(DeviceMessages.GetPower().Key)
+        good = binascii.hexlify(power(1).pack().tobytes()).decode()
+
+        path.write_bytes(
+            make_snapshot(
+                {
+                    serial: [
+                        [key, [[10, "nope", None], [10, good, ["192.168.0.3", 56700]], ["nope"]]],
+                        [key],
+                        [key, 3],
+                    ],
+                    "d073d5000002": {"not": "a list"},
+                    "d073d5000003": [[key, [[10, "00", None]]]],
+                }
+            )
+        )
+
+        with FakeTime() as t:
+            t.set(20)
+            restored = Session()
+            assert GathererSnapshot(str(path), protocol_register).restore(restored) == 1
+
+        assert list(restored.received) == [serial]
+        pkts = restored.received[serial][tuple(key)]
+        assert [(ts, pkt.level) for ts, pkt in pkts] == [(10, 1)]
+
+    def test_it_loads_nothing_from_snapshots_of_another_version(self, tmp_path, FakeTime):
+        path = tmp_path / "snapshot"
+        good = binascii.hexlify(power(1).pack().tobytes()).decode()
+        path.write_bytes(make_snapshot({serial: [[list(DeviceMessages.GetPower().Key), [[10, good, None]]]]}, version=1))
+
+        with FakeTime() as t:
+            t.set(20)
+            restored = Session()
+            assert GathererSnapshot(str(path), protocol_register).restore(restored) == 0
+            assert restored.received == {}
+
+    def test_it_respects_the_limits_on_the_session(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        session = Session()
+        for i in range(3):
+            pkt = DeviceMessages.StatePower(level=i, target=f"d073d500000{i}", source=1, sequence=1)
+            session.receive(reply(DeviceMessages.GetPower(target=pkt.serial), pkt))
+
+        GathererSnapshot(path, protocol_register).save(session)
+
+        restored = Session(max_serials=2)
+        GathererSnapshot(path, protocol_register).restore(restored)
+        assert list(restored.received) == ["d073d5000001", "d073d5000002"]
+        assert restored.evictions == 1
+
+    def test_it_leaves_out_replies_that_cant_be_packed(self, tmp_path):
+        path = str(tmp_path / "snapshot")
+        session = Session()
+        session.receive(reply(DeviceMessages.GetPower(target=serial), DeviceMessages.StatePower(level=1, target=serial)))
+        session.receive(reply(DeviceMessages.GetLabel(target=serial), DeviceMessages.StateLabel(label="hi", target=serial, source=1, sequence=1)))
+
+        GathererSnapshot(path, protocol_register).save(session)
+
+        restored = Session()
+        assert GathererSnapshot(path, protocol_register).restore(restored) == 1
+        assert list(restored.received[serial]) == [DeviceMessages.GetLabel().Key]
+
+    def test_it_does_nothing_with_missing_or_invalid_files(self, tmp_path):
+        path = tmp_path / "snapshot"
+        session = Session()
+        assert GathererSnapshot(str(path), protocol_register).restore(session) == 0
+
+        for content in (b"", b"nope", b"PHGS\x02nope", b"PHGS\x02", b"PHGS\x01" + zlib.compress(b"{}"), make_snapshot([])):
+            path.write_bytes(content)
+            assert GathererSnapshot(str(path), protocol_register).restore(session) == 0
+
+        assert session.received == {}
+        assert session.filled == {}
+
+    def test_it_doesnt_complain_if_it_cant_save(self, tmp_path):
+        path = tmp_path / "file"
+        path.write_text("")
+        GathererSnapshot(str(path / "snapshot"), protocol_register).save(Session())
@@ -14,8 +14,11 @@ from photons_protocol.errors import BadConversion
 from photons_protocol.packets import dictobj
 from photons_protocol.packing import (
     BitarraySlice,
+    BitsChunk,
     FieldInfo,
+    PacketCodec,
     PacketPacking,
+    StructField,
     val_to_bitarray,
 )
 from photons_protocol.types import Optional
@@ -648,3 +651,139 @@ class TestPacketPacking:
             f = PacketPacking.unpack(P, val)
             assert f.__getitem__("payload", allow_bitarray=True) == expected
             assert f.one == -128
+
+
+@contextmanager
+def field_by_field():
+    with mock.patch.object(PacketCodec, "for_kls", lambda kls: None):
+        yield
+
+
+class TestPacketCodec:
+    @pytest.fixture()
+    def P(self):
+        class G1(dictobj.PacketSpec):
+            fields = [("protocol", T.Uint16.S(12).default(1024)), ("flag", T.Bool), ("reserved1", T.Reserved(3))]
+
+        class P(dictobj.PacketSpec):
+            fields = [
+                ("one", T.Uint16),
+                ("g1", G1),
+                ("target", T.Bytes(64)),
+                ("amount", T.Float),
+                ("many", T.Uint8.multiple(3)),
+                ("label", T.String(32)),
+            ]
+
+        return P
+
+    class TestCompile:
+        def test_it_makes_one_struct_for_byte_aligned_fields(self, P):
+            codec = PacketCodec.for_kls(P)
+            assert codec.struct.format == "<H2s8sfBBB4s"
+            assert codec.size_bytes == 23
+            assert [type(slot) for slot in codec.slots] == [StructField, BitsChunk, BitsChunk, StructField, StructField, BitsChunk]
+
+            assert P.Meta.codec is codec
+            assert PacketCodec.for_kls(P) is codec
+
+        def test_it_returns_None_if_any_fields_have_a_dynamic_size(self):
+            class P(dictobj.PacketSpec):
+                fields = [("one", T.Uint8), ("two", T.Bytes(lambda pkt: pkt.one * 8))]
+
+            assert PacketCodec.for_kls(P) is None
+
+        def test_it_returns_None_if_the_fields_dont_end_on_a_byte_boundary(self):
+            class P(dictobj.PacketSpec):
+                fields = [("one", T.Uint8), ("two", T.Bool)]
+
+            assert PacketCodec.for_kls(P) is None
+
+        def test_it_returns_None_if_there_is_nothing_struct_can_pack(self):
+            class P(dictobj.PacketSpec):
+                fields = [("one", T.Bytes(16)), ("two", T.Bool), ("three", T.Reserved(7))]
+
+            assert PacketCodec.for_kls(P) is None
+
+        def test_it_returns_None_for_things_that_arent_packets(self):
+            assert PacketCodec.for_kls(mock.Mock(name="pkt_kls", spec=[])) is None
+
+    class TestPackAndUnpack:
+        def test_it_gets_the_same_result_as_packing_field_by_field(self, P):
+            pkt = P(one=300, flag=True, target="d073d5001337", amount=1.5, many=[1, 2, 3], label="hi")
+
+            with field_by_field():
+                expected = pkt.pack()
+            assert len(expected) == 23 * 8
+
+            packd = pkt.pack()
+            assert packd == expected
+
+            with field_by_field():
+                expected_unpacked = P.create(expected.tobytes())
+
+            for value in (packd, packd.tobytes(), memoryview(packd.tobytes())):
+                unpacked = P.create(value)
+                assert sorted(unpacked.actual_items()) == sorted(expected_unpacked.actual_items())
+                assert unpacked.as_dict() == expected_unpacked.as_dict()
+                assert unpacked.protocol == 1024
+                assert unpacked.many == [1, 2, 3]
+                assert unpacked.label == "hi"
+
+        def test_it_gets_the_same_result_for_real_messages(self):
+            from photons_messages import LightMessages, protocol_register
+            from photons_protocol.messages import Messages
+
+            msg = LightMessages.LightState(
+                source=1,
+                sequence=2,
+                target="d073d5001337",
+                hue=100,
+                saturation=0.5,
+                brightness=0.5,
+                kelvin=3500,
+                power=65535,
+                label="kitchen",
+            )
+
+            with field_by_field():
+                expected = msg.pack()
+                expected_unpacked = Messages.create(expected.tobytes(), protocol_register)
+
+            assert msg.pack() == expected
+
+            unpacked = Messages.create(expected.tobytes(), protocol_register)
+            assert type(unpacked) is type(expected_unpacked)
+            assert sorted(unpacked.actual_items()) == sorted(expected_unpacked.actual_items())
+            assert repr(unpacked) == repr(expected_unpacked)
+
+        def test_it_falls_back_to_field_by_field_for_the_same_errors(self, P):
+            pkt = P(one=300, flag=True, target="d073d5001337", amount=1.5, many=[1, 2, 3])
+            with assertRaises(BadConversion, "Cannot pack an unspecified value", field="label"):
+                pkt.pack()
+
+            pkt = P(one=70000, flag=True, target="d073d5001337", amount=1.5, many=[1, 2, 3], label="")
+            with assertRaises(BadConversion, "Failed trying to convert a value", name="one"):
+                pkt.pack()
+
+        def test_it_unpacks_field_by_field_if_there_isnt_enough_data(self, P):
+            pkt = P(one=300, flag=True, target="d073d5001337", amount=1.5, many=[1, 2, 3], label="hi")
+            packd = pkt.pack()
+
+            unpacked = P.create(packd.tobytes()[:-4])
+            assert unpacked.one == 300
+            assert unpacked.label == ""
+
+        def test_it_assigns_the_remainder_to_an_empty_payload(self):
+            class P(dictobj.PacketSpec):
+                parent_packet = True
+                fields = [("one", T.Uint16), ("payload", "Payload")]
+
+                class Payload(dictobj.PacketSpec):
+                    message_type = 0
+                    fields = []
+
+            unpacked = P.create(b"\x01\x00\x02\x03")
+            assert unpacked.one == 1
+            assert unpacked.payload == b"\x02\x03"
+            assert unpacked.__getitem__("payload", allow_bitarray=True) == ba(b"\x02\x03")
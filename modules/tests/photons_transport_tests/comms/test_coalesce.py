@@ -0,0 +1,198 @@
+import asyncio
+from unittest import mock
+
+from delfick_project.errors_pytest import assertRaises
+from photons_app import helpers as hp
+from photons_app.errors import TimedOut
+from photons_messages import DeviceMessages, TileMessages
+from photons_transport.comms.coalesce import Coalescer, CoalesceOptions
+
+
+def make(original, serial="d073d5000001"):
+    packet = original.simplify().clone()
+    packet.update(dict(target=serial, source=1, sequence=1))
+    return original, packet
+
+
+class TestCoalescer:
+    class TestKeyFor:
+        async def test_it_only_shares_get_messages_that_arent_broadcast(self):
+            coalescer = Coalescer()
+
+            original, packet = make(DeviceMessages.GetPower())
+            assert coalescer.key_for(original, packet, timeout=10) == ("d073d5000001", 20, True, True, b"", 10, False, 10)
+            assert coalescer.key_for(original, packet, timeout=10, broadcast=True) is None
+
+            original, packet = make(DeviceMessages.SetPower(level=0))
+            assert coalescer.key_for(original, packet, timeout=10) is None
+
+            original, packet = make(DeviceMessages.EchoRequest(echoing=b"hi"))
+            assert coalescer.key_for(original, packet, timeout=10) is None
+
+        async def test_it_includes_the_payload_and_flags(self):
+            coalescer = Coalescer()
+
+            original, packet = make(TileMessages.Get64(tile_index=0, length=1, x=0, y=0, width=8))
+            key1 = coalescer.key_for(original, packet, timeout=10)
+
+            original, packet = make(TileMessages.Get64(tile_index=1, length=1, x=0, y=0, width=8))
+            key2 = coalescer.key_for(original, packet, timeout=10)
+
+            original, packet = make(TileMessages.Get64(tile_index=1, length=1, x=0, y=0, width=8, ack_required=False))
+            key3 = coalescer.key_for(original, packet, timeout=10)
+
+            original, packet = make(TileMessages.Get64(tile_index=1, length=1, x=0, y=0, width=8), serial="d073d5000002")
+            key4 = coalescer.key_for(original, packet, timeout=10)
+
+            assert len(set([key1, key2, key3, key4])) == 4
+
+        async def test_it_includes_how_the_message_is_sent(self):
+            coalescer = Coalescer()
+
+            original, packet = make(DeviceMessages.GetPower())
+            keys = [
+                coalescer.key_for(original, packet, timeout=10),
+                coalescer.key_for(original, packet, timeout=2),
+                coalescer.key_for(original, packet, timeout=10, no_retry=True),
+                coalescer.key_for(original, packet, timeout=10, connect_timeout=1),
+            ]
+
+            assert len(set(keys)) == 4
+            assert coalescer.key_for(original, packet, timeout=10) == keys[0]
+
+        async def test_it_doesnt_share_dynamic_messages(self):
+            coalescer = Coalescer()
+            original = DeviceMessages.GetPower()
+            packet = mock.Mock(name="packet", payload=mock.Mock(name="payload"), is_dynamic=True)
+            assert coalescer.key_for(original, packet, timeout=10) is None
+
+    class TestSend:
+        async def test_it_shares_one_send_between_callers(self):
+            coalescer = Coalescer()
+            replies = [mock.Mock(name="reply")]
+            called = []
+            fut = hp.create_future()
+
+            async def send():
+                called.append("send")
+                await fut
+                return replies
+
+            t1 = hp.async_as_background(coalescer.send("key", 1, send))
+            t2 = hp.async_as_background(coalescer.send("key", 1, send))
+            await asyncio.sleep(0)
+            assert list(coalescer.inflight) == ["key"]
+
+            fut.set_result(True)
+            assert await t1 == replies
+            assert await t2 == replies
+            assert (await t1) is not replies
+
+            assert called == ["send"]
+            assert coalescer.coalesced == 1
+            await asyncio.sleep(0)
+            assert coalescer.inflight == {}
+            assert coalescer.recent == {}
+
+            assert await coalescer.send("key", 1, send) == replies
+            assert called == ["send", "send"]
+
+        async def test_it_gives_errors_to_every_caller(self):
+            coalescer = Coalescer()
+            fut = hp.create_future()
+
+            async def send():
+                await fut
+                raise ValueError("NOPE")
+
+            t1 = hp.async_as_background(coalescer.send("key", 1, send))
+            t2 = hp.async_as_background(coalescer.send("key", 1, send))
+            await asyncio.sleep(0)
+            fut.set_result(True)
+
+            for t in (t1, t2):
+                with assertRaises(ValueError, "NOPE"):
+                    await t
+
+        async def test_it_keeps_sending_for_other_callers_if_one_goes_away(self):
+            coalescer = Coalescer()
+            fut = hp.create_future()
+
+            async def send():
+                await fut
+                return [1]
+
+            t1 = hp.async_as_background(coalescer.send("key", 1, send))
+            t2 = hp.async_as_background(coalescer.send("key", 1, send))
+            await asyncio.sleep(0)
+
+            t1.cancel()
+            await asyncio.sleep(0)
+            assert not coalescer.inflight["key"].task.done()
+
+            fut.set_result(True)
+            assert await t2 == [1]
+
+        async def test_it_stops_sending_if_all_callers_go_away(self):
+            coalescer = Coalescer()
+
+            async def send():
+                await hp.create_future()
+
+            t1 = hp.async_as_background(coalescer.send("key", 1, send))
+            await asyncio.sleep(0)
+            task = coalescer.inflight["key"].task
+
+            t1.cancel()
+            await hp.wait_for_all_futures(task)
+            await asyncio.sleep(0)
+            assert task.cancelled()
+            assert coalescer.inflight == {}
+
+        async def test_it_times_out_each_caller_with_their_own_timeout(self):
+            coalescer = Coalescer()
+            fut = hp.create_future()
+
+            async def send():
+                await fut
+                return [1]
+
+            t1 = hp.async_as_background(coalescer.send(("d073d5000001", 20), 1, send))
+            with assertRaises(TimedOut, "Waiting for reply to a packet", serial="d073d5000001", sent_pkt_type=20):
+                await coalescer.send(("d073d5000001", 20), 0.01, send)
+
+            fut.set_result(True)
+            assert await t1 == [1]
+
+        async def test_it_can_give_recent_replies(self, FakeTime):
+            coalescer = Coalescer(fresh_for=0.5)
+            called = []
+
+            async def send():
+                called.append("send")
+                return [len(called)]
+
+            with FakeTime() as t:
+                assert await coalescer.send("key", 1, send) == [1]
+                await asyncio.sleep(0)
+
+                t.add(0.4)
+                assert await coalescer.send("key", 1, send) == [1]
+                assert coalescer.fresh == 1
+
+                t.add(0.2)
+                assert await coalescer.send("key", 1, send) == [2]
+                assert called == ["send", "send"]
+
+
+class TestCoalesceOptions:
+    async def test_it_is_disabled_by_default(self):
+        options = CoalesceOptions.FieldSpec().empty_normalise()
+        assert not options.enabled
+        assert options.fresh_for == 0
+
+    async def test_it_makes_a_coalescer(self):
+        options = CoalesceOptions.FieldSpec().empty_normalise(enabled=True, fresh_for=0.2)
+        coalescer = options.make_coalescer()
+        assert isinstance(coalescer, Coalescer)
+        assert coalescer.fresh_for == 0.2
@@ -8,9 +8,10 @@ from delfick_project.norms import Meta, dictobj, sb
 from photons_app import helpers as hp
 from photons_app.errors import FoundNoDevices
 from photons_app.formatter import MergedOptionStringFormatter
-from photons_messages import CoreMessages, DeviceMessages, LIFXPacket, protocol_register
+from photons_messages import CoreMessages, DeviceMessages, DiscoveryMessages, LIFXPacket, Services, protocol_register
 from photons_transport.comms.base import Communication, FakeAck, Found
 from photons_transport.comms.receiver import Receiver
+from photons_transport.comms.view import PacketView
 from photons_transport.errors import FailedToFindDevice
 
 
@@ -162,6 +163,17 @@ class TestCommunication:
 
             assert called == ["d073d5000001", "d073d5000002"]
 
+        async def test_it_saves_the_gatherer_session_to_the_snapshot(self, V):
+            snapshot = mock.Mock(name="snapshot", spec=["save", "restore"])
+            V.communication.gatherer_snapshot = snapshot
+
+            await V.communication.finish()
+            snapshot.save.assert_not_called()
+
+            session = V.communication.gatherer.session
+            await V.communication.finish()
+            snapshot.save.assert_called_once_with(session)
+
     class TestSource:
         async def test_it_generates_a_source(self, V):
             source = V.communication.source
@@ -487,7 +499,7 @@ class TestCommunication:
             with mock.patch.object(V.communication, "_do_search", _do_search):
                 assert await V.communication._find_specific_serials(serials, timeout=timeout, a=a) is found
 
-            _do_search.assert_called_once_with(serials, timeout, a=a)
+            _do_search.assert_called_once_with(serials, timeout, ignore_lost=False, a=a)
 
         async def test_it_can_remove_lost(self, V):
             s1 = mock.Mock(name="s1", spec=[])
@@ -514,7 +526,7 @@ class TestCommunication:
             with mock.patch.object(V.communication, "_do_search", _do_search):
                 assert await V.communication._find_specific_serials(serials, timeout=timeout, a=a) is found
 
-            _do_search.assert_called_once_with(serials, timeout, a=a)
+            _do_search.assert_called_once_with(serials, timeout, ignore_lost=False, a=a)
 
             assert "d073d5000003" not in found
             s3.close.assert_called_once_with()
@@ -543,7 +555,7 @@ class TestCommunication:
             with mock.patch.object(V.communication, "_do_search", _do_search):
                 assert (await V.communication._find_specific_serials(serials, timeout=timeout, ignore_lost=True, a=a)) is found
 
-            _do_search.assert_called_once_with(serials, timeout, a=a)
+            _do_search.assert_called_once_with(serials, timeout, ignore_lost=True, a=a)
 
             assert "d073d5000003" in found
 
@@ -566,7 +578,7 @@ class TestCommunication:
                 with mock.patch.object(V.communication, "_do_search", _do_search):
                     await V.communication._find_specific_serials(None, timeout=timeout, raise_on_none=True, a=a)
 
-            _do_search.assert_called_once_with(None, timeout, a=a)
+            _do_search.assert_called_once_with(None, timeout, ignore_lost=False, a=a)
 
             assert not found
             s3.close.assert_called_once_with()
@@ -588,7 +600,7 @@ class TestCommunication:
             with mock.patch.object(V.communication, "_do_search", _do_search):
                 assert (await V.communication._find_specific_serials(serials, raise_on_none=True, timeout=timeout, a=a)) is found
 
-            _do_search.assert_called_once_with(serials, timeout, a=a)
+            _do_search.assert_called_once_with(serials, timeout, ignore_lost=False, a=a)
 
         async def test_it_does_not_complain_if_none_are_found_if_not_raise_on_none(self, V):
             s3 = mock.Mock(name="s3", spec=[])
@@ -606,7 +618,7 @@ class TestCommunication:
             with mock.patch.object(V.communication, "_do_search", _do_search):
                 assert (await V.communication._find_specific_serials(None, ignore_lost=True, timeout=timeout, a=a)) is found
 
-            _do_search.assert_called_once_with(None, timeout, a=a)
+            _do_search.assert_called_once_with(None, timeout, ignore_lost=True, a=a)
 
             assert "d073d5000003" in found
 
@@ -748,8 +760,9 @@ class TestCommunication:
             addr = mock.Mock(name="addr")
 
             def recv(pkt, addr, *, allow_zero):
-                assert isinstance(pkt, LIFXPacket)
+                assert isinstance(pkt, PacketView)
                 assert pkt.pkt_type == 9001
+                assert isinstance(pkt.materialise(), LIFXPacket)
                 assert pkt.payload == b"things"
 
             recv = pytest.helpers.AsyncMock(name="recv", side_effect=recv)
@@ -761,6 +774,83 @@ class TestCommunication:
 
             recv.assert_called_once_with(mock.ANY, addr, allow_zero=allow_zero)
 
+        async def test_it_gives_the_receiver_a_view_that_hasnt_been_unpacked(self, V):
+            addr = mock.Mock(name="addr")
+            got = []
+
+            async def recv(pkt, addr, *, allow_zero):
+                got.append(pkt)
+
+            target = binascii.unhexlify("d073d5000001")
+
+            with mock.patch.object(V.communication.receiver, "recv", recv):
+                pkt = DeviceMessages.StatePower(level=100, source=2, sequence=3, target=target)
+                data = pkt.pack().tobytes()
+                await V.communication.received_data(data, addr)
+
+            assert len(got) == 1
+            view = got[0]
+            assert isinstance(view, PacketView)
+            assert not view.materialised
+
+            assert view.source == 2
+            assert view.sequence == 3
+            assert view.target == target + b"\x00\x00"
+            assert view.serial == "d073d5000001"
+            assert view.pkt_type == DeviceMessages.StatePower.Payload.message_type
+            assert view | DeviceMessages.StatePower
+            assert not view | DeviceMessages.GetPower
+            assert not view.materialised
+
+            assert view.level == 100
+            assert view.materialised
+            assert type(view.materialise()) is DeviceMessages.StatePower
+
+        async def test_it_gives_StateService_to_add_passive_service_if_passive_discovery(self, V):
+            addr = ("192.168.0.3", 56700)
+            recv = pytest.helpers.AsyncMock(name="recv")
+            add_passive_service = pytest.helpers.AsyncMock(name="add_passive_service")
+
+            service = DiscoveryMessages.StateService(service=Services.UDP, port=56, source=1, sequence=1, target="d073d5000001")
+            power = DeviceMessages.StatePower(level=0, source=1, sequence=2, target="d073d5000001")
+
+            with (
+                mock.patch.object(V.communication.receiver, "recv", recv),
+                mock.patch.object(V.communication, "add_passive_service", add_passive_service),
+            ):
+                await V.communication.received_data(service.pack().tobytes(), addr)
+                add_passive_service.assert_not_called()
+
+                V.communication.passive_discovery = True
+                await V.communication.received_data(service.pack().tobytes(), addr)
+                await V.communication.received_data(power.pack().tobytes(), addr)
+
+            add_passive_service.assert_called_once_with(mock.ANY, addr)
+            pkt = add_passive_service.mock_calls[0][1][0]
+            assert pkt | DiscoveryMessages.StateService
+            assert pkt.port == 56
+            assert len(recv.mock_calls) == 3
+
+        async def test_it_gives_packets_to_the_capability_cache(self, V):
+            addr = ("192.168.0.3", 56700)
+            recv = pytest.helpers.AsyncMock(name="recv")
+            capability_cache = mock.Mock(name="capability_cache", spec=["saw", "finish"])
+
+            version = DeviceMessages.StateVersion(vendor=1, product=55, source=1, sequence=1, target="d073d5000001")
+
+            with mock.patch.object(V.communication.receiver, "recv", recv):
+                await V.communication.received_data(version.pack().tobytes(), addr)
+
+                V.communication.capability_cache = capability_cache
+                await V.communication.received_data(version.pack().tobytes(), addr)
+
+            capability_cache.saw.assert_called_once_with(mock.ANY)
+            assert capability_cache.saw.mock_calls[0][1][0].product == 55
+            assert len(recv.mock_calls) == 2
+
+            await V.communication.finish()
+            capability_cache.finish.assert_called_once_with()
+
         async def test_it_ignores_invalid_data(self, V):
             allow_zero = mock.Mock(name="allow_zero")
             addr = mock.Mock(name="addr")
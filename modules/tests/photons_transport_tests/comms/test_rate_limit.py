@@ -0,0 +1,130 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from delfick_project.errors_pytest import assertRaises
+from delfick_project.norms import BadSpecValue, Meta
+from photons_messages import DeviceMessages, LightMessages
+from photons_products import Products
+from photons_transport.comms.rate_limit import RateLimiter, RateLimitOptions, TokenBucket, product_name_spec
+
+
+class TestTokenBucket:
+    async def test_it_starts_full(self, FakeTime):
+        with FakeTime() as t:
+            t.set(10)
+            bucket = TokenBucket(20, 3)
+            assert bucket.tokens == 3
+            assert bucket.updated == 10
+
+    async def test_it_gives_out_tokens_in_order_and_refills_at_rate(self, FakeTime):
+        with FakeTime() as t:
+            bucket = TokenBucket(10, 2)
+
+            assert bucket.reserve() == 0
+            assert bucket.reserve() == 0
+            assert bucket.reserve() == pytest.approx(0.1)
+            assert bucket.reserve() == pytest.approx(0.2)
+
+            t.add(0.2)
+            assert bucket.tokens == pytest.approx(-2)
+            assert bucket.reserve() == pytest.approx(0.1)
+
+            t.add(10)
+            assert bucket.reserve() == 0
+            assert bucket.tokens == pytest.approx(1)
+
+    async def test_it_can_refund_and_change(self, FakeTime):
+        with FakeTime():
+            bucket = TokenBucket(10, 5)
+            bucket.reserve()
+            bucket.refund()
+            bucket.refund()
+            assert bucket.tokens == 5
+
+            bucket.change(1, 2)
+            assert (bucket.rate, bucket.burst, bucket.tokens) == (1, 2, 2)
+
+
+class TestRateLimiter:
+    async def test_it_doesnt_wait_if_there_is_no_rate(self):
+        limiter = RateLimiter(0, 5)
+        for _ in range(20):
+            await limiter.acquire("d073d5000001")
+        assert limiter.delayed == 0
+
+    async def test_it_waits_per_device(self, FakeTime):
+        limiter = RateLimiter(10, 1)
+
+        with FakeTime(), mock.patch("asyncio.sleep", pytest.helpers.AsyncMock(name="sleep")) as sleep:
+            await limiter.acquire("d073d5000001")
+            await limiter.acquire("d073d5000002")
+            assert len(sleep.mock_calls) == 0
+
+            await limiter.acquire("d073d5000001")
+            sleep.assert_called_once_with(pytest.approx(0.1))
+
+        assert limiter.delayed == 1
+        assert limiter.delayed_for == pytest.approx(0.1)
+        assert set(limiter.buckets) == {"d073d5000001", "d073d5000002"}
+
+    async def test_it_gives_back_the_token_if_cancelled(self, FakeTime):
+        limiter = RateLimiter(10, 1)
+
+        with FakeTime(), mock.patch("asyncio.sleep", pytest.helpers.AsyncMock(name="sleep", side_effect=asyncio.CancelledError())):
+            await limiter.acquire("d073d5000001")
+            assert limiter.buckets["d073d5000001"].tokens == 0
+
+            with assertRaises(asyncio.CancelledError):
+                await limiter.acquire("d073d5000001")
+            assert limiter.buckets["d073d5000001"].tokens == 0
+
+    async def test_it_uses_limits_for_the_product_once_it_sees_a_StateVersion(self):
+        tile = Products.LCM3_TILE
+        limiter = RateLimiter(20, 5, {"LCM3_TILE": RateLimitOptions.FieldSpec().empty_normalise(rate=2, burst=1)})
+
+        await limiter.acquire("d073d5000001")
+        assert limiter.limits_for("d073d5000001") == (20, 5)
+
+        limiter.saw(LightMessages.LightState(target="d073d5000001"))
+        assert limiter.product_names == {}
+
+        limiter.saw(DeviceMessages.StateVersion(target="d073d5000001", vendor=tile.vendor.vid, product=tile.pid))
+        assert limiter.product_names == {"d073d5000001": "LCM3_TILE"}
+        assert limiter.limits_for("d073d5000001") == (2, 1)
+
+        bucket = limiter.buckets["d073d5000001"]
+        assert (bucket.rate, bucket.burst, bucket.tokens) == (2, 1, 1)
+
+        limiter.saw(DeviceMessages.StateVersion(target="d073d5000002", vendor=tile.vendor.vid, product=tile.pid))
+        assert limiter.limits_for("d073d5000002") == (2, 1)
+        assert "d073d5000002" not in limiter.buckets
+
+
+class TestRateLimitOptions:
+    async def test_it_has_defaults(self):
+        options = RateLimitOptions.FieldSpec().empty_normalise()
+        assert options.rate == 0
+        assert options.burst == 5
+        assert options.products == {}
+        assert not options.enabled
+
+    async def test_it_is_enabled_if_there_is_any_rate(self):
+        options = RateLimitOptions.FieldSpec().empty_normalise(rate=20)
+        assert options.enabled
+
+        options = RateLimitOptions.FieldSpec().empty_normalise(products={"LCM3_TILE": {"rate": 2}})
+        assert options.enabled
+        assert options.products["LCM3_TILE"].burst == 5
+
+        limiter = options.make_limiter()
+        assert isinstance(limiter, RateLimiter)
+        assert limiter.rate == 0
+        assert limiter.products is options.products
+
+    async def test_it_complains_about_unknown_products(self):
+        with assertRaises(BadSpecValue, "Unknown product", got="NOPE"):
+            product_name_spec().normalise(Meta.empty(), "NOPE")
+
+        with assertRaises(BadSpecValue):
+            RateLimitOptions.FieldSpec().normalise(Meta.empty(), {"products": {"NOPE": {"rate": 2}}})
@@ -1,20 +1,23 @@
-import asyncio
 import binascii
 import random
 from unittest import mock
 
 import pytest
 from photons_app import helpers as hp
-from photons_messages import LIFXPacket
+from photons_messages import DeviceMessages, LIFXPacket
 from photons_transport.comms.receiver import Receiver
+from photons_transport.comms.routing import RoutingTable
+from photons_transport.comms.view import PacketView
 
 
 class TestReceiver:
     async def test_it_inits_some_variables(self):
         receiver = Receiver()
         assert receiver.loop is hp.get_event_loop()
-        assert receiver.results == {}
         assert receiver.blank_target == b"\x00\x00\x00\x00\x00\x00\x00\x00"
+        assert isinstance(receiver.routes, RoutingTable)
+        assert receiver.routes.blank_target == receiver.blank_target
+        assert len(receiver.routes) == 0
 
     class TestUsage:
         @pytest.fixture()
@@ -49,17 +52,21 @@ class TestReceiver:
             return V()
 
         class TestRegister:
-            async def test_it_puts_the_result_under_a_key_of_source_sequence_target(self, V):
-                assert V.receiver.results == {}
+            async def test_it_puts_the_result_in_a_route_for_source_sequence_target(self, V):
+                assert len(V.receiver.routes) == 0
                 key = V.register(V.source, V.sequence, V.target)
                 assert key == (V.source, V.sequence, V.target)
-                assert V.receiver.results == {key: (V.original, V.result)}
+                assert len(V.receiver.routes) == 1
+
+                route = V.receiver.routes.find(*key)
+                assert route.original is V.original
+                assert route.result is V.result
+                assert route.active
 
                 r = mock.Mock(name="r")
                 V.result.set_result([r])
                 assert await V.result == [r]
-                await asyncio.sleep(0)
-                assert V.receiver.results == {}
+                assert not route.active
 
         class TestRecv:
             async def test_it_finds_result_based_on_source_sequence_target(self, V):
@@ -69,6 +76,7 @@ class TestReceiver:
 
                 assert V.packet.Information.remote_addr is V.addr
                 assert V.packet.Information.sender_message is V.original
+                assert V.receiver.routes.matched == 1
 
             async def test_it_finds_result_based_on_broadcast_key_if_that_was_used(self, V):
                 V.register(V.source, V.sequence, V.receiver.blank_target)
@@ -85,6 +93,19 @@ class TestReceiver:
 
                 assert V.packet.Information.remote_addr is None
                 assert V.packet.Information.sender_message is None
+                assert V.receiver.routes.unmatched == 1
+
+            async def test_it_does_not_give_replies_to_results_that_are_done(self, V):
+                V.register(V.source, V.sequence, V.target)
+                V.result.set_result([])
+
+                message_catcher = pytest.helpers.AsyncMock(name="message_catcher")
+                V.receiver.message_catcher = message_catcher
+                await V.receiver.recv(V.packet, V.addr)
+
+                assert len(V.result.add_packet.mock_calls) == 0
+                message_catcher.assert_called_once_with(V.packet)
+                assert V.receiver.routes.duplicate == 1
 
             async def test_it_uses_message_catcher_if_cant_find_the_key_and_thats_defined(self, V):
                 message_catcher = pytest.helpers.AsyncMock(name="message_catcher")
@@ -117,3 +138,43 @@ class TestReceiver:
 
                 assert V.packet.Information.remote_addr is V.addr
                 assert V.packet.Information.sender_message is V.original
+
+            async def test_it_only_unpacks_views_that_are_wanted(self, V):
+                target = V.target
+                data = DeviceMessages.StatePower(level=0, source=V.source, sequence=V.sequence, target=target).pack().tobytes()
+
+                view = PacketView(data, DeviceMessages.StatePower)
+                V.register(1, 2, binascii.unhexlify("d073d5000001"))
+                await V.receiver.recv(view, V.addr)
+                assert len(V.result.add_packet.mock_calls) == 0
+                assert not view.materialised
+
+                V.register(V.source, V.sequence, V.target)
+                await V.receiver.recv(view, V.addr)
+                assert view.materialised
+
+                pkt = view.materialise()
+                V.result.add_packet.assert_called_once_with(pkt)
+                assert type(pkt) is DeviceMessages.StatePower
+                assert pkt.Information.remote_addr is V.addr
+                assert pkt.Information.sender_message is V.original
+
+            async def test_it_gives_the_message_catcher_an_unpacked_packet(self, V):
+                data = DeviceMessages.StatePower(level=0, source=V.source, sequence=V.sequence, target=V.target).pack().tobytes()
+                view = PacketView(data, DeviceMessages.StatePower)
+
+                message_catcher = pytest.helpers.AsyncMock(name="message_catcher")
+                V.receiver.message_catcher = message_catcher
+                await V.receiver.recv(view, V.addr)
+                message_catcher.assert_called_once_with(view.materialise())
+
+            async def test_it_drops_views_that_cant_be_unpacked(self, V):
+                data = DeviceMessages.StatePower(level=0, source=V.source, sequence=V.sequence, target=V.target).pack().tobytes()
+                PacketKls = mock.Mock(name="PacketKls", spec=["create"])
+                PacketKls.create.side_effect = ValueError("NOPE")
+                view = PacketView(data, PacketKls)
+
+                V.register(V.source, V.sequence, V.target)
+                await V.receiver.recv(view, V.addr)
+                assert len(V.result.add_packet.mock_calls) == 0
+                PacketKls.create.assert_called_once_with(view.data)
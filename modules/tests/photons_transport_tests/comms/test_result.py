@@ -56,6 +56,7 @@ class TestResult:
         assert result.did_broadcast is did_broadcast
 
         assert result.results == []
+        assert result.first_received is None
         assert result.last_ack_received is None
         assert result.last_res_received is None
 
@@ -109,6 +110,22 @@ class TestResult:
             add_result.assert_called_once_with(V.pkt)
             assert len(add_ack.mock_calls) == 0
 
+        async def test_it_records_when_the_first_packet_was_received(self, V, FakeTime):
+            add_ack = mock.Mock(name="add_ack")
+            add_result = mock.Mock(name="add_result")
+
+            with FakeTime() as t:
+                with mock.patch.multiple(V.result, add_ack=add_ack, add_result=add_result):
+                    t.set(1)
+                    V.pkt.represents_ack = True
+                    V.result.add_packet(V.pkt)
+                    assert V.result.first_received == 1
+
+                    t.set(2)
+                    V.pkt.represents_ack = False
+                    V.result.add_packet(V.pkt)
+                    assert V.result.first_received == 1
+
         async def test_it_adds_as_a_result_if_no_represents_ack_property_on_the_pkt(self, V):
             pkt = mock.NonCallableMock(name="pkt", spec=[])
 
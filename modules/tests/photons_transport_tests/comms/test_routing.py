@@ -0,0 +1,149 @@
+import binascii
+from unittest import mock
+
+import pytest
+from photons_app import helpers as hp
+from photons_transport.comms.routing import Route, RoutingTable
+
+blank = b"\x00" * 8
+target1 = binascii.unhexlify("d073d5000001") + b"\x00\x00"
+target2 = binascii.unhexlify("d073d5000002") + b"\x00\x00"
+
+
+@pytest.fixture()
+def routes(FakeTime):
+    with FakeTime() as t:
+        routes = RoutingTable(blank, resolution=1, size=4)
+        routes.t = t
+        yield routes
+
+
+class TestRoutingTable:
+    async def test_it_starts_empty(self, routes):
+        assert len(routes) == 0
+        assert routes.slots == {}
+        assert routes.wheel == [[], [], [], []]
+        assert routes.next_turn == 1
+        for counter in ("late", "matched", "expired", "duplicate", "unmatched", "collisions"):
+            assert getattr(routes, counter) == 0
+
+    async def test_it_stores_routes_in_a_slot_per_sequence(self, routes):
+        original = mock.Mock(name="original")
+        result = hp.create_future()
+
+        route = routes.add(2, 3, target1, original, result)
+        assert isinstance(route, Route)
+        assert route.original is original
+        assert route.result is result
+        assert len(routes) == 1
+
+        assert len(routes.slots[(2, target1)]) == 256
+        assert routes.slots[(2, target1)][3] is route
+
+        assert routes.find(2, 3, target1) is route
+        assert routes.find(2, 4, target1) is None
+        assert routes.find(3, 3, target1) is None
+        assert routes.find(2, 3, target2) is None
+
+    async def test_it_finds_routes_for_the_broadcast_target(self, routes):
+        original = mock.Mock(name="original")
+        broadcast = routes.add(2, 3, blank, original, hp.create_future())
+        assert routes.find(2, 3, target1) is broadcast
+        assert routes.find(2, 3, target2) is broadcast
+
+        direct = routes.add(2, 3, target1, original, hp.create_future())
+        assert routes.find(2, 3, target1) is direct
+        assert routes.find(2, 3, target2) is broadcast
+
+        direct.result.cancel()
+        assert routes.find(2, 3, target1) is broadcast
+
+        broadcast.result.cancel()
+        assert routes.find(2, 3, target1) is direct
+
+    async def test_it_counts_collisions(self, routes):
+        original = mock.Mock(name="original")
+        first = routes.add(2, 3, target1, original, hp.create_future())
+        second = routes.add(2, 3, target1, original, hp.create_future())
+        assert routes.collisions == 1
+        assert len(routes) == 1
+        assert routes.find(2, 3, target1) is second
+
+        second.result.set_result([])
+        routes.add(2, 3, target1, original, hp.create_future())
+        assert routes.collisions == 1
+        assert len(routes) == 1
+        assert not first.result.done()
+
+    async def test_it_counts_replies(self, routes):
+        original = mock.Mock(name="original")
+
+        routes.record(None)
+        assert routes.unmatched == 1
+
+        route = routes.add(2, 3, target1, original, hp.create_future())
+        routes.record(route)
+        assert routes.matched == 1
+
+        route.result.set_result([])
+        routes.record(route)
+        assert routes.duplicate == 1
+
+        route = routes.add(2, 4, target1, original, hp.create_future())
+        route.result.cancel()
+        routes.record(route)
+        assert routes.late == 1
+
+        route = routes.add(2, 5, target1, original, hp.create_future())
+        route.result.set_exception(ValueError("NOPE"))
+        routes.record(route)
+        assert routes.late == 2
+
+    async def test_it_expires_routes_that_are_done_when_they_come_around_on_the_wheel(self, routes):
+        original = mock.Mock(name="original")
+        done = routes.add(2, 3, target1, original, hp.create_future())
+        pending = routes.add(2, 4, target1, original, hp.create_future())
+        other = routes.add(2, 3, target2, original, hp.create_future())
+        assert routes.wheel[-1] == [done, pending, other]
+
+        done.result.set_result([])
+        other.result.cancel()
+
+        routes.t.add(3.5)
+        routes.turn()
+        assert len(routes) == 3
+        assert routes.expired == 0
+
+        routes.t.add(1)
+        routes.turn()
+        assert routes.next_turn == 5.5
+        assert routes.expired == 2
+        assert len(routes) == 1
+        assert routes.find(2, 3, target1) is None
+        assert routes.find(2, 4, target1) is pending
+        assert (2, target2) not in routes.slots
+
+        assert routes.wheel[routes.position - 1] == [pending]
+
+    async def test_it_only_turns_the_wheel_once_around_after_a_long_pause(self, routes):
+        original = mock.Mock(name="original")
+        route = routes.add(2, 3, target1, original, hp.create_future())
+        route.result.set_result([])
+
+        routes.t.add(1000)
+        routes.turn()
+        assert routes.next_turn == 1001
+        assert routes.expired == 1
+        assert routes.slots == {}
+        assert routes.wheel == [[], [], [], []]
+
+    async def test_it_ignores_routes_on_the_wheel_that_were_replaced(self, routes):
+        original = mock.Mock(name="original")
+        first = routes.add(2, 3, target1, original, hp.create_future())
+        first.result.set_result([])
+        second = routes.add(2, 3, target1, original, hp.create_future())
+
+        routes.t.add(4)
+        routes.turn()
+        assert routes.expired == 0
+        assert routes.find(2, 3, target1) is second
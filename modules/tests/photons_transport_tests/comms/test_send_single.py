@@ -1,4 +1,6 @@
+import asyncio
 import time
+from unittest import mock
 
 import pytest
 from delfick_project.errors_pytest import assertRaises
@@ -13,6 +15,7 @@ from photons_messages import (
     Services,
 )
 from photons_products import Products
+from photons_transport.comms.coalesce import Coalescer
 
 devices = pytest.helpers.mimic()
 devices.add("strip")("d073d5001337", Products.LCM2_Z, hp.Firmware(2, 80), value_store={"zones_count": 22})
@@ -82,6 +85,56 @@ class TestSendingASingleMessages:
                 devices.Events.OUTGOING(device, device.io["MEMORY"], pkt=expected, replying_to=original),
             ]
 
+        async def test_it_waits_for_the_rate_limiter_before_writing(self, sender, send_single):
+            limiter = mock.Mock(name="rate_limiter", spec=["acquire", "saw"])
+            limiter.acquire = pytest.helpers.AsyncMock(name="acquire")
+            sender.rate_limiter = limiter
+
+            try:
+                original = DeviceMessages.EchoRequest(echoing=b"hi")
+                result = await send_single(original, timeout=1)
+            finally:
+                sender.rate_limiter = None
+
+            pytest.helpers.assertSamePackets(result, (DeviceMessages.EchoResponse, {"echoing": b"hi"}))
+            limiter.acquire.assert_called_once_with("d073d5001337")
+            assert len(limiter.saw.mock_calls) == 2
+
+        async def test_it_can_share_identical_get_messages(self, sender, send_single, device):
+            sender.coalescer = Coalescer()
+
+            try:
+                original = DeviceMessages.GetPower()
+                results = await asyncio.gather(send_single(original, timeout=1), send_single(original, timeout=1))
+            finally:
+                sender.coalescer = None
+
+            for result in results:
+                pytest.helpers.assertSamePackets(result, (DeviceMessages.StatePower, {"level": 0}))
+
+            assert [e for e in devices.store(device) if e | devices.Events.INCOMING] == [
+                devices.Events.INCOMING(device, device.io["MEMORY"], pkt=original),
+            ]
+
+        async def test_it_doesnt_share_get_messages_sent_differently(self, sender, send_single, device):
+            coalescer = sender.coalescer = Coalescer()
+
+            try:
+                original = DeviceMessages.GetPower()
+                results = await asyncio.gather(
+                    send_single(original, timeout=1),
+                    send_single(original, timeout=2),
+                    send_single(original, timeout=1, no_retry=True),
+                )
+            finally:
+                sender.coalescer = None
+
+            for result in results:
+                pytest.helpers.assertSamePackets(result, (DeviceMessages.StatePower, {"level": 0}))
+
+            assert coalescer.coalesced == 0
+            assert len([e for e in devices.store(device) if e | devices.Events.INCOMING]) >= 3
+
         async def test_it_can_get_multiple_replies(self, send_single, device):
             await device.event(devices.Events.SET_ZONES, zones=[(i, hp.Color(i, 1, 1, 3500)) for i in range(22)])
             devices.store(device).clear()
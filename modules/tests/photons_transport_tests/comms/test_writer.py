@@ -60,16 +60,19 @@ class TestWriter:
         register = mock.Mock(name="register", side_effect=caller("register", result))
         write = pytest.helpers.AsyncMock(name="write", side_effect=caller("write", b"asdf"))
 
-        mods = {"modify_sequence": modify_sequence, "register": register, "write": write}
+        measure = mock.Mock(name="measure", side_effect=caller("measure"))
+
+        mods = {"modify_sequence": modify_sequence, "register": register, "write": write, "measure": measure}
 
         with mock.patch.multiple(V.writer, **mods):
             assert await V.writer() is result
 
-        assert called == ["modify_sequence", "register", "write"]
+        assert called == ["modify_sequence", "register", "write", "measure"]
 
         modify_sequence.assert_called_once_with()
         register.assert_called_once_with()
         write.assert_called_once_with()
+        measure.assert_called_once_with(result)
 
     class TestModifySequence:
         async def test_it_modifies_sequence_after_first_modify_sequence(self, V):
@@ -121,6 +124,29 @@ class TestWriter:
             V.receiver.register.assert_called_once_with(V.writer.clone, result, V.original)
             result.add_done_callback.assert_called_once_with(hp.silent_reporter)
 
+    class TestMeasure:
+        async def test_it_gives_the_result_to_the_retry_gaps(self, V):
+            V.writer.did_broadcast = False
+            result = hp.create_future()
+            V.writer.measure(result)
+            V.retry_gaps.measure.assert_called_once_with(result)
+
+        async def test_it_doesnt_measure_broadcasts_or_results_that_are_done(self, V):
+            V.writer.did_broadcast = True
+            V.writer.measure(hp.create_future())
+
+            V.writer.did_broadcast = False
+            result = hp.create_future()
+            result.set_result([])
+            V.writer.measure(result)
+
+            assert len(V.retry_gaps.measure.mock_calls) == 0
+
+        async def test_it_does_nothing_if_the_retry_gaps_cant_measure(self, V):
+            V.writer.did_broadcast = False
+            V.writer.retry_gaps = mock.NonCallableMock(name="retry_gaps", spec=[])
+            V.writer.measure(hp.create_future())
+
     class TestWrite:
         async def test_it_spawns_a_transport_and_writes_to_it(self, V):
             bts = mock.Mock(name="bts")
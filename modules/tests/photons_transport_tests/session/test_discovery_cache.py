@@ -0,0 +1,97 @@
+import asyncio
+import json
+import os
+
+from photons_messages import Services
+from photons_transport.session.discovery_cache import DiscoveryCache
+
+
+class TestDiscoveryCache:
+    async def test_it_is_empty_if_the_file_doesnt_exist(self, tmp_path):
+        cache = DiscoveryCache(str(tmp_path / "nope.json"))
+        assert cache.devices == {}
+        assert list(cache.services()) == []
+
+    async def test_it_is_empty_if_the_file_isnt_valid(self, tmp_path):
+        path = tmp_path / "cache.json"
+
+        for content in ("{", "[]", "1"):
+            path.write_text(content)
+            assert DiscoveryCache(str(path)).devices == {}
+
+    async def test_it_loads_devices_that_arent_too_old(self, tmp_path, FakeTime):
+        path = tmp_path / "cache.json"
+        path.write_text(
+            json.dumps(
+                {
+                    "d073d5000001": {"last_seen": 1000, "services": {"UDP": {"host": "192.168.0.1", "port": 56700}}},
+                    "d073d5000002": {"last_seen": 10, "services": {"UDP": {"host": "192.168.0.2", "port": 56700}}},
+                    "d073d5000003": {"last_seen": 1000, "services": {"NOPE": {"host": "192.168.0.3", "port": 56700}}},
+                    "d073d5000004": {"last_seen": 1000},
+                    "d073d5000005": {"last_seen": 1000, "services": {"UDP": {"host": "192.168.0.5", "port": "56"}}},
+                }
+            )
+        )
+
+        with FakeTime() as t:
+            t.set(1000 + DiscoveryCache.max_age - 100)
+            cache = DiscoveryCache(str(path))
+
+            assert sorted(cache.devices) == ["d073d5000001", "d073d5000005"]
+            assert list(cache.services()) == [
+                ("d073d5000001", Services.UDP, "192.168.0.1", 56700),
+                ("d073d5000005", Services.UDP, "192.168.0.5", 56),
+            ]
+
+    async def test_it_can_add_remove_and_save(self, tmp_path, FakeTime):
+        path = tmp_path / "sub" / "cache.json"
+        cache = DiscoveryCache(str(path))
+
+        with FakeTime() as t:
+            t.set(20)
+            cache.add("d073d5000001", Services.UDP, "192.168.0.1", 56700)
+            cache.add("d073d5000002", Services.UDP, "192.168.0.2", 56700)
+            cache.remove("d073d5000002")
+            cache.remove("d073d5000003")
+            cache.save()
+
+        assert not os.path.exists(f"{path}.tmp")
+        assert json.loads(path.read_text()) == {"d073d5000001": {"last_seen": 20, "services": {"UDP": {"host": "192.168.0.1", "port": 56700}}}}
+
+    async def test_it_saves_changes_after_a_delay(self, tmp_path):
+        path = tmp_path / "cache.json"
+        cache = DiscoveryCache(str(path))
+        cache.save_after = 0.01
+
+        cache.add("d073d5000001", Services.UDP, "192.168.0.1", 56700)
+        cache.changed()
+        handle = cache.handle
+        cache.add("d073d5000002", Services.UDP, "192.168.0.2", 56700)
+        cache.changed()
+        assert cache.handle is handle
+        assert not path.exists()
+
+        await asyncio.sleep(0.05)
+        assert cache.handle is None
+        assert sorted(json.loads(path.read_text())) == ["d073d5000001", "d073d5000002"]
+
+    async def test_it_saves_on_finish(self, tmp_path):
+        path = tmp_path / "cache.json"
+        cache = DiscoveryCache(str(path))
+        cache.save_after = 100
+
+        cache.finish()
+        assert not path.exists()
+
+        cache.add("d073d5000001", Services.UDP, "192.168.0.1", 56700)
+        cache.changed()
+        cache.finish()
+        assert cache.handle is None
+        assert list(json.loads(path.read_text())) == ["d073d5000001"]
+
+    async def test_it_doesnt_complain_if_it_cant_save(self, tmp_path):
+        path = tmp_path / "file"
+        path.write_text("")
+        cache = DiscoveryCache(str(path / "cache.json"))
+        cache.add("d073d5000001", Services.UDP, "192.168.0.1", 56700)
+        cache.save()
@@ -6,6 +6,7 @@ from delfick_project.errors_pytest import assertRaises
 from delfick_project.norms import BadSpecValue, Meta, sb
 from photons_messages import Services
 from photons_transport.session import discovery_options as do
+from photons_transport.session.discovery_cache import DiscoveryCache
 
 
 @pytest.fixture()
@@ -342,6 +343,27 @@ class TestDiscoveryOptions:
             mock.call("d073d5000002", Services.UDP, host="192.168.7.8", port=56),
         ]
 
+    async def test_it_can_make_a_discovery_cache(self):
+        options = do.DiscoveryOptions.FieldSpec().empty_normalise()
+        assert options.cache_file is sb.NotSpecified
+        assert options.make_cache() is None
+
+        options = do.DiscoveryOptions.FieldSpec().empty_normalise(cache_file="/tmp/discovery.json")
+        cache = options.make_cache()
+        assert isinstance(cache, DiscoveryCache)
+        assert cache.path == "/tmp/discovery.json"
+
+    async def test_it_knows_if_it_has_passive_discovery(self):
+        options = do.DiscoveryOptions.FieldSpec().empty_normalise()
+        assert options.passive is sb.NotSpecified
+        assert not options.has_passive_discovery
+
+        options = do.DiscoveryOptions.FieldSpec().empty_normalise(passive=True)
+        assert options.has_passive_discovery
+
+        options = do.DiscoveryOptions.FieldSpec().empty_normalise(passive=True, hardcoded_discovery={"d073d5000001": "192.168.0.1"})
+        assert not options.has_passive_discovery
+
 
 class TestNoDiscoveryOptions:
     def test_it_overrides_serial_filter_and_hardcoded_discovery_with_None(self):
@@ -364,6 +386,10 @@ class TestNoDiscoveryOptions:
         options = do.NoDiscoveryOptions.FieldSpec().empty_normalise()
         assert not options.hardcoded_discovery
 
+    def test_it_has_no_discovery_cache(self):
+        options = do.NoDiscoveryOptions.FieldSpec().empty_normalise(cache_file="/tmp/discovery.json")
+        assert options.make_cache() is None
+
     def test_it_wants_all_serials(self):
         options = do.NoDiscoveryOptions.FieldSpec().empty_normalise()
         assert options.want("d073d5000001")
@@ -424,6 +450,23 @@ class TestDiscoveryOptionsSpec:
             else:
                 assert options.serial_filter == gl
 
+    def test_it_can_override_global_cache_file(self, meta, spec):
+        options = do.DiscoveryOptions.FieldSpec().empty_normalise(cache_file="/tmp/one.json")
+        meta.everything["discovery_options"] = options
+
+        assert spec.normalise(meta, sb.NotSpecified).cache_file == "/tmp/one.json"
+        assert spec.normalise(meta, {"cache_file": "/tmp/two.json"}).cache_file == "/tmp/two.json"
+        assert spec.normalise(meta, {"cache_file": None}).cache_file is None
+        assert options.cache_file == "/tmp/one.json"
+
+    def test_it_can_override_global_passive(self, meta, spec):
+        options = do.DiscoveryOptions.FieldSpec().empty_normalise(passive=True)
+        meta.everything["discovery_options"] = options
+
+        assert spec.normalise(meta, sb.NotSpecified).passive is True
+        assert spec.normalise(meta, {"passive": False}).passive is False
+        assert options.passive is True
+
     def test_it_can_override_global_hardcoded_discovery(self, meta, spec):
         for gl in (None, sb.NotSpecified):
             options = do.DiscoveryOptions.FieldSpec().empty_normalise(hardcoded_discovery=gl)
@@ -1,20 +1,26 @@
 import binascii
+import json
+import time
 from contextlib import contextmanager
 from unittest import mock
 
 import pytest
 from delfick_project.errors_pytest import assertRaises
 from photons_app import helpers as hp
-from photons_messages import DeviceMessages, DiscoveryMessages, Services
+from photons_control.planner.capability_cache import CapabilityCache
+from photons_control.planner.snapshot import GathererSnapshot
+from photons_messages import DeviceMessages, DiscoveryMessages, Services, protocol_register
 from photons_transport.comms.base import Found
+from photons_transport.comms.coalesce import Coalescer, CoalesceOptions
+from photons_transport.comms.rate_limit import RateLimiter, RateLimitOptions
 from photons_transport.errors import InvalidBroadcast, NoDesiredService, UnknownService
-from photons_transport.retry_options import Gaps
+from photons_transport.retry_options import AdaptiveGaps, Gaps, RTTEstimator
 from photons_transport.session.discovery_options import (
     NoDiscoveryOptions,
     NoEnvDiscoveryOptions,
 )
 from photons_transport.session.network import NetworkSession
-from photons_transport.transports.udp import UDP
+from photons_transport.transports.udp import UDP, SharedUDP, SocketPool
 
 
 class TestNetworkSession:
@@ -62,7 +68,103 @@ class TestNetworkSession:
 
     async def test_it_has_properties(self, V):
         assert V.session.UDPTransport is UDP
+        assert V.session.SharedUDPTransport is SharedUDP
         assert V.session.broadcast_transports == {}
+        assert V.session.socket_pool is None
+        assert V.session.rate_limiter is None
+        assert V.session.coalescer is None
+
+    async def test_it_has_a_coalescer_if_the_target_wants_one(self, V):
+        V.transport_target.coalesce = CoalesceOptions.FieldSpec().empty_normalise(enabled=True, fresh_for=0.1)
+        session = NetworkSession(V.transport_target)
+        try:
+            assert isinstance(session.coalescer, Coalescer)
+            assert session.coalescer.fresh_for == 0.1
+        finally:
+            await session.finish()
+
+    async def test_it_has_a_capability_cache_if_the_target_has_a_capability_cache_file(self, V, tmp_path):
+        assert V.session.capability_cache is None
+
+        V.transport_target.capability_cache_file = str(tmp_path / "capabilities.json")
+        session = NetworkSession(V.transport_target)
+        try:
+            assert isinstance(session.capability_cache, CapabilityCache)
+            assert session.capability_cache.path == str(tmp_path / "capabilities.json")
+        finally:
+            await session.finish()
+
+    async def test_it_has_a_gatherer_snapshot_if_the_target_has_a_gatherer_snapshot_file(self, V, tmp_path):
+        assert V.session.gatherer_snapshot is None
+
+        V.transport_target.gatherer_snapshot_file = str(tmp_path / "gatherer.snapshot")
+        V.transport_target.protocol_register = protocol_register
+        session = NetworkSession(V.transport_target)
+        try:
+            assert isinstance(session.gatherer_snapshot, GathererSnapshot)
+            assert session.gatherer_snapshot.path == str(tmp_path / "gatherer.snapshot")
+            assert session.gatherer_snapshot.protocol_register is protocol_register
+        finally:
+            await session.finish()
+
+    async def test_it_has_a_rate_limiter_if_the_target_has_a_rate_limit(self, V):
+        V.transport_target.rate_limit = RateLimitOptions.FieldSpec().empty_normalise(rate=20, burst=2)
+        session = NetworkSession(V.transport_target)
+        try:
+            assert isinstance(session.rate_limiter, RateLimiter)
+            assert session.rate_limiter.rate == 20
+            assert session.rate_limiter.burst == 2
+        finally:
+            await session.finish()
+
+        V.transport_target.rate_limit = RateLimitOptions.FieldSpec().empty_normalise()
+        session = NetworkSession(V.transport_target)
+        try:
+            assert session.rate_limiter is None
+        finally:
+            await session.finish()
+
+    async def test_it_has_passive_discovery_if_the_discovery_options_want_it(self, V):
+        assert not V.session.passive_discovery
+
+        V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(passive=True)
+        session = NetworkSession(V.transport_target)
+        try:
+            assert session.passive_discovery
+            assert session.passively_found == 0
+        finally:
+            await session.finish()
+
+    class TestSharedSockets:
+        @pytest.fixture()
+        def session(self, V):
+            V.transport_target.shared_sockets = 2
+            return NetworkSession(V.transport_target)
+
+        async def test_it_makes_a_socket_pool(self, session):
+            try:
+                assert isinstance(session.socket_pool, SocketPool)
+                assert len(session.socket_pool) == 2
+            finally:
+                await session.finish()
+
+        async def test_it_makes_shared_transports(self, session):
+            try:
+                transport = await session.make_transport("d073d5000001", Services.UDP, {"host": "10.0.0.1", "port": 56700})
+                assert type(transport) is SharedUDP
+                assert transport.address == ("10.0.0.1", 56700)
+
+                transport = await session.make_broadcast_transport(True)
+                assert type(transport) is SharedUDP
+                assert transport.address == ("1.2.3.255", 56700)
+            finally:
+                await session.finish()
+
+        async def test_it_closes_the_pool_when_finished(self, session):
+            close = pytest.helpers.AsyncMock(name="close")
+            with mock.patch.object(session.socket_pool, "close", close):
+                await session.finish()
+            close.assert_called_once_with()
 
     class TestFinish:
         async def test_it_closes_all_the_broadcast_transports(self, V):
@@ -95,6 +197,23 @@ class TestNetworkSession:
             uro1 = V.session.retry_gaps(packet, transport)
             assert uro1 is V.transport_target.gaps
 
+        async def test_it_returns_adaptive_gaps_if_the_target_wants_them(self, V):
+            V.transport_target.adaptive_retries = True
+            session = NetworkSession(V.transport_target)
+            assert isinstance(session.rtt, RTTEstimator)
+
+            try:
+                transport = mock.Mock(name="transport")
+
+                packet = DeviceMessages.GetPower(target="d073d5000001")
+                gaps = session.retry_gaps(packet, transport)
+                assert isinstance(gaps, AdaptiveGaps)
+                assert gaps.gaps is V.transport_target.gaps
+                assert gaps.estimator is session.rtt
+                assert gaps.serial == "d073d5000001"
+            finally:
+                await session.finish()
+
     class TestDetermineNeededTransport:
         async def test_it_says_udp(self, V):
             services = mock.NonCallableMock(name="services", spec=[])
@@ -239,6 +358,142 @@ class TestNetworkSession:
                 Services.UDP: await V.session.make_transport("d073d5000002", Services.UDP, {"host": "192.168.0.4", "port": 58})
             }
 
+        async def test_it_remembers_found_devices_in_the_discovery_cache(self, V, mocks, tmp_path):
+            cache_file = tmp_path / "discovery.json"
+            V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(cache_file=str(cache_file))
+
+            async def run(*args, **kwargs):
+                s1 = DiscoveryMessages.StateService(service=Services.UDP, port=56, target="d073d5000001")
+                s1.Information.update(remote_addr=("192.168.0.3", 56700), sender_message=DiscoveryMessages.GetService())
+                yield s1
+
+            with mocks(20, run):
+                fn = await V.session._do_search(None, 20)
+
+            assert fn == [binascii.unhexlify("d073d5000001")]
+            assert V.session.verify_cache_task is None
+
+            with open(cache_file) as fle:
+                cached = json.load(fle)
+            assert cached == {"d073d5000001": {"last_seen": mock.ANY, "services": {"UDP": {"host": "192.168.0.3", "port": 56}}}}
+
+        async def test_it_uses_the_discovery_cache_straight_away_and_verifies_it_in_the_background(self, V, mocks, tmp_path):
+            cache_file = tmp_path / "discovery.json"
+            with open(cache_file, "w") as fle:
+                json.dump(
+                    {
+                        "d073d5000001": {"last_seen": time.time(), "services": {"UDP": {"host": "192.168.0.3", "port": 56}}},
+                        "d073d5000002": {"last_seen": time.time(), "services": {"UDP": {"host": "192.168.0.4", "port": 58}}},
+                    },
+                    fle,
+                )
+            V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(cache_file=str(cache_file))
+
+            async def run(*args, **kwargs):
+                s1 = DiscoveryMessages.StateService(service=Services.UDP, port=56, target="d073d5000001")
+                s1.Information.update(remote_addr=("192.168.0.3", 56700), sender_message=DiscoveryMessages.GetService())
+                yield s1
+
+            with mocks(20, run):
+                fn = await V.session._do_search(["d073d5000002"], 20)
+                assert sorted(fn) == sorted([binascii.unhexlify(s) for s in ("d073d5000001", "d073d5000002")])
+                assert V.session.found.serials == ["d073d5000001", "d073d5000002"]
+                assert V.session.found["d073d5000002"] == {
+                    Services.UDP: await V.session.make_transport("d073d5000002", Services.UDP, {"host": "192.168.0.4", "port": 58})
+                }
+
+                await V.session.verify_cache_task
+
+            assert V.session.found.serials == ["d073d5000001"]
+            with open(cache_file) as fle:
+                assert list(json.load(fle)) == ["d073d5000001"]
+
+        @pytest.fixture()
+        def cached_two(self, V, tmp_path):
+            cache_file = tmp_path / "discovery.json"
+            with open(cache_file, "w") as fle:
+                json.dump(
+                    {
+                        "d073d5000001": {"last_seen": time.time(), "services": {"UDP": {"host": "192.168.0.3", "port": 56}}},
+                        "d073d5000002": {"last_seen": time.time(), "services": {"UDP": {"host": "192.168.0.4", "port": 58}}},
+                    },
+                    fle,
+                )
+            V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(cache_file=str(cache_file))
+            return cache_file
+
+        def state_service(self, serial, host, port):
+            pkt = DiscoveryMessages.StateService(service=Services.UDP, port=port, target=serial)
+            pkt.Information.update(remote_addr=(host, 56700), sender_message=DiscoveryMessages.GetService())
+            return pkt
+
+        async def test_it_verifies_the_cache_for_the_whole_search(self, V, mocks, cached_two):
+            rounds = []
+
+            async def run(*args, **kwargs):
+                rounds.append(True)
+                yield self.state_service("d073d5000001", "192.168.0.3", 56)
+
+                # This device is slow and only replies in the third round
+                if len(rounds) == 3:
+                    yield self.state_service("d073d5000002", "192.168.0.4", 58)
+
+            with mocks(20, run):
+                await V.session._do_search(None, 20)
+                await V.session.verify_cache_task
+
+            assert len(rounds) == 4
+            assert V.session.found.serials == ["d073d5000001", "d073d5000002"]
+            with open(cached_two) as fle:
+                assert sorted(json.load(fle)) == ["d073d5000001", "d073d5000002"]
+
+        async def test_it_doesnt_remove_lost_devices_when_verifying_if_ignore_lost(self, V, mocks, cached_two):
+            async def run(*args, **kwargs):
+                yield self.state_service("d073d5000001", "192.168.0.3", 56)
+
+            with mocks(20, run):
+                await V.session._do_search(None, 20, ignore_lost=True)
+                await V.session.verify_cache_task
+
+            assert V.session.found.serials == ["d073d5000001", "d073d5000002"]
+            with open(cached_two) as fle:
+                assert list(json.load(fle)) == ["d073d5000001"]
+
+        async def test_it_doesnt_forget_passively_found_devices_when_verifying(self, V, mocks, cached_two):
+            V.transport_target.discovery_options.passive = True
+
+            async def run(*args, **kwargs):
+                yield self.state_service("d073d5000001", "192.168.0.3", 56)
+
+            with mocks(20, run):
+                await V.session._do_search(None, 20)
+                await V.session.add_passive_service(self.state_service("d073d5000002", "192.168.0.9", 58), ("192.168.0.9", 56700))
+                await V.session.verify_cache_task
+
+            assert V.session.found.serials == ["d073d5000001", "d073d5000002"]
+            with open(cached_two) as fle:
+                assert sorted(json.load(fle)) == ["d073d5000001", "d073d5000002"]
+
+        async def test_it_searches_the_network_if_the_cache_doesnt_have_the_serials(self, V, mocks, tmp_path):
+            cache_file = tmp_path / "discovery.json"
+            with open(cache_file, "w") as fle:
+                json.dump({"d073d5000001": {"last_seen": time.time(), "services": {"UDP": {"host": "192.168.0.3", "port": 56}}}}, fle)
+            V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(cache_file=str(cache_file))
+
+            async def run(*args, **kwargs):
+                s2 = DiscoveryMessages.StateService(service=Services.UDP, port=58, target="d073d5000002")
+                s2.Information.update(remote_addr=("192.168.0.4", 56700), sender_message=DiscoveryMessages.GetService())
+                yield s2
+
+            with mocks(20, run):
+                fn = await V.session._do_search(["d073d5000002"], 20)
+
+            assert fn == [binascii.unhexlify("d073d5000002")]
+            assert V.session.verify_cache_task is None
+
+            with open(cache_file) as fle:
+                assert sorted(json.load(fle)) == ["d073d5000001", "d073d5000002"]
+
         async def test_it_can_filter_serials(self, V, mocks):
             async def run(*args, **kwargs):
                 s1 = DiscoveryMessages.StateService(service=Services.UDP, port=56, target="d073d5000001")
@@ -468,6 +723,62 @@ class TestNetworkSession:
             assert fn == [binascii.unhexlify("d073d5000001")]
             assert V.session.found.serials == ["d073d5000001"]
 
+    class TestAddPassiveService:
+        def state_service(self, serial, port):
+            return DiscoveryMessages.StateService(service=Services.UDP, port=port, target=serial)
+
+        async def test_it_adds_new_and_moved_devices(self, V):
+            V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(passive=True)
+
+            await V.session.add_passive_service(self.state_service("d073d5000001", 56), ("192.168.0.3", 56700))
+            await V.session.add_passive_service(self.state_service("d073d5000002", 57), ("192.168.0.4", 56700))
+            assert V.session.passively_found == 2
+
+            assert V.session.found.serials == ["d073d5000001", "d073d5000002"]
+            existing = V.session.found["d073d5000001"][Services.UDP]
+            assert (existing.host, existing.port) == ("192.168.0.3", 56)
+
+            # Same place does nothing
+            await V.session.add_passive_service(self.state_service("d073d5000001", 56), ("192.168.0.3", 56700))
+            assert V.session.passively_found == 2
+            assert V.session.found["d073d5000001"][Services.UDP] is existing
+
+            # Moved device is updated
+            await V.session.add_passive_service(self.state_service("d073d5000001", 56), ("192.168.0.9", 56700))
+            assert V.session.passively_found == 3
+            moved = V.session.found["d073d5000001"][Services.UDP]
+            assert (moved.host, moved.port) == ("192.168.0.9", 56)
+
+        async def test_it_respects_the_serial_filter(self, V):
+            V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(passive=True, serial_filter=["d073d5000002"])
+
+            await V.session.add_passive_service(self.state_service("d073d5000001", 56), ("192.168.0.3", 56700))
+            await V.session.add_passive_service(self.state_service("d073d5000002", 56), ("192.168.0.4", 56700))
+
+            assert V.session.found.serials == ["d073d5000002"]
+            assert V.session.passively_found == 1
+
+        async def test_it_remembers_passive_devices_in_the_discovery_cache(self, V, tmp_path):
+            cache_file = tmp_path / "discovery.json"
+            V.transport_target.discovery_options = NoEnvDiscoveryOptions.FieldSpec().empty_normalise(passive=True, cache_file=str(cache_file))
+
+            await V.session.add_passive_service(self.state_service("d073d5000001", 56), ("192.168.0.3", 56700))
+            await V.session.add_passive_service(self.state_service("d073d5000002", 56), ("192.168.0.4", 56700))
+
+            # Written later rather than for every device
+            assert V.session.discovery_cache.handle is not None
+            assert not cache_file.exists()
+
+            await V.session.finish()
+            assert V.session.discovery_cache.handle is None
+
+            with open(cache_file) as fle:
+                cached = json.load(fle)
+            assert cached == {
+                "d073d5000001": {"last_seen": mock.ANY, "services": {"UDP": {"host": "192.168.0.3", "port": 56}}},
+                "d073d5000002": {"last_seen": mock.ANY, "services": {"UDP": {"host": "192.168.0.4", "port": 56}}},
+            }
+
     class TestMakeTransport:
         async def test_it_complains_if_the_service_isnt_a_valid_Service(self, V):
             serial = "d073d5000001"
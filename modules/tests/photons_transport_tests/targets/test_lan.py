@@ -0,0 +1,27 @@
+from unittest import mock
+
+import pytest
+from delfick_project.errors_pytest import assertRaises
+from delfick_project.norms import BadSpecValue, Meta
+from photons_messages import protocol_register
+from photons_transport.targets import LanTarget, shared_sockets_spec
+
+
+class TestLanTarget:
+    @pytest.fixture()
+    def config(self):
+        return {"protocol_register": protocol_register, "final_future": mock.Mock(name="final_future")}
+
+    async def test_it_defaults_to_a_socket_per_device(self, config):
+        assert LanTarget.create(config).shared_sockets == 0
+
+    async def test_it_can_share_sockets(self, config):
+        assert LanTarget.create(config, {"shared_sockets": 0}).shared_sockets == 0
+        assert LanTarget.create(config, {"shared_sockets": 3}).shared_sockets == 3
+
+    async def test_it_doesnt_allow_a_negative_number_of_shared_sockets(self, config):
+        with assertRaises(BadSpecValue):
+            LanTarget.create(config, {"shared_sockets": -1})
+
+        with assertRaises(BadSpecValue, "shared_sockets can't be less than 0", got=-1):
+            shared_sockets_spec().normalise(Meta.empty(), -1)
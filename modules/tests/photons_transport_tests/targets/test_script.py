@@ -22,7 +22,7 @@ class TestSenderWrapper:
         class V:
             called = []
 
-            sender = mock.Mock(name="sender")
+            sender = mock.Mock(name="sender", rate_limiter=None)
 
             res1 = mock.Mock(name="res1")
             res2 = mock.Mock(name="res2")
@@ -113,6 +113,16 @@ class TestSenderWrapper:
             ("close_sender", (V.sender,), {}),
         ]
 
+    async def test_it_doesnt_impose_a_default_limit_if_the_sender_has_a_rate_limiter(self, V):
+        a = mock.Mock(name="a")
+        kwargs = {"b": a}
+        sender = mock.NonCallableMock(name="sender", rate_limiter=mock.Mock(name="rate_limiter"))
+
+        async with sender_wrapper(V.target, sender, kwargs):
+            pass
+
+        assert kwargs == {"b": a, "limit": None}
+
 
 class TestScriptRunner:
     @pytest.fixture()
@@ -120,7 +130,7 @@ class TestScriptRunner:
         class V:
             res1 = mock.Mock(name="res1")
             res2 = mock.Mock(name="res2")
-            sender = mock.Mock(name="sender")
+            sender = mock.Mock(name="sender", rate_limiter=None)
             called = []
             target = mock.Mock(name="target", spec=[])
 
@@ -1,4 +1,9 @@
-from photons_transport.retry_options import Gaps
+import asyncio
+from unittest import mock
+
+import pytest
+from photons_app import helpers as hp
+from photons_transport.retry_options import AdaptiveGaps, Gaps, RetryTicker, RTTEstimator
 
 
 class TestGaps:
@@ -29,3 +34,122 @@ class TestGaps:
         ticker = obj.retry_ticker(name="there")
         assert ticker.name == "there"
         assert ticker.timeouts == [(0.1, 0.6), (0.5, 3)]
+
+
+class TestRTTEstimator:
+    def test_it_has_no_timeout_without_measurements(self):
+        estimator = RTTEstimator()
+        assert estimator.rto("d073d5000001") is None
+        default = [(0.1, 0.5)]
+        assert estimator.timeouts("d073d5000001", default) is default
+
+    def test_it_smooths_measurements_like_tcp(self):
+        estimator = RTTEstimator(min_rto=0.01, max_rto=5)
+
+        estimator.add_sample("d073d5000001", 0.4)
+        estimate = estimator.estimates["d073d5000001"]
+        assert estimate.srtt == 0.4
+        assert estimate.rttvar == 0.2
+        assert estimate.samples == 1
+        assert estimator.rto("d073d5000001") == 1.2
+
+        estimator.add_sample("d073d5000001", 0.2)
+        assert estimate.srtt == pytest.approx(0.375)
+        assert estimate.rttvar == pytest.approx(0.2)
+        assert estimate.samples == 2
+        assert estimator.rto("d073d5000001") == 1.175
+
+        assert estimator.rto("d073d5000002") is None
+
+    def test_it_keeps_the_timeout_between_min_and_max(self):
+        estimator = RTTEstimator(min_rto=0.1, max_rto=2)
+
+        estimator.add_sample("d073d5000001", 0.005)
+        assert estimator.rto("d073d5000001") == 0.1
+
+        estimator.add_sample("d073d5000002", 3)
+        assert estimator.rto("d073d5000002") == 2
+
+    def test_it_doubles_the_gap_between_retries_up_to_max_rto(self):
+        estimator = RTTEstimator(min_rto=0.1, max_rto=2)
+        estimator.add_sample("d073d5000001", 0.005)
+
+        assert estimator.timeouts("d073d5000001", None) == [
+            (0.1, 0.1),
+            (0.2, 0.3),
+            (0.4, 0.7),
+            (0.8, 1.5),
+            (1.6, 3.1),
+            (2, 6.3),
+        ]
+
+        estimator.add_sample("d073d5000002", 3)
+        assert estimator.timeouts("d073d5000002", None) == [(2, 2)]
+
+    async def test_it_measures_the_time_until_the_first_reply(self, FakeTime):
+        estimator = RTTEstimator(min_rto=0.01)
+
+        with FakeTime() as t:
+            t.set(1)
+            result = hp.create_future()
+            estimator.measure("d073d5000001", result)
+
+            result.first_received = 1.3
+            result.set_result([])
+            await asyncio.sleep(0)
+
+        assert estimator.estimates["d073d5000001"].srtt == pytest.approx(0.3)
+
+    async def test_it_doesnt_measure_results_that_failed(self):
+        estimator = RTTEstimator()
+
+        result = hp.create_future()
+        estimator.measure("d073d5000001", result)
+        result.cancel()
+
+        result2 = hp.create_future()
+        estimator.measure("d073d5000001", result2)
+        result2.first_received = 1
+        result2.set_exception(ValueError("NOPE"))
+
+        result3 = hp.create_future()
+        estimator.measure("d073d5000001", result3)
+        result3.first_received = None
+        result3.set_result([])
+
+        await hp.wait_for_all_futures(result, result2, result3)
+        await asyncio.sleep(0)
+        assert estimator.estimates == {}
+
+
+class TestAdaptiveGaps:
+    @pytest.fixture()
+    def gaps(self):
+        return Gaps(gap_between_ack_and_res=0.5, gap_between_results=0.9, timeouts=[(0.1, 0.5)]).empty_normalise()
+
+    def test_it_uses_the_wrapped_gaps(self, gaps):
+        adaptive = AdaptiveGaps(gaps, RTTEstimator(), "d073d5000001")
+        assert adaptive.gap_between_ack_and_res == 0.5
+        assert adaptive.gap_between_results == 0.9
+        assert adaptive.finish_multi_gap == gaps.finish_multi_gap
+        assert adaptive.timeouts == [(0.1, 0.5)]
+
+        ticker = adaptive.retry_ticker(name="hello")
+        assert isinstance(ticker, RetryTicker)
+        assert ticker.name == "hello"
+        assert ticker.timeouts == [(0.1, 0.5)]
+
+    def test_it_uses_timeouts_from_the_estimator_once_there_are_measurements(self, gaps):
+        estimator = RTTEstimator(min_rto=0.1, max_rto=1)
+        estimator.add_sample("d073d5000001", 0.005)
+        adaptive = AdaptiveGaps(gaps, estimator, "d073d5000001")
+
+        ticker = adaptive.retry_ticker(name="hello")
+        assert ticker.timeouts == [(0.1, 0.1), (0.2, 0.3), (0.4, 0.7), (0.8, 1.5), (1, 3.1)]
+
+    def test_it_measures_for_its_serial(self, gaps):
+        estimator = mock.Mock(name="estimator")
+        result = mock.Mock(name="result")
+
+        AdaptiveGaps(gaps, estimator, "d073d5000001").measure(result)
+        estimator.measure.assert_called_once_with("d073d5000001", result)
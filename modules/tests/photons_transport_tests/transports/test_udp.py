@@ -3,7 +3,7 @@ from unittest import mock
 
 import pytest
 from photons_app import helpers as hp
-from photons_transport.transports.udp import UDP
+from photons_transport.transports.udp import UDP, SharedUDP, SocketPool
 
 
 class FakeIO:
@@ -141,3 +141,70 @@ class TestUDP:
             assert not await V.transport.is_transport_active(V.original_message, transport)
         finally:
             await device.finish()
+
+
+class TestSharedUDP:
+    @pytest.fixture()
+    def V(self):
+        class V:
+            host = "127.0.0.1"
+            port1 = pytest.helpers.free_port()
+            port2 = pytest.helpers.free_port()
+
+            session = mock.Mock(name="session", spec=["sync_received_data", "socket_pool"])
+            original_message = mock.Mock(name="original_message")
+
+        V.session.socket_pool = SocketPool(V.session, 1)
+        return V()
+
+    async def test_it_sends_to_many_addresses_through_one_socket(self, V):
+        received = []
+        done = hp.create_future()
+
+        def receive(message, addr):
+            received.append((message, addr))
+            if len(received) == 2:
+                done.set_result(True)
+
+        V.session.sync_received_data.side_effect = receive
+
+        device1 = FakeIO(V.port1, lambda b, a: [b"one:" + b])
+        device2 = FakeIO(V.port2, lambda b, a: [b"two:" + b])
+        await device1.start()
+        await device2.start()
+
+        transport1 = SharedUDP(V.session, V.host, V.port1, serial="d073d5000001")
+        transport2 = SharedUDP(V.session, V.host, V.port2, serial="d073d5000002")
+
+        try:
+            t1 = await transport1.spawn(V.original_message, timeout=1)
+            t2 = await transport2.spawn(V.original_message, timeout=1)
+            assert t1 is t2
+            assert len(V.session.socket_pool) == 1
+
+            await transport1.write(t1, b"hello", V.original_message)
+            await transport2.write(t2, b"there", V.original_message)
+            await done
+
+            assert sorted(received) == sorted([(b"one:hello", (V.host, V.port1)), (b"two:there", (V.host, V.port2))])
+
+            await transport1.close()
+            assert await transport2.is_transport_active(V.original_message, t2)
+
+            await V.session.socket_pool.close()
+            assert not await transport2.is_transport_active(V.original_message, t2)
+        finally:
+            await V.session.socket_pool.close()
+            await device1.finish()
+            await device2.finish()
+
+    async def test_it_clones_into_a_normal_UDP_if_the_new_session_has_no_pool(self, V):
+        transport = SharedUDP(V.session, V.host, V.port1, serial="d073d5000001")
+
+        clone = transport.clone_for(mock.Mock(name="new_session", socket_pool=V.session.socket_pool))
+        assert type(clone) is SharedUDP
+
+        clone = transport.clone_for(mock.Mock(name="new_session", socket_pool=None))
+        assert type(clone) is UDP
+        assert clone.address == transport.address
+        assert clone.serial == "d073d5000001"
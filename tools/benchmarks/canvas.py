@@ -0,0 +1,66 @@
+"""
+Measure how long it takes to make each frame of the balls animation on a
+``Canvas`` and on a ``DenseCanvas``.
+
+Run with ``./dev run python tools/benchmarks/canvas.py`` or with python from a
+virtualenv that has photons and numpy installed.
+"""
+
+import argparse
+import random
+import time
+
+from delfick_project.norms import Meta
+from photons_canvas.animations.registered.balls import Options, TileBallsState
+from photons_canvas.orientation import Orientation
+from photons_canvas.points import containers as cont
+from photons_canvas.points.canvas import Canvas
+from photons_canvas.points.dense import DenseCanvas
+from photons_products import Products
+
+
+def make_parts(tiles):
+    parts = []
+    for i in range(tiles):
+        device = cont.Device(f"d073d5{i // 5:06x}", Products.LCM3_TILE.cap)
+        parts.append(cont.Part(i % 6, i // 6, 8, 8, i % 5, Orientation.RightSideUp, device))
+    return parts
+
+
+def frames(kls, tiles, count, per_point):
+    random.seed(1)
+    parts = make_parts(tiles)
+
+    state = TileBallsState(Options.FieldSpec().normalise(Meta.empty(), {"num_balls": 20}))
+    state.set_points(parts)
+
+    canvas = kls()
+    canvas.add_parts(*parts)
+
+    took = 0
+    for _ in range(count):
+        layer = state.next_layer
+        if per_point:
+            del layer.dense
+
+        before = time.perf_counter()
+        canvas = canvas.clone()
+        canvas.msgs(layer, onto=canvas.points)
+        took += time.perf_counter() - before
+
+    return took / count * 1000
+
+
+def run(tiles, count):
+    print(f"{tiles} tiles, {count} frames")
+    print(f"  Canvas                   {frames(Canvas, tiles, count, True):>8.2f}ms per frame")
+    print(f"  DenseCanvas (per point)  {frames(DenseCanvas, tiles, count, True):>8.2f}ms per frame")
+    print(f"  DenseCanvas (dense)      {frames(DenseCanvas, tiles, count, False):>8.2f}ms per frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tiles", type=int, default=30, help="Number of tiles on the canvas")
+    parser.add_argument("--count", type=int, default=200, help="Number of frames to make")
+    args = parser.parse_args()
+    run(args.tiles, args.count)
@@ -0,0 +1,86 @@
+"""
+Measure how long it takes to turn a frame of colors into the bytes for the
+Set64 messages of a tile arrangement and the SetExtendedColorZones message of
+a strip.
+
+Run with ``./dev run python tools/benchmarks/color_encoding.py`` or with python
+from a virtualenv that has photons and numpy installed.
+"""
+
+import argparse
+import random
+import time
+
+import numpy as np
+from photons_canvas.points.simple_messages import ColorEncoder, SetExtendedColorZones, fill
+from photons_messages import MultiZoneMessages
+from photons_messages.fields import Color
+
+
+def frame(count, distinct):
+    """A list of colors where distinct says how many different colors there are"""
+    palette = [(random.random() * 360, random.random(), random.random(), random.randrange(1500, 9000)) for _ in range(distinct)]
+    return [random.choice(palette) for _ in range(count)]
+
+
+def timed(func, frames):
+    before = time.perf_counter()
+    for f in frames:
+        func(f)
+    return (time.perf_counter() - before) / len(frames) * 1e6
+
+
+def tiles(tiles, count, distinct):
+    frames = [frame(tiles * 64, distinct) for _ in range(count)]
+    arrays = [np.array(f, dtype=float) for f in frames]
+
+    def each_color(colors):
+        for start in range(0, len(colors), 64):
+            b"".join([fill(c) for c in colors[start : start + 64]])
+
+    whole = ColorEncoder(tiles * 64)
+
+    def whole_frame(colors):
+        packed = whole.pack(colors)
+        for start in range(0, len(colors), 64):
+            packed[start : start + 64].tobytes()
+
+    print(f"{tiles} tiles with {distinct} different colors, {count} frames")
+    print(f"  fill for each color          {timed(each_color, frames):>10.1f}us per frame")
+    print(f"  ColorEncoder for the frame   {timed(whole_frame, arrays):>10.1f}us per frame")
+
+
+def strip(count):
+    frames = [frame(82, 82) for _ in range(count)]
+
+    def real(colors):
+        MultiZoneMessages.SetExtendedColorZones(
+            source=1,
+            sequence=1,
+            target="d073d5000001",
+            duration=0,
+            zone_index=0,
+            colors_count=82,
+            colors=[Color(*c) for c in colors],
+        ).pack()
+
+    def simple(colors):
+        SetExtendedColorZones(source=1, sequence=1, target="d073d5000001", colors_count=82, colors=colors).tobytes()
+
+    print(f"82 zone strip, {count} frames")
+    print(f"  photons message              {timed(real, frames):>10.1f}us per frame")
+    print(f"  simple message               {timed(simple, frames):>10.1f}us per frame")
+
+
+def run(tile_count, count):
+    tiles(tile_count, count, 100)
+    tiles(tile_count, count, tile_count * 64)
+    strip(count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tiles", type=int, default=30, help="Number of tiles in each frame")
+    parser.add_argument("--count", type=int, default=100, help="Number of frames to encode")
+    args = parser.parse_args()
+    run(args.tiles, args.count)
@@ -0,0 +1,94 @@
+"""
+Measure how much memory and time the device finder uses to remember a fleet of
+devices.
+
+Run with ``./dev run python tools/benchmarks/device_store.py`` or with python
+from a virtualenv that has photons installed.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+
+from photons_control.device_finder import Collections, Device, DeviceIndex
+from photons_messages import DeviceMessages, LightMessages
+
+GROUPS = [uuid.uuid4().hex for _ in range(20)]
+LOCATIONS = [uuid.uuid4().hex for _ in range(4)]
+
+
+def packets(i):
+    yield LightMessages.LightState.create(label=f"light {i % 50}", power=65535 * (i % 2), hue=i % 360, saturation=1, brightness=0.5, kelvin=3500)
+    yield DeviceMessages.StateVersion.create(vendor=1, product=55)
+    yield DeviceMessages.StateHostFirmware.create(version_major=3, version_minor=70, build=0)
+    yield DeviceMessages.StateGroup.create(group=GROUPS[i % len(GROUPS)], label=f"group {i % len(GROUPS)}", updated_at=1)
+    yield DeviceMessages.StateLocation.create(location=LOCATIONS[i % len(LOCATIONS)], label=f"location {i % len(LOCATIONS)}", updated_at=1)
+
+
+def fleet(count):
+    serials = [f"d073d5{i:06x}" for i in range(count)]
+    collections = Collections()
+    index = DeviceIndex()
+    spec = Device.FieldSpec()
+
+    devices = {}
+    for serial in serials:
+        device = devices[serial] = spec.empty_normalise(serial=serial)
+        device.index = index
+        index.add(device)
+    return devices, collections
+
+
+def fill(devices, pkts, collections):
+    for device, ps in zip(devices.values(), pkts):
+        for pkt in ps:
+            point = device.set_from_pkt(pkt, collections)
+            device.point_futures[point].reset()
+            device.point_futures[point].set_result(time.time())
+
+
+def measure_memory(count, pkts):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        devices, collections = fleet(count)
+        created = tracemalloc.get_traced_memory()[0]
+        fill(devices, pkts, collections)
+        filled = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+    assert all(device.info["group_name"] for device in devices.values())
+    return created / count, filled / count
+
+
+def measure_time(count, pkts):
+    before = time.perf_counter()
+    devices, collections = fleet(count)
+    created = time.perf_counter() - before
+
+    before = time.perf_counter()
+    fill(devices, pkts, collections)
+    filled = time.perf_counter() - before
+
+    return created / count * 1e6, filled / sum(len(ps) for ps in pkts) * 1e6
+
+
+def run(count):
+    pkts = [list(packets(i)) for i in range(count)]
+    created, filled = measure_memory(count, pkts)
+    create_time, fill_time = measure_time(count, pkts)
+
+    print(f"{count} devices")
+    print(f"  empty devices    {created:>8.0f} bytes per device")
+    print(f"  with information {filled:>8.0f} bytes per device ({filled * count / 1024 / 1024:.1f}MB)")
+    print(f"  creating         {create_time:>8.2f}us per device")
+    print(f"  set_from_pkt     {fill_time:>8.2f}us per packet")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=10000, help="Number of devices to remember")
+    run(parser.parse_args().count)
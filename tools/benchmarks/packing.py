@@ -0,0 +1,96 @@
+"""
+Compare packing and unpacking messages with the ``PacketCodec`` against packing
+and unpacking them field by field with bitarrays.
+
+Run with ``./dev run python tools/benchmarks/packing.py`` or with python from a
+virtualenv that has photons installed.
+"""
+
+import argparse
+import timeit
+from contextlib import contextmanager
+
+from photons_messages import DiscoveryMessages, LightMessages, TileMessages, protocol_register
+from photons_messages.frame import LIFXPacket
+from photons_protocol.messages import Messages
+from photons_protocol.packing import PacketCodec
+
+
+def messages():
+    yield "GetColor", LightMessages.GetColor(source=1, sequence=2, target="d073d5001337")
+    yield "StateService", DiscoveryMessages.StateService(source=1, sequence=2, target="d073d5001337", service=1, port=56700)
+    yield (
+        "LightState",
+        LightMessages.LightState(
+            source=1,
+            sequence=2,
+            target="d073d5001337",
+            hue=100,
+            saturation=0.5,
+            brightness=0.5,
+            kelvin=3500,
+            power=65535,
+            label="kitchen",
+        ),
+    )
+    yield (
+        "Set64",
+        TileMessages.Set64(
+            source=1,
+            sequence=2,
+            target="d073d5001337",
+            tile_index=0,
+            length=1,
+            x=0,
+            y=0,
+            width=8,
+            duration=0,
+            colors=[{"hue": i, "saturation": 1, "brightness": 1, "kelvin": 3500} for i in range(64)],
+        ),
+    )
+
+
+@contextmanager
+def without_codec(*klses):
+    """Make these packet classes pack and unpack field by field"""
+    before = [kls.Meta.__dict__.get("codec") for kls in klses]
+    try:
+        for kls in klses:
+            kls.Meta.codec = None
+        yield
+    finally:
+        for kls, codec in zip(klses, before):
+            kls.Meta.codec = codec
+
+
+def time_it(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def run(number):
+    print(f"{'message':<14} {'operation':<8} {'field by field':>16} {'codec':>10} {'speedup':>8}")
+
+    for name, msg in messages():
+        simple = msg.simplify()
+        data = simple.pack().tobytes()
+        klses = [type(msg), type(msg).Payload, LIFXPacket]
+        for kls in klses:
+            PacketCodec.for_kls(kls)
+
+        def pack():
+            simple.pack()
+
+        def unpack():
+            Messages.create(data, protocol_register)
+
+        for operation, func in (("pack", pack), ("unpack", unpack)):
+            with without_codec(*klses):
+                slow = time_it(func, number)
+            fast = time_it(func, number)
+            print(f"{name:<14} {operation:<8} {slow:>13.1f}us {fast:>8.1f}us {slow / fast:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=500, help="Number of iterations for each measurement")
+    run(parser.parse_args().number)